@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any
+
+from backend.app.prompt_layout import compile_messages
+from backend.app.prompts import AGENT_CONFIGS
+from backend.app.prompts_short import AGENT_CONFIGS_SHORT
+
+logger = logging.getLogger(__name__)
+
+# Directory of extra agent sets, one JSON or YAML file per set. A file named
+# like a built-in set ("long", "short") replaces it.
+AGENT_SETS_DIR = os.getenv("AGENT_SETS_DIR", "").strip()
+DEFAULT_AGENT_SET = "long"
+
+_SET_EXTENSIONS = {".json", ".yaml", ".yml"}
+
+
+def prompt_hash(system: str) -> str:
+    return hashlib.sha256(system.encode("utf-8")).hexdigest()[:16]
+
+
+def compile_agent(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Validate an agent config and add what every call would otherwise
+    recompute: the prompt hash used in cache keys and the serialized
+    messages around the document.
+    """
+    key = config.get("key")
+    system = config.get("system")
+    if not isinstance(key, str) or not key or not isinstance(system, str) or not system.strip():
+        raise ValueError("Each agent needs a non-empty \"key\" and \"system\" prompt.")
+    agent = {
+        "key": key,
+        "label": str(config.get("label") or key),
+        "focus": str(config.get("focus") or ""),
+        "description": str(config.get("description") or config.get("focus") or ""),
+        "system": system,
+    }
+    agent["prompt_hash"] = prompt_hash(system)
+    agent["messages_json"] = compile_messages(system)
+    return agent
+
+
+def _read_set_file(path: Path) -> Any:
+    if path.suffix == ".json":
+        return json.loads(path.read_text(encoding="utf-8"))
+    try:
+        import yaml
+    except ImportError as exc:
+        raise RuntimeError(f"{path} needs the 'pyyaml' package to load.") from exc
+    return yaml.safe_load(path.read_text(encoding="utf-8"))
+
+
+class AgentSet:
+    def __init__(self, name: str, configs: list[dict[str, Any]], source: str) -> None:
+        if not configs:
+            raise ValueError(f"Agent set {name!r} has no agents.")
+        self.name = name
+        self.source = source
+        self.agents = [compile_agent(config) for config in configs]
+        self.by_key = {agent["key"]: agent for agent in self.agents}
+        if len(self.by_key) != len(self.agents):
+            raise ValueError(f"Agent set {name!r} repeats an agent key.")
+        # Identifies the prompts of the whole set, e.g. for clients caching /api/agents.
+        self.version = hashlib.sha256(
+            "\n".join(f"{a['key']}:{a['prompt_hash']}" for a in self.agents).encode("utf-8")
+        ).hexdigest()[:16]
+
+    def select(self, keys: list[str] | None = None) -> list[dict[str, Any]]:
+        """The requested agents in the set's order; all of them when keys is None."""
+        if keys is None:
+            return self.agents
+        unknown = [key for key in keys if key not in self.by_key]
+        if unknown:
+            raise KeyError(", ".join(unknown))
+        wanted = set(keys)
+        return [agent for agent in self.agents if agent["key"] in wanted]
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "version": self.version,
+            "agents": [
+                {k: agent[k] for k in ("key", "label", "focus", "description", "prompt_hash")}
+                for agent in self.agents
+            ],
+        }
+
+
+class AgentRegistry:
+    """
+    Named agent sets, compiled once at startup: the built-in long and short
+    prompts plus any JSON/YAML sets in AGENT_SETS_DIR. The answer length of
+    a request names the set it uses.
+    """
+
+    def __init__(self, directory: str = AGENT_SETS_DIR) -> None:
+        self.directory = directory
+        self.sets: dict[str, AgentSet] = {}
+        self.load()
+
+    def load(self) -> None:
+        sets = {
+            "long": AgentSet("long", AGENT_CONFIGS, "prompts.py"),
+            "short": AgentSet("short", AGENT_CONFIGS_SHORT, "prompts_short.py"),
+        }
+        if self.directory:
+            for path in sorted(Path(self.directory).iterdir()):
+                if path.suffix.lower() not in _SET_EXTENSIONS:
+                    continue
+                data = _read_set_file(path)
+                configs = data.get("agents") if isinstance(data, dict) else data
+                if not isinstance(configs, list):
+                    raise ValueError(f"{path}: expected a list of agents or {{\"agents\": [...]}}.")
+                name = str(data.get("name") or path.stem) if isinstance(data, dict) else path.stem
+                sets[name] = AgentSet(name, configs, str(path))
+                logger.info("Loaded agent set %r (%d agents) from %s.", name, len(sets[name].agents), path)
+        self.sets = sets
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.sets)
+
+    def get(self, name: str) -> AgentSet:
+        return self.sets[name]
+
+    def describe(self) -> dict[str, Any]:
+        return {
+            "default": DEFAULT_AGENT_SET,
+            "sets": {name: agent_set.describe() for name, agent_set in self.sets.items()},
+        }
@@ -0,0 +1,169 @@
+import json
+import os
+import tempfile
+import time
+import zipfile
+from typing import Any
+
+from fastapi import HTTPException
+
+from backend.app.budget import TokenBudget
+from backend.app.uploads import PDF_MAGIC, PDF_MAGIC_WINDOW, UPLOAD_TMP_DIR
+
+BATCH_MAX_DOCUMENTS = int(os.getenv("BATCH_MAX_DOCUMENTS", "500"))
+BATCH_MAX_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+# Total decompressed size of the members of one ZIP upload.
+BATCH_MAX_EXPANDED_BYTES = int(os.getenv("BATCH_MAX_EXPANDED_BYTES", str(BATCH_MAX_BYTES)))
+# (document x agent) model calls a batch may have in flight at once.
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+
+TEXT_EXTENSIONS = {".txt", ".md"}
+JSONL_EXTENSIONS = {".jsonl", ".ndjson"}
+
+
+def _too_many() -> HTTPException:
+    return HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_DOCUMENTS} documents.")
+
+
+def parse_jsonl(data: bytes, source: str, max_chars: int | None = None) -> list[dict[str, Any]]:
+    """
+    Documents from JSON Lines: each line is either a string or an object
+    with "text" and an optional "id".
+    """
+    documents: list[dict[str, Any]] = []
+    for number, line in enumerate(data.decode("utf-8", errors="replace").splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as exc:
+            raise HTTPException(status_code=400, detail=f"{source}:{number}: invalid JSON.") from exc
+        documents.append(document_from_json(item, f"{source}:{number}", max_chars))
+    return documents
+
+
+def text_document(document_id: str, text: str, max_chars: int | None = None) -> dict[str, Any]:
+    """
+    A text document. Text over max_chars is dropped straight away and the
+    document carries the error instead, so it fails on its own without the
+    text being held for the rest of the batch.
+    """
+    if max_chars is not None and len(text) > max_chars and len(text.strip()) > max_chars:
+        return {"id": document_id, "error": f"Input is too long (over {max_chars} characters)."}
+    return {"id": document_id, "text": text}
+
+
+def document_from_json(item: Any, default_id: str, max_chars: int | None = None) -> dict[str, Any]:
+    if isinstance(item, str):
+        return text_document(default_id, item, max_chars)
+    if isinstance(item, dict) and isinstance(item.get("text"), str):
+        return text_document(str(item.get("id") or default_id), item["text"], max_chars)
+    raise HTTPException(status_code=400, detail=f"{default_id}: expected a string or an object with \"text\".")
+
+
+def _read_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, max_bytes: int, remaining: int) -> bytes:
+    # Bound the read rather than trusting the declared size in the archive.
+    with zf.open(info) as fh:
+        data = fh.read(min(max_bytes, remaining) + 1)
+    if len(data) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"{info.filename} is too large.")
+    if len(data) > remaining:
+        raise HTTPException(
+            status_code=413,
+            detail="ZIP archive expands to more than %dMB." % (BATCH_MAX_EXPANDED_BYTES // (1024 * 1024)),
+        )
+    return data
+
+
+def read_zip_documents(
+    path: str,
+    max_pdf_bytes: int,
+    max_text_chars: int,
+    max_expanded_bytes: int = BATCH_MAX_EXPANDED_BYTES,
+) -> list[dict[str, Any]]:
+    """
+    Documents from a ZIP archive of PDFs, text/markdown files and JSONL.
+    Members are decompressed against one budget of max_expanded_bytes.
+
+    PDF members are written to temp files ({"id", "pdf_path"}) for the
+    extraction pool; the caller owns (and must remove) them.
+    """
+    documents: list[dict[str, Any]] = []
+    remaining = max_expanded_bytes
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                name = info.filename
+                if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                    continue
+                ext = os.path.splitext(name)[1].lower()
+                if ext == ".pdf":
+                    data = _read_member(zf, info, max_pdf_bytes, remaining)
+                    if PDF_MAGIC not in data[:PDF_MAGIC_WINDOW]:
+                        raise HTTPException(status_code=400, detail=f"{name} is not a PDF.")
+                    tmp = tempfile.NamedTemporaryFile(prefix="batch-", suffix=".pdf", dir=UPLOAD_TMP_DIR, delete=False)
+                    with tmp:
+                        tmp.write(data)
+                    documents.append({"id": name, "pdf_path": tmp.name})
+                elif ext in TEXT_EXTENSIONS:
+                    # UTF-8 needs at most 4 bytes per character.
+                    data = _read_member(zf, info, max_text_chars * 4, remaining)
+                    documents.append(text_document(name, data.decode("utf-8", errors="replace"), max_text_chars))
+                elif ext in JSONL_EXTENSIONS:
+                    data = _read_member(zf, info, BATCH_MAX_BYTES, remaining)
+                    documents.extend(parse_jsonl(data, name, max_text_chars))
+                else:
+                    continue
+                remaining -= len(data)
+                if len(documents) > BATCH_MAX_DOCUMENTS:
+                    raise _too_many()
+    except zipfile.BadZipFile as exc:
+        raise HTTPException(status_code=400, detail="Uploaded ZIP archive is invalid.") from exc
+    except BaseException:
+        for document in documents:
+            if "pdf_path" in document:
+                os.unlink(document["pdf_path"])
+        raise
+    return documents
+
+
+class BatchStats:
+    """Throughput counters for one batch; token counts are estimates."""
+
+    def __init__(self, documents: int, budget: TokenBudget) -> None:
+        self.budget = budget
+        self.started = time.monotonic()
+        self.documents_total = documents
+        self.documents_done = 0
+        self.documents_failed = 0
+        self.calls_done = 0
+        self.calls_failed = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def record_call(self, text: str, result: dict[str, Any]) -> None:
+        self.calls_done += 1
+        self.input_tokens += self.budget.count(text)
+        if result["status"] == "ok":
+            self.output_tokens += self.budget.count(result["content"])
+        else:
+            self.calls_failed += 1
+
+    def record_document(self, failed: bool) -> None:
+        self.documents_done += 1
+        if failed:
+            self.documents_failed += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "documents_done": self.documents_done,
+            "documents_failed": self.documents_failed,
+            "documents_total": self.documents_total,
+            "elapsed_seconds": round(elapsed, 3),
+            "documents_per_minute": round(self.documents_done * 60 / elapsed, 2),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "tokens_per_second": round((self.input_tokens + self.output_tokens) / elapsed, 1),
+            "output_tokens_per_second": round(self.output_tokens / elapsed, 1),
+        }
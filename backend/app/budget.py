@@ -0,0 +1,144 @@
+import logging
+import math
+import os
+import re
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Calibrated for Gemma-family tokenizers on English prose (~4 chars/token).
+CHARS_PER_TOKEN = float(os.getenv("CHARS_PER_TOKEN", "4.0"))
+MODEL_TOKENIZER_FILE = os.getenv("MODEL_TOKENIZER_FILE", "").strip()
+# Max tokens of document text sent in a single agent call.
+MODEL_INPUT_TOKEN_BUDGET = int(os.getenv("MODEL_INPUT_TOKEN_BUDGET", "24000"))
+MAX_ANALYSIS_CHUNKS = int(os.getenv("MAX_ANALYSIS_CHUNKS", "16"))
+
+_HEADING_RE = re.compile(
+    r"^(?:#{1,6}\s+\S.*"  # markdown heading
+    r"|\d+(?:\.\d+)*\.?\s+[A-Z].{0,78}"  # "2.1 Methods"
+    r"|[A-Z][A-Z0-9 ,&:'\-]{3,79})$"  # "RESULTS AND DISCUSSION"
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _load_tokenizer() -> Any:
+    if not MODEL_TOKENIZER_FILE:
+        return None
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        logger.warning("MODEL_TOKENIZER_FILE is set but the 'tokenizers' package is not installed.")
+        return None
+    return Tokenizer.from_file(MODEL_TOKENIZER_FILE)
+
+
+class TokenBudget:
+    """
+    Estimates prompt sizes and splits oversized documents into section-aware
+    chunks that each fit the per-call input budget.
+
+    Uses a local tokenizer when MODEL_TOKENIZER_FILE points at a
+    tokenizer.json (and `tokenizers` is installed), otherwise a calibrated
+    characters-per-token estimate.
+    """
+
+    def __init__(
+        self,
+        input_token_budget: int = MODEL_INPUT_TOKEN_BUDGET,
+        chars_per_token: float = CHARS_PER_TOKEN,
+        max_chunks: int = MAX_ANALYSIS_CHUNKS,
+        tokenizer: Any = None,
+    ) -> None:
+        self.input_token_budget = input_token_budget
+        self.chars_per_token = chars_per_token
+        self.max_chunks = max(1, max_chunks)
+        self.tokenizer = tokenizer if tokenizer is not None else _load_tokenizer()
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text).ids)
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def fits(self, text: str) -> bool:
+        # Cheap bound first, only for the estimate: with chars_per_token >= 1
+        # it never counts more tokens than characters. A real tokenizer can
+        # (byte-fallback pieces for non-Latin text, special tokens), so it counts.
+        if self.tokenizer is None and self.chars_per_token >= 1 and len(text) <= self.input_token_budget:
+            return True
+        return self.count(text) <= self.input_token_budget
+
+    def _chunk_tokens(self, total_tokens: int) -> int:
+        # Spread the text evenly over as few chunks as possible, growing the
+        # chunk size if needed so there are never more than max_chunks.
+        chunks = min(self.max_chunks, max(1, math.ceil(total_tokens / self.input_token_budget)))
+        return math.ceil(total_tokens / chunks)
+
+    def _split_oversized(self, block: str, max_tokens: int) -> list[str]:
+        pieces: list[str] = []
+        current: list[str] = []
+        current_tokens = 0
+        for sentence in _SENTENCE_END_RE.split(block):
+            tokens = self.count(sentence)
+            if tokens > max_tokens:
+                # A single "sentence" longer than the budget: hard split.
+                step = max(1, int(max_tokens * self.chars_per_token))
+                pieces.extend(sentence[i:i + step] for i in range(0, len(sentence), step))
+                continue
+            if current and current_tokens + tokens > max_tokens:
+                pieces.append(" ".join(current))
+                current, current_tokens = [], 0
+            current.append(sentence)
+            current_tokens += tokens
+        if current:
+            pieces.append(" ".join(current))
+        return pieces
+
+    def split(self, text: str) -> list[str]:
+        """
+        Split `text` into chunks at line boundaries, preferring to start a new
+        chunk at a section heading once the current chunk is half full.
+        Works line by line because PDF text often has no blank lines between
+        paragraphs.
+        """
+        if self.fits(text):
+            return [text]
+
+        max_tokens = self._chunk_tokens(self.count(text))
+        chunks: list[str] = []
+        current: list[str] = []
+        current_tokens = 0
+
+        def flush() -> None:
+            nonlocal current, current_tokens
+            chunk = "\n".join(current).strip()
+            if chunk:
+                chunks.append(chunk)
+            current, current_tokens = [], 0
+
+        for line in text.split("\n"):
+            # +1 for the newline joining it to the previous line.
+            tokens = self.count(line) + 1
+            if _HEADING_RE.match(line.strip()) and current_tokens >= max_tokens // 2:
+                flush()
+            if tokens > max_tokens:
+                flush()
+                chunks.extend(self._split_oversized(line, max_tokens))
+                continue
+            if current and current_tokens + tokens > max_tokens:
+                flush()
+            current.append(line)
+            current_tokens += tokens
+        flush()
+
+        # Heading-aligned breaks can leave a few small chunks; merge the
+        # smallest neighbours so the map fan-out stays within max_chunks.
+        while len(chunks) > self.max_chunks:
+            sizes = [len(chunks[i]) + len(chunks[i + 1]) for i in range(len(chunks) - 1)]
+            i = sizes.index(min(sizes))
+            chunks[i:i + 2] = [chunks[i] + "\n\n" + chunks[i + 1]]
+        return chunks
+
+    def plan(self, text: str) -> dict[str, Any]:
+        tokens = self.count(text)
+        chunks = 1 if tokens <= self.input_token_budget else len(self.split(text))
+        return {"estimated_tokens": tokens, "chunks": chunks}
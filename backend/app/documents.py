@@ -0,0 +1,59 @@
+import os
+import re
+from typing import Any
+
+from backend.app.result_cache import MemoryLRUBackend, text_hash
+
+DOCUMENT_STORE_MAX_ENTRIES = int(os.getenv("DOCUMENT_STORE_MAX_ENTRIES", "256"))
+DOCUMENT_STORE_MAX_BYTES = int(os.getenv("DOCUMENT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+DOCUMENT_TTL_SECONDS = float(os.getenv("DOCUMENT_TTL_SECONDS", "3600"))
+
+_DOCUMENT_ID_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def is_document_id(value: str) -> bool:
+    return bool(_DOCUMENT_ID_RE.match(value))
+
+
+class DocumentStore:
+    """
+    Cleaned document text held between per-agent requests, keyed by its
+    SHA-256 so submitting the same document again returns the same handle.
+
+    Documents live in this process only. Behind several workers, per-agent
+    requests either need sticky sessions or resubmit on a 404.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DOCUMENT_STORE_MAX_ENTRIES,
+        max_bytes: int = DOCUMENT_STORE_MAX_BYTES,
+        ttl_seconds: float = DOCUMENT_TTL_SECONDS,
+    ) -> None:
+        self.backend = MemoryLRUBackend(max_entries, max_bytes, ttl_seconds)
+        self.stores = 0
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, text: str) -> str:
+        document_id = text_hash(text)
+        # Storing again refreshes the TTL of a document that is still in use.
+        self.backend.set(document_id, text)
+        self.stores += 1
+        return document_id
+
+    def get(self, document_id: str) -> str | None:
+        text = self.backend.get(document_id) if is_document_id(document_id) else None
+        if text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return text
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **self.backend.stats(),
+            "stores": self.stores,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
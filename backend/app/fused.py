@@ -0,0 +1,34 @@
+import re
+from typing import Any
+
+from backend.app.prompts import FUSED_SECTION, FUSED_SYSTEM_PREAMBLE
+
+AGENT_MODES = ("separate", "fused")
+
+_SECTION_RE = re.compile(r"^[ \t]*<<<BEGIN ([\w-]+)>>>[ \t]*\n(.*?)\n[ \t]*<<<END \1>>>[ \t]*$", re.M | re.S)
+
+
+def fused_agent(agent_configs: list[dict[str, Any]]) -> dict[str, Any]:
+    """One agent config whose prompt asks for every agent's analysis in delimited sections."""
+    keys = [agent["key"] for agent in agent_configs]
+    system = FUSED_SYSTEM_PREAMBLE.format(count=len(keys), keys=", ".join(keys)) + "".join(
+        FUSED_SECTION.format(label=agent.get("label", agent["key"]), key=agent["key"], system=agent["system"])
+        for agent in agent_configs
+    )
+    return {"key": "fused:" + ",".join(keys), "label": "Fused", "focus": "", "system": system}
+
+
+def parse_fused_output(content: str, agent_configs: list[dict[str, Any]]) -> dict[str, str] | None:
+    """
+    Split a fused generation back into per-agent analyses. Returns None when
+    any agent's section is missing or empty, so the caller can fall back.
+    """
+    sections: dict[str, str] = {}
+    for match in _SECTION_RE.finditer(content or ""):
+        key, body = match.group(1), match.group(2).strip()
+        if body and key not in sections:
+            sections[key] = body
+    parsed = {agent["key"]: sections.get(agent["key"], "") for agent in agent_configs}
+    if not all(parsed.values()):
+        return None
+    return parsed
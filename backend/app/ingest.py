@@ -0,0 +1,189 @@
+import re
+
+BACK_MATTER_MARKERS = [
+    "references",
+    "bibliography",
+    "reference list",
+    "works cited",
+    "literature cited",
+    "citations",
+    "appendix",
+    "appendices",
+    "supplementary material",
+    "supplementary materials",
+    "supplement",
+    "acknowledgement",
+    "acknowledgements",
+]
+
+# One alternation over every marker as a heading at the start of a line,
+# e.g. "\nreferences\n", "\nreferences:\n", "\nappendix a\n". A marker must
+# be followed by a non-word character (or the end of the text), so at most
+# one marker can match at any position.
+_BACK_MATTER_RE = re.compile(
+    r"\n(" + "|".join(re.escape(m) for m in BACK_MATTER_MARKERS) + r")(?:\b|[ :])"
+)
+
+# Documents shorter than this are never cut.
+MIN_CUT_CHARS = 5000
+# Cut points must lie past this fraction of the document, to skip "References"
+# in a table of contents.
+CUT_THRESHOLD = 0.45
+
+
+def normalize_whitespace(t: str) -> str:
+    """
+    Same result as re.sub(r"[ \t]+", " ") then re.sub(r"\n{3,}", "\n\n"),
+    using C-level str.replace passes that are skipped entirely for text that
+    is already clean, instead of a regex scan over every character.
+    """
+    if "\r" in t:
+        t = t.replace("\r\n", "\n").replace("\r", "\n")
+    if "\t" in t:
+        t = t.replace("\t", " ")
+    # Each pass halves every run of spaces / shortens every run of newlines.
+    while "  " in t:
+        t = t.replace("  ", " ")
+    while "\n\n\n" in t:
+        t = t.replace("\n\n\n", "\n\n")
+    return t
+
+
+def find_back_matter_cut(lower: str, threshold: int) -> int | None:
+    """
+    Position of the earliest marker whose *first* heading occurrence lies at
+    or after `threshold`, found in a single left-to-right scan.
+
+    A marker first seen before the threshold (e.g. in a Table of Contents) is
+    disqualified, matching the original per-marker `search` semantics.
+    """
+    seen: set[str] = set()
+    for m in _BACK_MATTER_RE.finditer(lower):
+        marker = m.group(1)
+        if marker in seen:
+            continue
+        if m.start() >= threshold:
+            return m.start()
+        seen.add(marker)
+    return None
+
+
+def reduce_academic_text(text: str) -> str:
+    """
+    Heuristically remove common academic back-matter (References/Bibliography/Appendix/etc.)
+    to reduce token/character load before LLM analysis.
+
+    Heuristic safeguards:
+    - Only cut if the marker occurs after a threshold of the document (to avoid TOC hits).
+    - Prefer the earliest qualifying marker among candidates.
+    """
+    if not text:
+        return ""
+
+    t = text
+
+    # Normalize whitespace (helps pattern matching and reduces noise)
+    t = normalize_whitespace(t).strip()
+
+    # Case-insensitive via lower() as before; indices come from the lowered copy.
+    lower = t.lower()
+    n = len(lower)
+    if n < MIN_CUT_CHARS:
+        # very short docs: do not cut
+        return t
+
+    # Only consider cut points that appear in the latter part of the document.
+    # This avoids false positives from "References" in Table of Contents.
+    threshold = int(CUT_THRESHOLD * n)
+
+    best_cut = find_back_matter_cut(lower, threshold)
+
+    if best_cut is not None:
+        # t is already normalized, so slicing cannot create new blank-line runs.
+        t = t[:best_cut].strip()
+    return t
+
+
+# Rescanned behind the end of the text on each page, for a heading that
+# only matches once the next page arrives.
+_MARKER_SPAN = max(len(m) for m in BACK_MATTER_MARKERS) + 4
+
+
+class PageTrimmer:
+    """
+    Builds the reduced text of a PDF one page at a time and says when the
+    remaining pages are not needed: once a back-matter heading lies past
+    the cut threshold, or once the text is over `max_chars` (the request
+    fails as too long whatever follows).
+
+    The document's length is not known before its last page, so the
+    threshold is taken from the length so far, extrapolated over the page
+    count. When every page is read, text() equals reduce_academic_text() of
+    the joined pages.
+    """
+
+    def __init__(self, max_chars: int) -> None:
+        self.max_chars = max_chars
+        self._text = ""
+        self._pages = 0
+        self._ends_with_cr = False
+        # Leading whitespace that strip() will remove; positions below are
+        # relative to the start of the normalized, unstripped text.
+        self._lead = 0
+        self._scanned = 0
+        self._first: dict[str, int] = {}
+        self._cut: int | None = None
+        self.stop_reason: str | None = None
+
+    def _append(self, page: str) -> None:
+        if not self._pages:
+            self._text = normalize_whitespace(page)
+            return
+        # In normalized text only a run of newlines can continue across the
+        # "\n" that joins pages, and such runs are at most two long, so
+        # renormalizing the last two characters is enough. A page ending in
+        # "\r" already turned into the newline the join would add.
+        joiner = "" if self._ends_with_cr else "\n"
+        self._text = self._text[:-2] + normalize_whitespace(self._text[-2:] + joiner + page)
+
+    def _scan(self) -> None:
+        """Record the first heading position of each marker in the new text."""
+        if self._lead == self._scanned:
+            self._lead = len(self._text) - len(self._text.lstrip())
+        start = max(self._lead, self._scanned - _MARKER_SPAN)
+        for m in _BACK_MATTER_RE.finditer(self._text.lower() if not start else self._text[start:].lower()):
+            self._first.setdefault(m.group(1), start + m.start())
+        self._scanned = len(self._text)
+
+    def add(self, page: str, page_count: int) -> bool:
+        """Append the next page; returns False when no more pages are needed."""
+        self._append(page)
+        self._ends_with_cr = page.endswith("\r")
+        self._pages += 1
+        self._scan()
+        if self._pages >= page_count:
+            return True
+
+        n = len(self._text) - self._lead
+        estimated = n * page_count / self._pages
+        threshold = int(CUT_THRESHOLD * estimated)
+        if estimated >= MIN_CUT_CHARS:
+            # Same rule as find_back_matter_cut: the earliest marker whose
+            # first heading lies past the threshold.
+            cuts = [pos - self._lead for pos in self._first.values() if pos - self._lead >= threshold]
+            if cuts:
+                self._cut = min(cuts)
+                self.stop_reason = "back_matter"
+                return False
+        if n > self.max_chars and len(self._text.strip()) > self.max_chars:
+            self.stop_reason = "max_chars"
+            return False
+        return True
+
+    def text(self) -> str:
+        if self.stop_reason is None:
+            return reduce_academic_text(self._text)
+        text = self._text.strip()
+        if self._cut is not None:
+            text = text[: self._cut].strip()
+        return text
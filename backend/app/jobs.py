@@ -0,0 +1,221 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "jobs.sqlite3")
+JOBS_TTL_SECONDS = float(os.getenv("JOBS_TTL_SECONDS", str(24 * 3600)))
+JOBS_MAX_ACTIVE = int(os.getenv("JOBS_MAX_ACTIVE", "32"))
+# A worker whose heartbeat is older than this is gone; its active jobs fail.
+JOBS_OWNER_TIMEOUT_SECONDS = float(os.getenv("JOBS_OWNER_TIMEOUT_SECONDS", "30"))
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+def new_job_id() -> str:
+    return uuid.uuid4().hex
+
+
+class JobStore:
+    """
+    SQLite record of background analysis jobs and their per-agent results,
+    so finished generations survive the submitting client disconnecting.
+
+    Jobs run inside the worker process that accepted them, and several
+    workers may share one database. Each records its jobs under its own owner
+    id and keeps a heartbeat; recover() fails active jobs whose owner has
+    stopped beating (or shut down), never those of a live worker.
+    """
+
+    def __init__(
+        self,
+        path: str = JOBS_DB_PATH,
+        ttl_seconds: float = JOBS_TTL_SECONDS,
+        owner_timeout: float = JOBS_OWNER_TIMEOUT_SECONDS,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.owner_timeout = owner_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def heartbeat_interval(self) -> float:
+        return self.owner_timeout / 3
+
+    def start(self) -> None:
+        """Open the database, register this worker and recover orphaned jobs."""
+        if self._conn is not None:
+            return
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " answer_length TEXT NOT NULL,"
+            " meta TEXT NOT NULL,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " owner TEXT)"
+        )
+        # Databases created before jobs had owners: their jobs count as orphaned.
+        if "owner" not in [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]:
+            conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_owners ("
+            " id TEXT PRIMARY KEY,"
+            " heartbeat_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " job_id TEXT NOT NULL,"
+            " position INTEGER NOT NULL,"
+            " agent TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " content TEXT,"
+            " message TEXT,"
+            " PRIMARY KEY (job_id, agent))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs (created_at)")
+        conn.commit()
+        with self._lock:
+            self._conn = conn
+        self.heartbeat()
+
+    def heartbeat(self) -> int:
+        """Mark this worker alive, then recover() jobs of workers that are not."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO job_owners (id, heartbeat_at) VALUES (?, ?)"
+                " ON CONFLICT (id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+                (self.owner, time.time()),
+            )
+            self._conn.commit()
+        return self.recover()
+
+    def recover(self) -> int:
+        """Fail active jobs whose owner is gone; returns how many."""
+        now = time.time()
+        message = "Interrupted by a server restart."
+        with self._lock:
+            self._conn.execute("DELETE FROM job_owners WHERE heartbeat_at < ?", (now - self.owner_timeout,))
+            orphaned = [
+                job_id
+                for (job_id,) in self._conn.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?)"
+                    " AND (owner IS NULL OR owner NOT IN (SELECT id FROM job_owners))",
+                    ACTIVE_STATUSES,
+                )
+            ]
+            for job_id in orphaned:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                    (message, now, job_id),
+                )
+                self._conn.execute(
+                    "UPDATE job_results SET status = 'error', message = ? WHERE job_id = ? AND status = 'pending'",
+                    (message, job_id),
+                )
+            self._conn.commit()
+        return len(orphaned)
+
+    def create(self, job_id: str, answer_length: str, agent_keys: list[str], meta: dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            expired = now - self.ttl_seconds
+            self._conn.execute(
+                "DELETE FROM job_results WHERE job_id IN (SELECT id FROM jobs WHERE created_at < ?)", (expired,)
+            )
+            self._conn.execute("DELETE FROM jobs WHERE created_at < ?", (expired,))
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, answer_length, meta, created_at, updated_at, owner)"
+                " VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+                (job_id, answer_length, json.dumps(meta), now, now, self.owner),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_results (job_id, position, agent, status) VALUES (?, ?, ?, 'pending')",
+                [(job_id, position, key) for position, key in enumerate(agent_keys)],
+            )
+            self._conn.commit()
+
+    def set_status(self, job_id: str, status: str, error: str | None = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def set_result(self, job_id: str, agent_key: str, result: dict[str, Any]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE job_results SET status = ?, content = ?, message = ? WHERE job_id = ? AND agent = ?",
+                (result["status"], result.get("content"), result.get("message"), job_id, agent_key),
+            )
+            self._conn.execute("UPDATE jobs SET updated_at = ? WHERE id = ?", (time.time(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, answer_length, meta, error, created_at, updated_at FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            results = self._conn.execute(
+                "SELECT agent, status, content, message FROM job_results WHERE job_id = ? ORDER BY position",
+                (job_id,),
+            ).fetchall()
+
+        status, answer_length, meta, error, created_at, updated_at = row
+        analysis: dict[str, Any] = {}
+        for agent, agent_status, content, message in results:
+            if agent_status == "ok":
+                analysis[agent] = {"status": "ok", "content": content}
+            elif agent_status == "error":
+                analysis[agent] = {"status": "error", "message": message}
+            else:
+                analysis[agent] = {"status": agent_status}
+        job = {
+            "job_id": job_id,
+            "status": status,
+            "answer_length": answer_length,
+            "analysis": analysis,
+            "meta": json.loads(meta),
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+        if error:
+            job["error"] = error
+        return job
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is None:
+                return
+            # A clean shutdown has already failed its own jobs; others need
+            # not wait out the timeout to see this worker is gone.
+            self._conn.execute("DELETE FROM job_owners WHERE id = ?", (self.owner,))
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            owners = self._conn.execute("SELECT COUNT(*) FROM job_owners").fetchone()[0]
+        return {
+            "path": self.path,
+            "ttl_seconds": self.ttl_seconds,
+            "owner": self.owner,
+            "owners": owners,
+            "jobs": counts,
+        }
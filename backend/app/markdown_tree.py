@@ -0,0 +1,177 @@
+import re
+from typing import Any
+
+# Agent output is parsed once into a list of blocks:
+#   {"type": "heading", "level": 1-6, "spans": [...]}
+#   {"type": "paragraph", "spans": [...]}
+#   {"type": "list", "items": [{"level": 0.., "spans": [...]}, ...]}
+# A span is a plain string, or [text, marks] where marks is a string of
+# "b" (bold), "i" (italic) and "c" (code), e.g. ["sample size", "b"].
+BLOCK_TYPES = ("heading", "paragraph", "list")
+SPAN_MARKS = "bic"
+MAX_LIST_LEVEL = 16
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET_RE = re.compile(r"^(\s*)([-*])\s+(.*)$")
+_CODE_RE = re.compile(r"`([^`]+)`")
+_BOLD_RE = re.compile(r"\*\*([^*]+)\*\*")
+_ITALIC_RE = re.compile(r"(?<!\*)\*([^*]+)\*(?!\*)")
+
+
+def parse_inline(text: str) -> list[Any]:
+    """
+    Split text into spans for **bold**, *italic* and `code`. Code is literal;
+    bold and italic may span code and each other, as in the old rendering.
+    """
+    if "*" not in text and "`" not in text:
+        return [text] if text else []
+
+    # Depth changes per position: +1 where a mark (or hidden delimiter)
+    # starts, -1 where it ends, swept once from left to right.
+    changes: dict[int, dict[str, int]] = {}
+
+    def cover(start: int, end: int, mark: str) -> None:
+        for pos, step in ((start, 1), (end, -1)):
+            at = changes.setdefault(pos, {})
+            at[mark] = at.get(mark, 0) + step
+
+    # Matched delimiters and code are masked so later patterns neither match
+    # inside code nor see delimiters that were already used.
+    masked = text
+    for pattern, mark, width in ((_CODE_RE, "c", 1), (_BOLD_RE, "b", 2), (_ITALIC_RE, "i", 1)):
+        pieces = []
+        last = 0
+        for m in pattern.finditer(masked):
+            start, end = m.span()
+            inner = masked[start + width : end - width] if mark != "c" else "\x00" * (end - start - 2 * width)
+            pieces += [masked[last:start], "\x01" * width, inner, "\x01" * width]
+            last = end
+            cover(start + width, end - width, mark)
+            cover(start, start + width, "hidden")
+            cover(end - width, end, "hidden")
+        masked = "".join(pieces) + masked[last:]
+
+    depth = dict.fromkeys((*SPAN_MARKS, "hidden"), 0)
+    bounds = sorted({0, len(text), *changes})
+    spans: list[Any] = []
+    current = None
+    for start, end in zip(bounds, bounds[1:]):
+        for mark, step in changes.get(start, {}).items():
+            depth[mark] += step
+        if depth["hidden"]:
+            continue
+        marks = "".join(mark for mark in SPAN_MARKS if depth[mark])
+        chunk = text[start:end]
+        if spans and marks == current:
+            spans[-1] = spans[-1] + chunk if not marks else [spans[-1][0] + chunk, marks]
+        else:
+            spans.append(chunk if not marks else [chunk, marks])
+        current = marks
+    return spans
+
+
+def parse_markdown(text: str) -> list[dict[str, Any]]:
+    """
+    Parse agent markdown into blocks: headings, paragraphs (wrapped lines
+    reflowed) and bullet lists nested by indent. A line directly after a
+    bullet continues that item.
+    """
+    blocks: list[dict[str, Any]] = []
+    paragraph: list[str] = []
+    items: list[dict[str, Any]] = []
+    item_lines: list[str] = []
+
+    def flush_paragraph() -> None:
+        joined = " ".join(paragraph).strip()
+        if joined:
+            blocks.append({"type": "paragraph", "spans": parse_inline(joined)})
+        paragraph.clear()
+
+    def flush_item() -> None:
+        if item_lines:
+            items[-1]["spans"] = parse_inline(" ".join(item_lines).strip())
+            item_lines.clear()
+
+    def flush_list() -> None:
+        nonlocal items
+        flush_item()
+        if items:
+            blocks.append({"type": "list", "items": items})
+            items = []
+
+    for raw in (text or "").splitlines():
+        line = raw.rstrip()
+        stripped = line.strip()
+        if not stripped:
+            flush_paragraph()
+            flush_list()
+            continue
+
+        m = _HEADING_RE.match(stripped)
+        if m:
+            flush_paragraph()
+            flush_list()
+            blocks.append({"type": "heading", "level": len(m.group(1)), "spans": parse_inline(m.group(2).strip())})
+            continue
+
+        m = _BULLET_RE.match(line)
+        if m:
+            flush_paragraph()
+            flush_item()
+            items.append({"level": min(len(m.group(1)) // 2, MAX_LIST_LEVEL), "spans": []})
+            item_lines.append(m.group(3).strip())
+            continue
+
+        if item_lines:
+            item_lines.append(stripped)
+        else:
+            paragraph.append(stripped)
+
+    flush_paragraph()
+    flush_list()
+    return blocks
+
+
+def _is_spans(value: Any) -> bool:
+    if not isinstance(value, list):
+        return False
+    for span in value:
+        if isinstance(span, str):
+            continue
+        if not (
+            isinstance(span, list)
+            and len(span) == 2
+            and isinstance(span[0], str)
+            and isinstance(span[1], str)
+            and all(mark in SPAN_MARKS for mark in span[1])
+        ):
+            return False
+    return True
+
+
+def is_section_tree(value: Any) -> bool:
+    """True when value has the shape parse_markdown() returns."""
+    if not isinstance(value, list):
+        return False
+    for block in value:
+        if not isinstance(block, dict):
+            return False
+        kind = block.get("type")
+        if kind == "heading":
+            level = block.get("level")
+            if not (isinstance(level, int) and 1 <= level <= 6 and _is_spans(block.get("spans"))):
+                return False
+        elif kind == "paragraph":
+            if not _is_spans(block.get("spans")):
+                return False
+        elif kind == "list":
+            items = block.get("items")
+            if not isinstance(items, list):
+                return False
+            for item in items:
+                level = item.get("level") if isinstance(item, dict) else None
+                if not (isinstance(level, int) and 0 <= level <= MAX_LIST_LEVEL and _is_spans(item.get("spans"))):
+                    return False
+        else:
+            return False
+    return True
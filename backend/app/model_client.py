@@ -0,0 +1,176 @@
+import logging
+import os
+from collections.abc import AsyncIterator, Callable
+from typing import Any
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MODEL_POOL_MAX_CONNECTIONS = int(os.getenv("MODEL_POOL_MAX_CONNECTIONS", "20"))
+MODEL_POOL_MAX_KEEPALIVE = int(os.getenv("MODEL_POOL_MAX_KEEPALIVE", "10"))
+MODEL_POOL_KEEPALIVE_EXPIRY = float(os.getenv("MODEL_POOL_KEEPALIVE_EXPIRY", "30"))
+MODEL_HTTP2 = os.getenv("MODEL_HTTP2", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """A response body that calls `release` once, when it is closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]) -> None:
+        self._stream = stream
+        self._release: Callable[[], None] | None = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    """
+    Wraps the pooled transport to count in-flight requests and how many of them
+    had to wait because every pooled connection was busy. A request stays in
+    flight until its response is closed, since a streamed body keeps its
+    connection busy long after the headers arrive.
+    """
+
+    def __init__(self, transport: httpx.AsyncHTTPTransport, max_connections: int) -> None:
+        self._transport = transport
+        self._max_connections = max_connections
+        self.in_flight = 0
+        self.requests_total = 0
+        self.waits_total = 0
+
+    @property
+    def pool(self) -> Any:
+        return self._transport._pool
+
+    def _pool_saturated(self) -> bool:
+        connections = list(self.pool.connections)
+        if len(connections) < self._max_connections:
+            return False
+        return not any(c.is_available() for c in connections)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests_total += 1
+        if self._pool_saturated():
+            self.waits_total += 1
+        self.in_flight += 1
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        response.stream = _ReleasingStream(response.stream, self._release)
+        return response
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class ModelClient:
+    """
+    Owns the single pooled httpx.AsyncClient used for all model API calls.
+
+    Started and closed by the app lifespan so connections (and TLS sessions)
+    to GEMMA_API_URL are kept alive and reused across requests.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = MODEL_POOL_MAX_CONNECTIONS,
+        max_keepalive: int = MODEL_POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = MODEL_POOL_KEEPALIVE_EXPIRY,
+        http2: bool = MODEL_HTTP2,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_keepalive = min(max_keepalive, max_connections)
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+        # What start() actually uses: HTTP/2 needs the optional h2 package.
+        self.http2_active = http2 and _http2_available()
+        self._client: httpx.AsyncClient | None = None
+        self._transport: _CountingTransport | None = None
+
+    def start(self) -> None:
+        if self._client is not None:
+            return
+        if self.http2 and not self.http2_active:
+            logger.warning("MODEL_HTTP2 is enabled but the 'h2' package is not installed; using HTTP/1.1.")
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        self._transport = _CountingTransport(
+            httpx.AsyncHTTPTransport(limits=limits, http2=self.http2_active),
+            self.max_connections,
+        )
+        self._client = httpx.AsyncClient(transport=self._transport)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._transport = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Lazily start so code paths outside the lifespan (scripts, TestClient
+        # without a context manager) still get a pooled client.
+        if self._client is None:
+            self.start()
+        assert self._client is not None
+        return self._client
+
+    def stats(self) -> dict[str, Any]:
+        stats: dict[str, Any] = {
+            "started": self._client is not None,
+            "http2": self.http2_active,
+            "http2_requested": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive,
+            "keepalive_expiry": self.keepalive_expiry,
+            "connections": 0,
+            "in_use": 0,
+            "idle": 0,
+            "queued": 0,
+            "in_flight": 0,
+            "requests_total": 0,
+            "waits_total": 0,
+        }
+        if self._transport is None:
+            return stats
+
+        pool = self._transport.pool
+        connections = list(pool.connections)
+        idle = sum(1 for c in connections if c.is_idle())
+        stats.update(
+            connections=len(connections),
+            in_use=len(connections) - idle,
+            idle=idle,
+            queued=sum(1 for r in list(getattr(pool, "_requests", [])) if r.is_queued()),
+            in_flight=self._transport.in_flight,
+            requests_total=self._transport.requests_total,
+            waits_total=self._transport.waits_total,
+        )
+        return stats
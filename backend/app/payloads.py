@@ -0,0 +1,71 @@
+import json
+from typing import Any
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, Response
+
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+
+def _load_msgpack() -> Any:
+    try:
+        import msgpack
+    except ImportError:
+        return None
+    return msgpack
+
+
+_msgpack = _load_msgpack()
+
+
+def msgpack_available() -> bool:
+    return _msgpack is not None
+
+
+def _accepts_msgpack(request: Request) -> bool:
+    for part in request.headers.get("accept", "").split(","):
+        media_type, _, params = part.strip().partition(";")
+        if media_type.strip().lower() != MSGPACK_MEDIA_TYPE:
+            continue
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def negotiated_response(
+    request: Request,
+    data: Any,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    JSON, or MessagePack when the client asks for it with
+    `Accept: application/x-msgpack` and the msgpack package is installed.
+    """
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if _msgpack is not None and _accepts_msgpack(request):
+        return Response(_msgpack.packb(data), status_code=status_code, media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+    return JSONResponse(data, status_code=status_code, headers=headers)
+
+
+async def read_payload(request: Request) -> Any:
+    """Decode a JSON or MessagePack request body."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    body = await request.body()
+    if content_type == MSGPACK_MEDIA_TYPE:
+        if _msgpack is None:
+            raise HTTPException(status_code=415, detail="MessagePack bodies are not supported by this server.")
+        try:
+            return _msgpack.unpackb(body)
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail="Invalid MessagePack body.") from exc
+    try:
+        return json.loads(body)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail="Invalid JSON body.") from exc
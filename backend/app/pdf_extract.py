@@ -0,0 +1,230 @@
+import asyncio
+import logging
+import mmap
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable
+
+from pypdf import PdfReader
+
+from backend.app.result_cache import MemoryLRUBackend
+
+logger = logging.getLogger(__name__)
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_EXTRACT_TIMEOUT = float(os.getenv("PDF_EXTRACT_TIMEOUT", "60"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+# Extracted page text, keyed by (upload SHA-256, page index); 0 disables.
+PDF_PAGE_CACHE_MAX_BYTES = int(os.getenv("PDF_PAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+PDF_PAGE_CACHE_TTL_SECONDS = float(os.getenv("PDF_PAGE_CACHE_TTL_SECONDS", "3600"))
+_PAGE_CACHE_MAX_ENTRIES = 100_000
+
+
+class PdfExtractionTimeout(Exception):
+    pass
+
+
+def _open_pdf(path: str) -> tuple[PdfReader, mmap.mmap]:
+    # Memory-map the upload so every worker shares the page cache copy
+    # instead of reading (or receiving over IPC) its own copy of the bytes.
+    with open(path, "rb") as fh:
+        mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    return PdfReader(mapped), mapped
+
+
+def _count_pages(path: str) -> int:
+    reader, mapped = _open_pdf(path)
+    try:
+        return len(reader.pages)
+    finally:
+        mapped.close()
+
+
+def _extract_page_range(path: str, start: int, stop: int) -> list[tuple[str, float]]:
+    """Worker entry point: (text, seconds) for each page in [start, stop)."""
+    reader, mapped = _open_pdf(path)
+    try:
+        pages: list[tuple[str, float]] = []
+        for index in range(start, stop):
+            t0 = time.perf_counter()
+            text = reader.pages[index].extract_text() or ""
+            pages.append((text, time.perf_counter() - t0))
+        return pages
+    finally:
+        mapped.close()
+
+
+def _page_ranges(page_count: int, pages_per_task: int) -> list[tuple[int, int]]:
+    step = max(1, pages_per_task)
+    return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+
+class PdfExtractor:
+    """
+    Runs pypdf text extraction in a bounded process pool so large uploads
+    never block the event loop. Documents are split into page ranges that
+    are extracted in parallel and handed over in page order.
+
+    Ranges are submitted a few at a time ahead of the pages being consumed,
+    so a caller that needs no more pages (on_page returns False) stops the
+    extraction of the rest. Page text is cached by upload hash and page
+    index, so the same PDF uploaded again is not parsed at all.
+    """
+
+    def __init__(
+        self,
+        workers: int = PDF_EXTRACT_WORKERS,
+        timeout: float = PDF_EXTRACT_TIMEOUT,
+        pages_per_task: int = PDF_PAGES_PER_TASK,
+        page_cache_max_bytes: int = PDF_PAGE_CACHE_MAX_BYTES,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.pages_per_task = pages_per_task
+        self._pool: Executor | None = None
+        self.page_cache = MemoryLRUBackend(_PAGE_CACHE_MAX_ENTRIES, page_cache_max_bytes, PDF_PAGE_CACHE_TTL_SECONDS)
+        self.documents_total = 0
+        self.pages_total = 0
+        self.pages_cached_total = 0
+        self.pages_skipped_total = 0
+        self.timeouts_total = 0
+
+    def start(self) -> None:
+        if self._pool is None:
+            # spawn: workers only import this module, never the app or its threads.
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            # Spawn workers now rather than on the first upload.
+            self._pool.submit(os.getpid)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            self.start()
+        assert self._pool is not None
+        return self._pool
+
+    def _cache_pages(self, file_hash: str, start: int, future: Future) -> None:
+        # Runs when a range finishes, even one the caller stopped waiting for.
+        if future.cancelled() or future.exception() is not None:
+            return
+        for index, (text, _) in enumerate(future.result(), start=start):
+            self.page_cache.set(f"{file_hash}:{index}", text)
+
+    async def _extract(
+        self,
+        path: str,
+        file_hash: str | None,
+        on_page: Callable[[str, int], bool] | None,
+    ) -> tuple[str, dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        cached_count = self.page_cache.get(f"{file_hash}:pages") if file_hash else None
+        if cached_count is not None:
+            page_count = int(cached_count)
+        else:
+            page_count = await loop.run_in_executor(self.pool, _count_pages, path)
+            if file_hash:
+                self.page_cache.set(f"{file_hash}:pages", str(page_count))
+
+        ranges = deque(_page_ranges(page_count, self.pages_per_task))
+        in_flight: deque[tuple[list[str | None], Future | None]] = deque()
+
+        def submit() -> None:
+            start, stop = ranges.popleft()
+            texts = [self.page_cache.get(f"{file_hash}:{i}") if file_hash else None for i in range(start, stop)]
+            future = None
+            if any(text is None for text in texts):
+                future = self.pool.submit(_extract_page_range, path, start, stop)
+                if file_hash:
+                    future.add_done_callback(partial(self._cache_pages, file_hash, start))
+            in_flight.append((texts, future))
+
+        pages: list[tuple[str, float]] = []
+        cached = 0
+        stopped = False
+        try:
+            while (ranges or in_flight) and not stopped:
+                # Two ranges per worker: one running and one queued behind it.
+                while ranges and len(in_flight) < 2 * self.workers:
+                    submit()
+                texts, future = in_flight.popleft()
+                if future is None:
+                    page_range = [(text or "", 0.0) for text in texts]
+                else:
+                    page_range = await asyncio.wrap_future(future)
+                for text, seconds in page_range:
+                    pages.append((text, seconds))
+                    cached += future is None
+                    if on_page is not None and not on_page(text, page_count):
+                        stopped = True
+                        break
+        finally:
+            for _, future in in_flight:
+                if future is not None:
+                    future.cancel()
+
+        timing = {
+            "pages": page_count,
+            "pages_read": len(pages),
+            "pages_cached": cached,
+            "extract_seconds": round(time.perf_counter() - started, 4),
+            "page_seconds": [round(seconds, 4) for _, seconds in pages],
+        }
+        return "\n".join(text for text, _ in pages).strip(), timing
+
+    async def extract(
+        self,
+        path: str,
+        file_hash: str | None = None,
+        on_page: Callable[[str, int], bool] | None = None,
+    ) -> tuple[str, dict[str, Any]]:
+        """
+        Return the text of the PDF at `path` and per-page extraction timing.
+        `on_page(text, page_count)` is called for each page in order; once it
+        returns False no further pages are extracted. Passing the upload's
+        `file_hash` enables the page cache.
+        """
+        try:
+            text, timing = await asyncio.wait_for(self._extract(path, file_hash, on_page), self.timeout)
+        except asyncio.TimeoutError as exc:
+            self.timeouts_total += 1
+            raise PdfExtractionTimeout(f"PDF text extraction exceeded {self.timeout:g}s.") from exc
+
+        self.documents_total += 1
+        self.pages_total += timing["pages_read"]
+        self.pages_cached_total += timing["pages_cached"]
+        self.pages_skipped_total += timing["pages"] - timing["pages_read"]
+        logger.info(
+            "Extracted %d/%d PDF pages (%d cached) in %.3fs (slowest page %.3fs)",
+            timing["pages_read"],
+            timing["pages"],
+            timing["pages_cached"],
+            timing["extract_seconds"],
+            max(timing["page_seconds"], default=0.0),
+        )
+        return text, timing
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "timeout": self.timeout,
+            "pages_per_task": self.pages_per_task,
+            "documents_total": self.documents_total,
+            "pages_total": self.pages_total,
+            "pages_cached_total": self.pages_cached_total,
+            "pages_skipped_total": self.pages_skipped_total,
+            "page_cache": self.page_cache.stats(),
+            "timeouts_total": self.timeouts_total,
+        }
@@ -0,0 +1,82 @@
+import json
+import os
+from typing import Any
+
+# system_first: agent instructions as the system message, document as the
+#   user message (the original layout).
+# document_first: one shared system message and the document first, agent
+#   instructions after it, so the four agent calls for a document share a
+#   long common prefix that vLLM/TGI-style prefix caches can reuse.
+PROMPT_LAYOUT = os.getenv("PROMPT_LAYOUT", "system_first").strip().lower()
+# Mark the stable prefix with cache_control hints for providers that honour them.
+PROMPT_CACHE_CONTROL = os.getenv("PROMPT_CACHE_CONTROL", "").strip().lower() in {"1", "true", "yes"}
+
+PROMPT_LAYOUTS = ("system_first", "document_first")
+if PROMPT_LAYOUT not in PROMPT_LAYOUTS:
+    raise ValueError(f"Unknown PROMPT_LAYOUT: {PROMPT_LAYOUT!r}")
+
+DOCUMENT_FIRST_SYSTEM = (
+    "You are one of several expert critical-thinking analysts reviewing the same document. "
+    "The document comes first; your role, lens and output format follow it. "
+    "Follow those instructions exactly."
+)
+DOCUMENT_HEADER = "DOCUMENT TO ANALYZE\n<<<\n"
+INSTRUCTIONS_HEADER = "\n>>>\n\nYOUR ROLE AND INSTRUCTIONS\n"
+
+
+def _text_part(text: str, cache: bool) -> dict[str, Any]:
+    part: dict[str, Any] = {"type": "text", "text": text}
+    if cache:
+        part["cache_control"] = {"type": "ephemeral"}
+    return part
+
+
+def build_messages(
+    system: str,
+    text: str,
+    layout: str = PROMPT_LAYOUT,
+    cache_control: bool = PROMPT_CACHE_CONTROL,
+) -> list[dict[str, Any]]:
+    if layout == "document_first":
+        document = DOCUMENT_HEADER + text
+        instructions = INSTRUCTIONS_HEADER + system
+        if cache_control:
+            user_content: Any = [_text_part(document, True), _text_part(instructions, False)]
+        else:
+            user_content = document + instructions
+        return [
+            {"role": "system", "content": DOCUMENT_FIRST_SYSTEM},
+            {"role": "user", "content": user_content},
+        ]
+
+    system_content: Any = [_text_part(system, True)] if cache_control else system
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": text},
+    ]
+
+
+
+# Placeholder for the document while a prompt is pre-serialized. JSON escapes
+# the NULs, so it cannot collide with anything in a system prompt.
+_TEXT_SLOT = "\x00document\x00"
+_ENCODED_TEXT_SLOT = json.dumps(_TEXT_SLOT)[1:-1]
+
+
+def compile_messages(
+    system: str,
+    layout: str = PROMPT_LAYOUT,
+    cache_control: bool = PROMPT_CACHE_CONTROL,
+) -> tuple[str, str]:
+    """
+    Serialize build_messages() once per agent, as the JSON text before and
+    after the document's (escaped) place in it.
+    """
+    encoded = json.dumps(build_messages(system, _TEXT_SLOT, layout, cache_control))
+    before, after = encoded.split(_ENCODED_TEXT_SLOT)
+    return before, after
+
+
+def encode_messages(compiled: tuple[str, str], text: str) -> str:
+    """JSON for the messages list: equal to json.dumps(build_messages(...))."""
+    return compiled[0] + json.dumps(text)[1:-1] + compiled[1]
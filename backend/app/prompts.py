@@ -3,6 +3,7 @@ AGENT_CONFIGS = [
         "key": "science",
         "label": "Science",
         "focus": "scientific feasibility and uncertainty",
+        "description": "Feasibility & uncertainty",
         "system": (
             "You are the Science Agent: an expert in scientific reasoning, uncertainty, causality, and feasibility.\n\n"
             "TASK\n"
@@ -48,6 +49,7 @@ AGENT_CONFIGS = [
         "key": "economics",
         "label": "Economics",
         "focus": "incentives, costs/benefits, and externalities",
+        "description": "Incentives & externalities",
         "system": (
             "You are the Economics Agent: a seasoned economist specializing in incentives, trade-offs, externalities, and equilibrium effects.\n\n"
             "TASK\n"
@@ -98,6 +100,7 @@ AGENT_CONFIGS = [
         "key": "sociology",
         "label": "Sociology/Humanities",
         "focus": "social context, norms, and inequality",
+        "description": "Social context & inequality",
         "system": (
             "You are the Sociology/Humanities Agent: an expert in social context, institutions, culture, identity, power, and inequality.\n\n"
             "TASK\n"
@@ -148,6 +151,7 @@ AGENT_CONFIGS = [
         "key": "ethics",
         "label": "Ethics",
         "focus": "rights, justice, and moral reasoning",
+        "description": "Rights & justice",
         "system": (
             "You are the Ethics Agent: a moral philosopher and applied ethicist focusing on rights, justice, harm, autonomy, and fairness.\n\n"
             "TASK\n"
@@ -196,3 +200,36 @@ AGENT_CONFIGS = [
     },
 ]
 
+
+# Map/reduce prompts used when a document exceeds the per-call input budget.
+# The map pass condenses each chunk from the agent's perspective; the reduce
+# pass feeds the combined notes to the agent's normal system prompt.
+CHUNK_NOTES_SYSTEM = (
+    "You are the {label} Agent, reading one part of a longer document that is too long to analyze at once. "
+    "Your lens: {focus}.\n\n"
+    "TASK\n"
+    "Extract concise analytical notes from THIS PART ONLY, to be merged with notes from the other parts.\n\n"
+    "OUTPUT FORMAT (STRICT)\n"
+    "Markdown bullets only, at most 15 bullets, no headings. Cover: claims made, evidence offered, "
+    "assumptions, key concepts, and gaps or weaknesses relevant to your lens. "
+    "Quote exact figures or definitions when they matter. Do not write a final evaluation.\n"
+)
+
+CHUNK_REDUCE_PREAMBLE = (
+    "The document was too long to analyze in one pass, so it was split into {count} consecutive parts. "
+    "Below are analytical notes taken from each part, in document order. "
+    "Treat them as the full content of the document and produce your complete analysis.\n"
+)
+
+FUSED_SYSTEM_PREAMBLE = (
+    "You are a panel of {count} expert agents analyzing the same user argument, each from a different perspective. "
+    "Write every perspective's analysis independently, as if the others did not exist.\n\n"
+    "OUTPUT FORMAT (STRICT)\n"
+    "Write the analyses in exactly this order: {keys}. "
+    "Start each one with a line containing only <<<BEGIN key>>> and end it with a line containing only <<<END key>>>, "
+    "where key is the perspective key shown in its heading below. "
+    "Between the markers, follow that perspective's own instructions and output format exactly. "
+    "Write nothing outside the markers.\n"
+)
+
+FUSED_SECTION = "\n=== PERSPECTIVE: {label} (key: {key}) ===\n{system}\n"
@@ -3,6 +3,7 @@ AGENT_CONFIGS_SHORT = [
         "key": "science",
         "label": "Science",
         "focus": "scientific feasibility and uncertainty",
+        "description": "Feasibility & uncertainty",
         "system": (
             "You are the Science Agent: an expert in scientific reasoning, uncertainty, and causal inference.\n\n"
             "TASK\n"
@@ -41,6 +42,7 @@ AGENT_CONFIGS_SHORT = [
         "key": "economics",
         "label": "Economics",
         "focus": "incentives, costs/benefits, and externalities",
+        "description": "Incentives & externalities",
         "system": (
             "You are the Economics Agent: a seasoned economist focusing on incentives, trade-offs, externalities, and second-order effects.\n\n"
             "TASK\n"
@@ -78,6 +80,7 @@ AGENT_CONFIGS_SHORT = [
         "key": "sociology",
         "label": "Sociology/Humanities",
         "focus": "social context, norms, and inequality",
+        "description": "Social context & inequality",
         "system": (
             "You are the Sociology/Humanities Agent: an expert in social context, institutions, culture, power, and inequality.\n\n"
             "TASK\n"
@@ -114,6 +117,7 @@ AGENT_CONFIGS_SHORT = [
         "key": "ethics",
         "label": "Ethics",
         "focus": "rights, justice, and moral reasoning",
+        "description": "Rights & justice",
         "system": (
             "You are the Ethics Agent: a moral philosopher and applied ethicist focusing on rights, justice, harm, autonomy, and accountability.\n\n"
             "TASK\n"
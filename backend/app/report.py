@@ -0,0 +1,401 @@
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import LETTER
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    HRFlowable,
+    KeepTogether,
+    ListFlowable,
+    ListItem,
+    PageBreak,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+from backend.app.markdown_tree import parse_inline, parse_markdown
+from backend.app.metrics import record_stage
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_MAX_QUEUE = int(os.getenv("REPORT_MAX_QUEUE", "16"))
+REPORT_TIMEOUT = float(os.getenv("REPORT_TIMEOUT", "60"))
+# Bump when the rendered layout changes so cached reports are not reused.
+REPORT_LAYOUT_VERSION = 2
+
+_INK = colors.HexColor("#111827")
+_MUTED = colors.HexColor("#6B7280")
+_RULE_COLOR = colors.HexColor("#E5E7EB")
+
+
+def _build_styles() -> Mapping[str, ParagraphStyle]:
+    base = getSampleStyleSheet()
+    body = ParagraphStyle(
+        "CTBody",
+        parent=base["BodyText"],
+        fontName="Helvetica",
+        fontSize=10.5,
+        leading=14,
+        spaceAfter=8,
+    )
+    return MappingProxyType({
+        "body": body,
+        "h1": ParagraphStyle(
+            "CTH1",
+            parent=base["Heading1"],
+            fontName="Helvetica-Bold",
+            fontSize=16,
+            leading=20,
+            spaceBefore=12,
+            spaceAfter=8,
+            textColor=_INK,
+        ),
+        "h2": ParagraphStyle(
+            "CTH2",
+            parent=base["Heading2"],
+            fontName="Helvetica-Bold",
+            fontSize=13,
+            leading=16,
+            spaceBefore=12,
+            spaceAfter=6,
+            textColor=_INK,
+        ),
+        "h3": ParagraphStyle(
+            "CTH3",
+            parent=base["Heading3"],
+            fontName="Helvetica-Bold",
+            fontSize=11.5,
+            leading=14,
+            spaceBefore=10,
+            spaceAfter=4,
+            textColor=_INK,
+        ),
+        "bullet": ParagraphStyle(
+            "CTBullet",
+            parent=body,
+            leftIndent=18,
+            firstLineIndent=-8,
+            spaceAfter=4,
+        ),
+        "card": base["BodyText"],
+        "title": ParagraphStyle(
+            "CTTitle",
+            parent=base["Title"],
+            fontName="Helvetica-Bold",
+            fontSize=22,
+            leading=26,
+            textColor=_INK,
+            spaceAfter=10,
+        ),
+        "subtitle": ParagraphStyle(
+            "CTSubtitle",
+            parent=base["BodyText"],
+            fontName="Helvetica",
+            fontSize=11,
+            leading=14,
+            textColor=colors.HexColor("#374151"),
+            spaceAfter=18,
+        ),
+        "meta": ParagraphStyle(
+            "CTMeta",
+            parent=base["BodyText"],
+            fontName="Helvetica",
+            fontSize=9.5,
+            leading=12,
+            textColor=_MUTED,
+            spaceAfter=6,
+        ),
+    })
+
+
+# Built once per process and shared by every report; treat as read-only.
+STYLES = _build_styles()
+
+_CARD_TABLE_STYLE = TableStyle([
+    ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#F3F4F6")),
+    ("BOX", (0, 0), (-1, -1), 0.6, _RULE_COLOR),
+    ("INNERPADDING", (0, 0), (-1, -1), 10),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+])
+
+
+@lru_cache(maxsize=32)
+def _bullet_style(level: int) -> ParagraphStyle:
+    left_indent = 18 + level * 10
+    return ParagraphStyle(f"CTBullet_{left_indent}", parent=STYLES["bullet"], leftIndent=left_indent)
+
+_MARK_TAGS = (("c", '<font face="Courier">', "</font>"), ("b", "<b>", "</b>"), ("i", "<i>", "</i>"))
+
+
+def _spans_to_rl(spans: list[Any]) -> str:
+    """Render parsed inline spans as ReportLab's Paragraph markup (HTML-ish)."""
+    out = []
+    for span in spans:
+        text, marks = (span, "") if isinstance(span, str) else span
+        # Escape basic XML chars first
+        text = text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+        for mark, open_tag, close_tag in _MARK_TAGS:
+            if mark in marks:
+                text = f"{open_tag}{text}{close_tag}"
+        out.append(text)
+    return "".join(out)
+
+
+def _md_inline_to_rl(text: str) -> str:
+    """
+    Convert a small, safe subset of Markdown inline formatting to ReportLab's
+    Paragraph markup: **bold**, *italic*, `code`.
+    """
+    return _spans_to_rl(parse_inline(text)) if text else ""
+
+
+def _tree_to_flowables(blocks: list[dict[str, Any]]) -> list[Any]:
+    """
+    Convert a parsed section tree (see markdown_tree) into flowables:
+    headings, paragraphs and bullet lists.
+    """
+    heading_styles = (STYLES["h1"], STYLES["h2"], STYLES["h3"])
+    out: list[Any] = []
+    for block in blocks:
+        kind = block["type"]
+        if kind == "heading":
+            style = heading_styles[min(block["level"], 3) - 1]
+            out.append(Paragraph(_spans_to_rl(block["spans"]), style))
+        elif kind == "paragraph":
+            out.append(Paragraph(_spans_to_rl(block["spans"]), STYLES["body"]))
+        elif kind == "list":
+            items = [
+                ListItem(Paragraph(_spans_to_rl(item["spans"]), _bullet_style(item["level"])))
+                for item in block["items"]
+            ]
+            out.append(ListFlowable(items, bulletType="bullet", leftIndent=14))
+    return out
+
+
+def _markdown_to_flowables(markdown_text: str) -> list[Any]:
+    return _tree_to_flowables(parse_markdown(markdown_text))
+
+
+def _draw_header_footer(canvas, doc):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 9)
+    canvas.setFillColor(_MUTED)
+
+    # Footer: page number
+    page_num = canvas.getPageNumber()
+    canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, 0.55 * inch, f"Page {page_num}")
+
+    # Subtle footer line
+    canvas.setStrokeColor(_RULE_COLOR)
+    canvas.setLineWidth(0.5)
+    canvas.line(doc.leftMargin, 0.75 * inch, doc.pagesize[0] - doc.rightMargin, 0.75 * inch)
+
+    canvas.restoreState()
+
+
+def _agent_header_card(agent: dict[str, Any]) -> Table:
+    """
+    A simple 'card' with agent label + focus.
+    """
+    label = agent.get("label", "Agent")
+    focus = agent.get("focus", "")
+
+    data = [
+        [Paragraph(f"<b>{_md_inline_to_rl(label)} Agent</b>", STYLES["card"]),
+         Paragraph(_md_inline_to_rl(focus), STYLES["card"])]
+    ]
+    t = Table(data, colWidths=[2.1 * inch, 4.9 * inch])
+    t.setStyle(_CARD_TABLE_STYLE)
+    return t
+
+
+def _build_pdf(analysis: dict[str, Any], agent_configs: list[dict[str, Any]]) -> bytes:
+    buffer = io.BytesIO()
+
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=LETTER,
+        leftMargin=0.85 * inch,
+        rightMargin=0.85 * inch,
+        topMargin=0.9 * inch,
+        bottomMargin=0.9 * inch,
+        title="Critical Thinking Analysis Report",
+        author="Critical Thinker",
+    )
+
+    title_style = STYLES["title"]
+    subtitle_style = STYLES["subtitle"]
+    meta_style = STYLES["meta"]
+
+    story: list[Any] = []
+
+    # --- Cover page ---
+    story.append(Paragraph("Critical Thinking Analysis Report", title_style))
+    story.append(Paragraph(datetime.utcnow().strftime("Generated on %B %d, %Y"), subtitle_style))
+
+    # quick index of sections
+    section_list = "<br/>".join([f"• {a.get('label','Agent')} Agent" for a in agent_configs])
+    story.append(Paragraph(f"<b>Sections</b><br/>{section_list}", meta_style))
+
+    story.append(Spacer(1, 16))
+    story.append(Paragraph(
+        "This report compiles independent analyses from multiple agents using Paul & Elder’s critical thinking framework. "
+        "Each section is self-contained and may be read independently.",
+        subtitle_style
+    ))
+
+    story.append(PageBreak())
+
+    # --- Agent sections ---
+    for idx, agent in enumerate(agent_configs):
+        key = agent["key"]
+        block = analysis.get(key, {}) if isinstance(analysis, dict) else {}
+        sections = block.get("sections")
+        content = block.get("content") or "Analysis unavailable."
+
+        # section header card + divider
+        story.append(KeepTogether([
+            _agent_header_card(agent),
+            Spacer(1, 10),
+            HRFlowable(width="100%", thickness=0.7, color=_RULE_COLOR),
+            Spacer(1, 10),
+        ]))
+
+        # render the parsed sections, or the markdown when only that was sent
+        if sections:
+            story.extend(_tree_to_flowables(sections))
+        else:
+            story.extend(_markdown_to_flowables(content))
+
+        # page break between agents (but not after last)
+        if idx < len(agent_configs) - 1:
+            story.append(PageBreak())
+
+    doc.build(story, onFirstPage=_draw_header_footer, onLaterPages=_draw_header_footer)
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
+
+
+def build_report(analysis: dict[str, Any], agent_configs: list[dict[str, Any]]) -> tuple[bytes, float]:
+    """Worker entry point: the rendered PDF and the seconds spent building it."""
+    t0 = time.perf_counter()
+    pdf_bytes = _build_pdf(analysis, agent_configs)
+    return pdf_bytes, time.perf_counter() - t0
+
+
+class ReportBusy(Exception):
+    pass
+
+
+class ReportTimeout(Exception):
+    pass
+
+
+class ReportRenderer:
+    """
+    Builds PDF reports in a bounded process pool so ReportLab layout never
+    blocks the event loop. At most `workers` builds run at once and at most
+    `max_queue` more wait; beyond that, renders are rejected with ReportBusy.
+    """
+
+    def __init__(
+        self,
+        workers: int = REPORT_WORKERS,
+        max_queue: int = REPORT_MAX_QUEUE,
+        timeout: float = REPORT_TIMEOUT,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._pool: Executor | None = None
+        self._pending = 0
+        self.builds_total = 0
+        self.failures_total = 0
+        self.timeouts_total = 0
+        self.rejected_total = 0
+        self.build_seconds_total = 0.0
+        self.build_seconds_max = 0.0
+        self.queue_seconds_total = 0.0
+        self.bytes_total = 0
+
+    def start(self) -> None:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self._pool.submit(os.getpid)
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            self.start()
+        assert self._pool is not None
+        return self._pool
+
+    async def render(self, analysis: dict[str, Any], agent_configs: list[dict[str, Any]]) -> bytes:
+        if self._pending >= self.workers + self.max_queue:
+            self.rejected_total += 1
+            raise ReportBusy("Report generation is busy. Please try again shortly.")
+
+        self._pending += 1
+        started = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(self.pool, build_report, analysis, agent_configs)
+        try:
+            pdf_bytes, build_seconds = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError as exc:
+            # The worker cannot be interrupted; it finishes in the background.
+            self.timeouts_total += 1
+            raise ReportTimeout(f"Report generation exceeded {self.timeout:g}s.") from exc
+        except Exception:
+            self.failures_total += 1
+            raise
+        finally:
+            self._pending -= 1
+
+        elapsed = time.perf_counter() - started
+        queue_seconds = max(0.0, elapsed - build_seconds)
+        record_stage("report_queue", queue_seconds)
+        record_stage("report_build", build_seconds)
+        self.builds_total += 1
+        self.build_seconds_total += build_seconds
+        self.build_seconds_max = max(self.build_seconds_max, build_seconds)
+        self.queue_seconds_total += queue_seconds
+        self.bytes_total += len(pdf_bytes)
+        return pdf_bytes
+
+    def stats(self) -> dict[str, Any]:
+        builds = self.builds_total
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "timeout": self.timeout,
+            "pending": self._pending,
+            "builds_total": builds,
+            "failures_total": self.failures_total,
+            "timeouts_total": self.timeouts_total,
+            "rejected_total": self.rejected_total,
+            "build_seconds_total": round(self.build_seconds_total, 3),
+            "build_seconds_avg": round(self.build_seconds_total / builds, 3) if builds else 0.0,
+            "build_seconds_max": round(self.build_seconds_max, 3),
+            "queue_seconds_total": round(self.queue_seconds_total, 3),
+            "bytes_total": self.bytes_total,
+        }
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any
+
+from backend.app.report import REPORT_LAYOUT_VERSION
+from backend.app.result_cache import agent_fingerprint
+
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "report_cache")
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_REPORT_ID_LENGTH = 64
+
+
+def report_cache_key(analysis: dict[str, Any], answer_length: str, agent_configs: list[dict[str, Any]]) -> str:
+    """
+    Content hash of everything a rendered report depends on: the parsed
+    sections for each configured agent, the answer length, the agent configs
+    (key, prompt hash, label, focus) and the report layout version.
+    """
+    sections = []
+    for agent in agent_configs:
+        block = analysis.get(agent["key"])
+        tree = block.get("sections") if isinstance(block, dict) else None
+        sections.append([
+            agent_fingerprint(agent),
+            agent.get("label", ""),
+            agent.get("focus", ""),
+            tree or [],
+        ])
+    canonical = json.dumps(
+        [REPORT_LAYOUT_VERSION, answer_length, sections],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_report_id(value: str) -> bool:
+    return len(value) == _REPORT_ID_LENGTH and all(c in "0123456789abcdef" for c in value)
+
+
+class ReportCache:
+    """
+    Rendered PDFs on disk, one file per report id, evicted least recently
+    used once the directory exceeds `max_bytes`.
+
+    Recency is kept in file mtimes so the LRU order survives restarts.
+    Disk I/O runs in a worker thread so the event loop never blocks.
+    """
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: OrderedDict[str, int] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if self.enabled:
+            os.makedirs(directory, exist_ok=True)
+            self._load_index()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def _load_index(self) -> None:
+        entries = []
+        for entry in os.scandir(self.directory):
+            key, ext = os.path.splitext(entry.name)
+            if ext == ".pdf" and is_report_id(key):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, key, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._bytes += size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._index and self._bytes > self.max_bytes:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._index
+
+    def _get(self, key: str) -> bytes | None:
+        with self._lock:
+            if key not in self._index:
+                return None
+            try:
+                with open(self._path(key), "rb") as fh:
+                    data = fh.read()
+            except FileNotFoundError:
+                self._bytes -= self._index.pop(key)
+                return None
+            self._index.move_to_end(key)
+            os.utime(self._path(key))
+            return data
+
+    def _set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._bytes -= self._index.pop(key, 0)
+            self._index[key] = len(data)
+            self._bytes += len(data)
+            self._evict()
+
+    async def get(self, key: str) -> bytes | None:
+        if not self.enabled:
+            return None
+        data = await asyncio.to_thread(self._get, key)
+        if data is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return data
+
+    async def set(self, key: str, data: bytes) -> None:
+        if not self.enabled:
+            return
+        await asyncio.to_thread(self._set, key, data)
+        self.stores += 1
+
+    def stats(self) -> dict[str, Any]:
+        if not self.enabled:
+            return {"enabled": False}
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "directory": self.directory,
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
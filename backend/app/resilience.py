@@ -0,0 +1,209 @@
+import asyncio
+import email.utils
+import math
+import os
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+MODEL_MAX_ATTEMPTS = int(os.getenv("MODEL_MAX_ATTEMPTS", "3"))
+MODEL_BACKOFF_BASE = float(os.getenv("MODEL_BACKOFF_BASE", "0.5"))
+MODEL_BACKOFF_MAX = float(os.getenv("MODEL_BACKOFF_MAX", "8"))
+MODEL_ATTEMPT_TIMEOUT = float(os.getenv("MODEL_ATTEMPT_TIMEOUT", "120"))
+MODEL_HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "0"))
+MODEL_HEDGE_MIN_SAMPLES = int(os.getenv("MODEL_HEDGE_MIN_SAMPLES", "20"))
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "300"))
+
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class ModelAPIError(RuntimeError):
+    """A failed model API attempt; status_code is None for transport errors."""
+
+    def __init__(self, message: str, status_code: int | None = None, retry_after: float | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status_code is None or self.status_code in RETRYABLE_STATUS
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given either as seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class Deadline:
+    """An absolute deadline shared by every agent call of one analysis."""
+
+    def __init__(self, seconds: float = ANALYSIS_DEADLINE_SECONDS) -> None:
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class LatencyTracker:
+    """Recent successful call latencies, per agent key."""
+
+    def __init__(self, window: int = 200) -> None:
+        self._window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def observe(self, key: str, seconds: float) -> None:
+        self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, key: str, pct: float, min_samples: int = 1) -> float | None:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+        return ordered[idx]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            key: {
+                "samples": len(samples),
+                "p50": round(self.percentile(key, 50) or 0.0, 3),
+                "p95": round(self.percentile(key, 95) or 0.0, 3),
+            }
+            for key, samples in self._samples.items()
+        }
+
+
+class RetryPolicy:
+    """
+    Retries with exponential backoff and full jitter, honoring Retry-After,
+    plus an optional hedged duplicate attempt once an agent's latency
+    exceeds its recent `hedge_percentile`.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = MODEL_MAX_ATTEMPTS,
+        backoff_base: float = MODEL_BACKOFF_BASE,
+        backoff_max: float = MODEL_BACKOFF_MAX,
+        attempt_timeout: float = MODEL_ATTEMPT_TIMEOUT,
+        hedge_percentile: float = MODEL_HEDGE_PERCENTILE,
+        hedge_min_samples: int = MODEL_HEDGE_MIN_SAMPLES,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        rand: Callable[[], float] = random.random,
+    ) -> None:
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.attempt_timeout = attempt_timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._sleep = sleep
+        self._rand = rand
+        self.latency = LatencyTracker()
+        self.retries_total = 0
+        self.hedges_total = 0
+        self.hedge_wins_total = 0
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        delay = self._rand() * min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def _hedge_delay(self, key: str) -> float | None:
+        if self.hedge_percentile <= 0:
+            return None
+        return self.latency.percentile(key, self.hedge_percentile, self.hedge_min_samples)
+
+    async def _attempt(
+        self,
+        key: str,
+        attempt: Callable[[float], Awaitable[T]],
+        deadline: Deadline,
+        can_hedge: Callable[[], bool],
+    ) -> T:
+        timeout = min(self.attempt_timeout, deadline.remaining())
+        if timeout <= 0:
+            raise ModelAPIError("Analysis deadline exceeded.", status_code=504)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(attempt(timeout))
+        tasks = {primary}
+        try:
+            hedge_delay = self._hedge_delay(key)
+            if hedge_delay is not None and hedge_delay < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done and can_hedge():
+                    self.hedges_total += 1
+                    tasks.add(asyncio.ensure_future(attempt(max(0.0, timeout - hedge_delay))))
+
+            last_exc: BaseException | None = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    exc = task.exception()
+                    if exc is None:
+                        if task is not primary:
+                            self.hedge_wins_total += 1
+                        self.latency.observe(key, time.monotonic() - started)
+                        return task.result()
+                    last_exc = exc
+            assert last_exc is not None
+            raise last_exc
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(
+        self,
+        key: str,
+        attempt: Callable[[float], Awaitable[T]],
+        deadline: Deadline,
+        can_hedge: Callable[[], bool] = lambda: True,
+    ) -> T:
+        """
+        Run `attempt(timeout)` until it succeeds, the error is not retryable,
+        attempts are exhausted, or the shared deadline would be overrun.
+        """
+        for attempt_no in range(self.max_attempts):
+            try:
+                return await self._attempt(key, attempt, deadline, can_hedge)
+            except ModelAPIError as exc:
+                if not exc.retryable or attempt_no == self.max_attempts - 1:
+                    raise
+                delay = self.backoff(attempt_no, exc.retry_after)
+                if delay >= deadline.remaining():
+                    raise
+                self.retries_total += 1
+                await self._sleep(delay)
+        raise ModelAPIError("Model API retries exhausted.")
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "max_attempts": self.max_attempts,
+            "hedge_percentile": self.hedge_percentile,
+            "retries_total": self.retries_total,
+            "hedges_total": self.hedges_total,
+            "hedge_wins_total": self.hedge_wins_total,
+            "latency": self.latency.stats(),
+        }
@@ -0,0 +1,208 @@
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from collections.abc import Hashable
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "8"))
+UPSTREAM_MAX_QUEUE = int(os.getenv("UPSTREAM_MAX_QUEUE", "64"))
+# Slots low-priority (prefetch) calls may hold at once, so interactive work
+# arriving later never finds every slot busy with speculative generations.
+UPSTREAM_LOW_PRIORITY_MAX = int(os.getenv("UPSTREAM_LOW_PRIORITY_MAX", str(max(1, UPSTREAM_MAX_CONCURRENCY // 2))))
+_PROMOTED_KEYS_MAX = 1024
+
+
+class SchedulerOverloaded(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("The analysis service is busy. Please try again shortly.")
+        self.retry_after = retry_after
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+class UpstreamScheduler:
+    """
+    Bounds concurrent model API calls and queues the excess fairly.
+
+    Waiters are grouped per client and served round-robin, so one client
+    submitting a burst cannot starve everyone else. When the queue is full,
+    new work is rejected with SchedulerOverloaded instead of piling up.
+
+    Low-priority calls (prefetches) wait in a separate queue that is only
+    served when no normal call is waiting, and hold at most
+    `low_priority_max` slots. A queued low-priority call can be promoted
+    by its key when a user asks for that result directly.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = UPSTREAM_MAX_CONCURRENCY,
+        max_queue: int = UPSTREAM_MAX_QUEUE,
+        low_priority_max: int = UPSTREAM_LOW_PRIORITY_MAX,
+    ) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.low_priority_max = max(1, low_priority_max)
+        self._active = 0
+        self._queued = 0
+        self._queues: OrderedDict[str, deque[asyncio.Future[bool]]] = OrderedDict()
+        self._low_active = 0
+        self._low_queue: OrderedDict[asyncio.Future[bool], tuple[str, Hashable]] = OrderedDict()
+        # Recently promoted keys, so later calls of a promoted prefetch (the
+        # reduce step after its chunk notes) are not queued as low again.
+        self._promoted: OrderedDict[Hashable, None] = OrderedDict()
+        self.promoted_total = 0
+        self._recent_waits: deque[float] = deque(maxlen=512)
+        self._recent_service: deque[float] = deque(maxlen=128)
+        self.granted_total = 0
+        self.rejected_total = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def retry_after(self) -> int:
+        service = sum(self._recent_service) / len(self._recent_service) if self._recent_service else 10.0
+        return max(1, math.ceil(service * (self._queued + 1) / self.max_concurrency))
+
+    def has_capacity(self) -> bool:
+        return self._active < self.max_concurrency and not self._queues
+
+    def ensure_capacity(self, slots: int = 1) -> None:
+        """Reject up front when `slots` more waiters would overflow the queue."""
+        free = self.max_concurrency - self._active
+        if self._queued + slots - max(0, free) > self.max_queue:
+            self.rejected_total += 1
+            raise SchedulerOverloaded(self.retry_after())
+
+    def _can_grant_low(self) -> bool:
+        return self._active < self.max_concurrency and not self._queues and self._low_active < self.low_priority_max
+
+    def _grant_next(self) -> None:
+        while self._active < self.max_concurrency and self._queues:
+            client_id, waiters = next(iter(self._queues.items()))
+            waiter = waiters.popleft()
+            self._queued -= 1
+            # Rotate this client to the back so other clients go next.
+            if waiters:
+                self._queues.move_to_end(client_id)
+            else:
+                del self._queues[client_id]
+            if waiter.done():
+                continue
+            self._active += 1
+            waiter.set_result(False)
+        while self._low_queue and self._can_grant_low():
+            waiter, _ = self._low_queue.popitem(last=False)
+            if waiter.done():
+                continue
+            self._active += 1
+            self._low_active += 1
+            waiter.set_result(True)
+
+    def _remove_waiter(self, client_id: str, waiter: "asyncio.Future[bool]") -> None:
+        if self._low_queue.pop(waiter, None) is not None:
+            return
+        waiters = self._queues.get(client_id)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        self._queued -= 1
+        if not waiters:
+            del self._queues[client_id]
+
+    def promote(self, key: Hashable) -> int:
+        """Move queued low-priority calls with this key to the normal queue."""
+        self._promoted[key] = None
+        self._promoted.move_to_end(key)
+        while len(self._promoted) > _PROMOTED_KEYS_MAX:
+            self._promoted.popitem(last=False)
+        waiters = [(waiter, client_id) for waiter, (client_id, k) in self._low_queue.items() if k == key]
+        for waiter, client_id in waiters:
+            del self._low_queue[waiter]
+            self._queues.setdefault(client_id, deque()).append(waiter)
+            self._queued += 1
+        if waiters:
+            self.promoted_total += len(waiters)
+            self._grant_next()
+        return len(waiters)
+
+    async def _acquire(self, client_id: str, low_priority_key: Hashable | None = None) -> bool:
+        """Wait for a slot; returns whether it counts against the low-priority limit."""
+        low = low_priority_key is not None and low_priority_key not in self._promoted
+        if self._can_grant_low() if low else self.has_capacity():
+            self._active += 1
+            self._low_active += low
+            return low
+        if (len(self._low_queue) if low else self._queued) >= self.max_queue:
+            self.rejected_total += 1
+            raise SchedulerOverloaded(self.retry_after())
+
+        waiter: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        if low:
+            self._low_queue[waiter] = (client_id, low_priority_key)
+        else:
+            self._queues.setdefault(client_id, deque()).append(waiter)
+            self._queued += 1
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted a slot just as we were cancelled: hand it on.
+                self._release(waiter.result())
+            else:
+                self._remove_waiter(client_id, waiter)
+            raise
+
+    def _release(self, low: bool = False) -> None:
+        self._active -= 1
+        self._low_active -= low
+        self._grant_next()
+
+    @asynccontextmanager
+    async def slot(self, client_id: str, low_priority_key: Hashable | None = None) -> AsyncIterator[float]:
+        """
+        Hold one upstream slot; yields the seconds spent waiting in the queue.
+        Passing `low_priority_key` queues the call as a prefetch that
+        promote(low_priority_key) can move up.
+        """
+        queued_at = time.monotonic()
+        low = await self._acquire(client_id, low_priority_key)
+        started_at = time.monotonic()
+        waited = started_at - queued_at
+        self.granted_total += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+        self._recent_waits.append(waited)
+        try:
+            yield waited
+        finally:
+            self._recent_service.append(time.monotonic() - started_at)
+            self._release(low)
+
+    def stats(self) -> dict[str, Any]:
+        recent = list(self._recent_waits)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queued": self._queued,
+            "queued_clients": len(self._queues),
+            "low_priority_max": self.low_priority_max,
+            "low_priority_active": self._low_active,
+            "low_priority_queued": len(self._low_queue),
+            "promoted_total": self.promoted_total,
+            "granted_total": self.granted_total,
+            "rejected_total": self.rejected_total,
+            "queue_wait_seconds_total": round(self.wait_seconds_total, 3),
+            "queue_wait_seconds_max": round(self.wait_seconds_max, 3),
+            "queue_wait_seconds_p50": round(_percentile(recent, 50), 3),
+            "queue_wait_seconds_p95": round(_percentile(recent, 95), 3),
+        }
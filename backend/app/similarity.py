@@ -0,0 +1,169 @@
+import array
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable
+
+NEAR_DUPLICATE_INDEX = os.getenv("NEAR_DUPLICATE_INDEX", "1").strip().lower() not in {"0", "false", "no"}
+# Minimum Jaccard similarity of the two texts' word shingles to count as a
+# near-duplicate. One edited word in a 400-word essay scores about 0.985.
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.9"))
+# SimHash bits (of 64) a candidate may differ in before it is even compared.
+NEAR_DUPLICATE_MAX_DISTANCE = int(os.getenv("NEAR_DUPLICATE_MAX_DISTANCE", "8"))
+# Shorter texts are not indexed: one edited word changes too much of them.
+NEAR_DUPLICATE_MIN_WORDS = int(os.getenv("NEAR_DUPLICATE_MIN_WORDS", "50"))
+NEAR_DUPLICATE_MAX_ENTRIES = int(os.getenv("NEAR_DUPLICATE_MAX_ENTRIES", "10000"))
+
+SIMILAR_ACTIONS = ("reuse", "rerun")
+_FINGERPRINT_BITS = 64
+_SHINGLE_WORDS = 3
+_MAX_CANDIDATES = 3
+_WORD_RE = re.compile(r"\w+")
+
+
+def shingles(text: str) -> set[str]:
+    """Distinct three-word shingles; case, punctuation and whitespace are ignored."""
+    words = _WORD_RE.findall(text.lower())
+    return {" ".join(words[i : i + _SHINGLE_WORDS]) for i in range(len(words) - _SHINGLE_WORDS + 1)}
+
+
+def simhash(features: set[str]) -> int:
+    """
+    64-bit SimHash of a set of features. Features are hashed with hash(), so
+    fingerprints are only comparable within one process, which is where
+    the index lives.
+    """
+    # Count set bits column-wise over the packed hashes, one byte position
+    # at a time, instead of 64 Python steps per feature.
+    packed = array.array("q", map(hash, features)).tobytes()
+    half = len(features) / 2
+    fingerprint = 0
+    for byte in range(8):
+        counts = Counter(packed[byte::8])
+        for bit in range(8):
+            if sum(n for value, n in counts.items() if value >> bit & 1) > half:
+                fingerprint |= 1 << (byte * 8 + bit)
+    return fingerprint
+
+
+def jaccard(a: set[str], b: set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class SimilarityIndex:
+    """
+    Finds earlier submissions that are near-duplicates of a text.
+
+    Texts are fingerprinted with SimHash and indexed LSH-style: the 64 bits
+    are split into max_distance + 1 bands, so any fingerprint within
+    max_distance bits shares at least one band exactly with the query.
+    The closest few candidates are then checked against the threshold by
+    the exact Jaccard similarity of their shingles, using the earlier text
+    loaded by the caller (the index keeps fingerprints only).
+    """
+
+    def __init__(
+        self,
+        enabled: bool = NEAR_DUPLICATE_INDEX,
+        threshold: float = NEAR_DUPLICATE_THRESHOLD,
+        max_distance: int = NEAR_DUPLICATE_MAX_DISTANCE,
+        max_entries: int = NEAR_DUPLICATE_MAX_ENTRIES,
+        min_words: int = NEAR_DUPLICATE_MIN_WORDS,
+    ) -> None:
+        self.enabled = enabled and max_entries > 0
+        self.threshold = threshold
+        self.max_distance = min(max(0, max_distance), _FINGERPRINT_BITS // 4)
+        self.max_entries = max_entries
+        self.min_words = min_words
+        bands = self.max_distance + 1
+        edges = [round(i * _FINGERPRINT_BITS / bands) for i in range(bands + 1)]
+        self._bands = [(start, (1 << (stop - start)) - 1) for start, stop in zip(edges, edges[1:])]
+        self._buckets: list[dict[int, set[str]]] = [{} for _ in self._bands]
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        # match() runs in worker threads.
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.matches = 0
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._entries
+
+    def _keys(self, fingerprint: int) -> list[int]:
+        return [fingerprint >> shift & mask for shift, mask in self._bands]
+
+    def _candidates(self, fingerprint: int, exclude: str) -> list[str]:
+        found: dict[str, int] = {}
+        with self._lock:
+            for buckets, key in zip(self._buckets, self._keys(fingerprint)):
+                for document_id in buckets.get(key, ()):
+                    if document_id != exclude and document_id not in found:
+                        found[document_id] = (self._entries[document_id] ^ fingerprint).bit_count()
+        near = [document_id for document_id, distance in found.items() if distance <= self.max_distance]
+        return sorted(near, key=found.__getitem__)[:_MAX_CANDIDATES]
+
+    def match(
+        self,
+        text: str,
+        document_id: str,
+        load: Callable[[str], str | None],
+    ) -> tuple[int | None, tuple[str, str, float] | None]:
+        """
+        Return the text's fingerprint (None when it is too short to index)
+        and the best earlier match as (document id, text, similarity), or
+        None. `load` returns an indexed document's text, or None once it is
+        gone, which drops it from the index.
+        """
+        features = shingles(text)
+        if len(features) + _SHINGLE_WORDS - 1 < self.min_words:
+            return None, None
+        fingerprint = simhash(features)
+        self.lookups += 1
+        best: tuple[str, str, float] | None = None
+        for candidate in self._candidates(fingerprint, document_id):
+            prior = load(candidate)
+            if prior is None:
+                self.discard(candidate)
+                continue
+            score = jaccard(features, shingles(prior))
+            if score >= self.threshold and (best is None or score > best[2]):
+                best = (candidate, prior, score)
+        if best is not None:
+            self.matches += 1
+        return fingerprint, best
+
+    def add(self, document_id: str, fingerprint: int) -> None:
+        self.discard(document_id)
+        with self._lock:
+            self._entries[document_id] = fingerprint
+            for buckets, key in zip(self._buckets, self._keys(fingerprint)):
+                buckets.setdefault(key, set()).add(document_id)
+            evicted = [next(iter(self._entries))] if len(self._entries) > self.max_entries else []
+        for document_id in evicted:
+            self.discard(document_id)
+
+    def discard(self, document_id: str) -> None:
+        with self._lock:
+            fingerprint = self._entries.pop(document_id, None)
+            if fingerprint is None:
+                return
+            for buckets, key in zip(self._buckets, self._keys(fingerprint)):
+                bucket = buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(document_id)
+                    if not bucket:
+                        del buckets[key]
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+            "max_distance": self.max_distance,
+            "min_words": self.min_words,
+            "lookups": self.lookups,
+            "matches": self.matches,
+        }
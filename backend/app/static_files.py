@@ -0,0 +1,220 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+logger = logging.getLogger(__name__)
+
+# Compress text assets at startup when the build did not ship .gz/.br files.
+STATIC_PRECOMPRESS = os.getenv("STATIC_PRECOMPRESS", "1").strip().lower() not in {"0", "false", "no"}
+# Files are held in memory (with their compressed variants) up to this total;
+# the rest are streamed from disk.
+STATIC_MEMORY_MAX_BYTES = int(os.getenv("STATIC_MEMORY_MAX_BYTES", str(32 * 1024 * 1024)))
+STATIC_COMPRESS_MIN_BYTES = 1024
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+INDEX_CACHE_CONTROL = "no-cache"
+DEFAULT_CACHE_CONTROL = "public, max-age=3600"
+
+# Vite names build output like assets/index-3f9a1c2b.js.
+_HASHED_NAME_RE = re.compile(r"[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$")
+_COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+}
+# Preference order when a client accepts several encodings equally.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _brotli_compress():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return lambda data: brotli.compress(data, quality=11)
+
+
+def _compressible(content_type: str) -> bool:
+    return content_type.startswith("text/") or content_type in _COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Codings in an Accept-Encoding header with a non-zero q-value."""
+    accepted: set[str] = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    if "*" in accepted:
+        accepted.update(coding for coding, _ in ENCODINGS)
+    return accepted
+
+
+class StaticAsset:
+    __slots__ = ("path", "size", "content_type", "cache_control", "digest", "body", "variants")
+
+    def __init__(self, path: Path, content_type: str, cache_control: str, digest: str, size: int) -> None:
+        self.path = path
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.digest = digest
+        self.size = size
+        self.body: bytes | None = None
+        # encoding -> bytes held in memory, or a Path to a file shipped with the build
+        self.variants: dict[str, bytes | Path] = {}
+
+    def etag(self, encoding: str | None) -> str:
+        # Each representation gets its own strong validator.
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+
+class StaticSite:
+    """
+    Serves the built frontend from an index made once at startup.
+
+    Every file is hashed for a strong ETag and, when it is compressible,
+    paired with gzip/brotli variants: the .gz/.br files the build shipped, or
+    ones compressed here. Requests are answered from that index without
+    touching the filesystem, preferring brotli, then gzip, when the client
+    accepts them. Hashed files under assets/ are cached as immutable; index.html
+    is always revalidated.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        precompress: bool = STATIC_PRECOMPRESS,
+        memory_max_bytes: int = STATIC_MEMORY_MAX_BYTES,
+    ) -> None:
+        self.root = root
+        self.precompress = precompress
+        self.memory_max_bytes = memory_max_bytes
+        self._assets: dict[str, StaticAsset] = {}
+        self.memory_bytes = 0
+        self.served: dict[str, int] = {"identity": 0, "gzip": 0, "br": 0}
+        self.not_modified = 0
+
+    @property
+    def index(self) -> StaticAsset | None:
+        return self._assets.get("index.html")
+
+    def lookup(self, path: str) -> StaticAsset | None:
+        return self._assets.get(path.lstrip("/"))
+
+    def _cache_control(self, rel: str) -> str:
+        if rel == "index.html":
+            return INDEX_CACHE_CONTROL
+        if rel.startswith("assets/") and _HASHED_NAME_RE.search(rel):
+            return IMMUTABLE_CACHE_CONTROL
+        return DEFAULT_CACHE_CONTROL
+
+    def _keep(self, size: int) -> bool:
+        if self.memory_bytes + size > self.memory_max_bytes:
+            return False
+        self.memory_bytes += size
+        return True
+
+    def load(self) -> None:
+        self._assets.clear()
+        self.memory_bytes = 0
+        if not self.root.is_dir():
+            return
+        brotli_compress = _brotli_compress() if self.precompress else None
+        files = sorted(p for p in self.root.rglob("*") if p.is_file())
+        names = {p.relative_to(self.root).as_posix() for p in files}
+
+        for path in files:
+            rel = path.relative_to(self.root).as_posix()
+            if any(rel.endswith(suffix) and rel[: -len(suffix)] in names for _, suffix in ENCODINGS):
+                continue
+            data = path.read_bytes()
+            content_type = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+            asset = StaticAsset(
+                path, content_type, self._cache_control(rel), hashlib.sha256(data).hexdigest()[:32], len(data)
+            )
+            if self._keep(len(data)):
+                asset.body = data
+
+            if _compressible(content_type) and len(data) >= STATIC_COMPRESS_MIN_BYTES:
+                for encoding, suffix in ENCODINGS:
+                    shipped = path.with_name(path.name + suffix)
+                    if shipped.is_file():
+                        compressed = shipped.read_bytes()
+                    elif encoding == "gzip" and self.precompress:
+                        compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                    elif encoding == "br" and brotli_compress is not None:
+                        compressed = brotli_compress(data)
+                    else:
+                        continue
+                    if len(compressed) >= len(data):
+                        continue
+                    if self._keep(len(compressed)):
+                        asset.variants[encoding] = compressed
+                    elif shipped.is_file():
+                        asset.variants[encoding] = shipped
+            self._assets[rel] = asset
+
+        logger.info(
+            "Indexed %d static files from %s (%d bytes in memory).", len(self._assets), self.root, self.memory_bytes
+        )
+
+    def response(self, asset: StaticAsset, request: Request) -> Response:
+        encoding = None
+        if asset.variants:
+            accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+            encoding = next((e for e, _ in ENCODINGS if e in asset.variants and e in accepted), None)
+
+        etag = asset.etag(encoding)
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control}
+        if asset.variants:
+            headers["Vary"] = "Accept-Encoding"
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+        ):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        self.served[encoding or "identity"] += 1
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            body = asset.variants[encoding]
+        else:
+            body = asset.body if asset.body is not None else asset.path
+        if isinstance(body, Path):
+            return FileResponse(body, media_type=asset.content_type, headers=headers)
+        return Response(content=body, media_type=asset.content_type, headers=headers)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "root": str(self.root),
+            "files": len(self._assets),
+            "compressed_files": sum(1 for asset in self._assets.values() if asset.variants),
+            "memory_bytes": self.memory_bytes,
+            "memory_max_bytes": self.memory_max_bytes,
+            "served": dict(self.served),
+            "not_modified": self.not_modified,
+        }
@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any
+
+from fastapi import HTTPException, UploadFile
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+UPLOAD_CHUNK_BYTES = 64 * 1024
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+# Room for multipart boundaries, part headers and small form fields.
+MULTIPART_OVERHEAD_BYTES = 256 * 1024
+
+PDF_MAGIC = b"%PDF-"
+PDF_MAGIC_WINDOW = 1024
+
+
+class RequestTooLarge(HTTPException):
+    def __init__(self, detail: str) -> None:
+        super().__init__(status_code=413, detail=detail)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Reject request bodies over a per-path limit while they are still being
+    received, instead of after the whole upload has been buffered.
+
+    A declared Content-Length over the limit is refused before any body is
+    read; otherwise the byte count is enforced chunk by chunk as the route
+    consumes the body.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int], detail: str = "Request body is too large.") -> None:
+        self.app = app
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+        self.detail = detail
+
+    def _limit_for(self, path: str) -> int | None:
+        for prefix, limit in self.limits:
+            if path == prefix or path.startswith(prefix.rstrip("/") + "/"):
+                return limit
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = self._limit_for(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > limit:
+                    await self._reject(send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise RequestTooLarge(self.detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send: Send) -> None:
+        body = json.dumps({"detail": self.detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def save_upload(
+    file: UploadFile,
+    max_bytes: int,
+    too_large: str,
+    suffix: str = "",
+    magic: bytes | None = None,
+    not_magic: str = "Uploaded file has the wrong type.",
+    empty: str = "Uploaded file is empty.",
+) -> dict[str, Any]:
+    """
+    Copy an upload to a named temp file in fixed-size chunks.
+
+    Checks `magic` on the first chunk and aborts with 413 as soon as
+    `max_bytes` is crossed, so at most one chunk is held in memory.
+    Returns the temp file path, its size and a SHA-256 of the contents; the
+    caller owns (and must remove) the file.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=too_large)
+
+    digest = hashlib.sha256()
+    size = 0
+    tmp = tempfile.NamedTemporaryFile(prefix="upload-", suffix=suffix, dir=UPLOAD_TMP_DIR, delete=False)
+    try:
+        with tmp:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if size == 0 and magic is not None and magic not in chunk[:PDF_MAGIC_WINDOW]:
+                    raise HTTPException(status_code=400, detail=not_magic)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=too_large)
+                digest.update(chunk)
+                tmp.write(chunk)
+        if size == 0:
+            raise HTTPException(status_code=400, detail=empty)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return {"path": tmp.name, "size": size, "sha256": digest.hexdigest()}
+
+
+async def save_pdf_upload(file: UploadFile, max_bytes: int) -> dict[str, Any]:
+    """Spool an uploaded PDF to a temp file; see save_upload."""
+    too_large = "PDF is too large. Max size is %dMB." % (max_bytes // (1024 * 1024))
+    return await save_upload(
+        file,
+        max_bytes,
+        too_large,
+        suffix=".pdf",
+        magic=PDF_MAGIC,
+        not_magic="Uploaded file is not a PDF.",
+        empty="Uploaded PDF is empty.",
+    )
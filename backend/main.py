@@ -1,43 +1,144 @@
 import asyncio
-import io
+import json
+import math
 import os
-from datetime import datetime
-from typing import Any
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Hashable
 from pathlib import Path
 
-import re
-from reportlab.lib.units import inch
-from reportlab.platypus import (
-    PageBreak,
-    Table,
-    TableStyle,
-    HRFlowable,
-    KeepTogether,
-)
-
 import httpx
 from fastapi import FastAPI, File, Form, HTTPException, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, Response
-from fastapi.staticfiles import StaticFiles
-from pypdf import PdfReader
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import LETTER
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.platypus import ListFlowable, ListItem, Paragraph, SimpleDocTemplate, Spacer
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 
 # FIX 1: import prompts from the same directory (matches uploaded prompts.py)
-from backend.app.prompts import AGENT_CONFIGS
-from backend.app.prompts_short import AGENT_CONFIGS_SHORT
-
-MAX_TEXT_CHARS = 200_000
+from backend.app.prompts import CHUNK_NOTES_SYSTEM, CHUNK_REDUCE_PREAMBLE
+from backend.app.agents import DEFAULT_AGENT_SET, AgentRegistry
+from backend.app.batch import (
+    BATCH_MAX_BYTES,
+    BATCH_MAX_CONCURRENCY,
+    BATCH_MAX_DOCUMENTS,
+    JSONL_EXTENSIONS,
+    TEXT_EXTENSIONS,
+    BatchStats,
+    document_from_json,
+    parse_jsonl,
+    read_zip_documents,
+    text_document,
+)
+from backend.app.budget import TokenBudget
+from backend.app.documents import DocumentStore
+from backend.app.fused import AGENT_MODES, fused_agent, parse_fused_output
+from backend.app.ingest import PageTrimmer
+from backend.app.jobs import JOBS_MAX_ACTIVE, JobStore, new_job_id
+from backend.app.markdown_tree import is_section_tree, parse_markdown
+from backend.app.metrics import (
+    EXPOSITION_CONTENT_TYPE,
+    UPLOAD_BYTES,
+    MetricsMiddleware,
+    record_model_call,
+    registry,
+    timed_stage,
+)
+from backend.app.model_client import ModelClient
+from backend.app.prompt_layout import PROMPT_CACHE_CONTROL, PROMPT_LAYOUT, compile_messages, encode_messages
+from backend.app.payloads import negotiated_response, read_payload
+from backend.app.pdf_extract import PdfExtractionTimeout, PdfExtractor
+from backend.app.report import ReportBusy, ReportRenderer, ReportTimeout
+from backend.app.report_cache import ReportCache, is_report_id, report_cache_key
+from backend.app.resilience import ANALYSIS_DEADLINE_SECONDS, Deadline, ModelAPIError, RetryPolicy, parse_retry_after
+from backend.app.result_cache import create_result_cache, result_cache_key, text_hash
+from backend.app.scheduler import SchedulerOverloaded, UpstreamScheduler
+from backend.app.similarity import SIMILAR_ACTIONS, SimilarityIndex
+from backend.app.singleflight import SingleFlight
+from backend.app.static_files import StaticSite
+from backend.app.uploads import MULTIPART_OVERHEAD_BYTES, BodySizeLimitMiddleware, save_pdf_upload, save_upload
+
+# Documents over the per-call token budget are analyzed in chunks, so the
+# hard cap can sit above what a single model call would accept.
+MAX_TEXT_CHARS = int(os.getenv("MAX_TEXT_CHARS", "400000"))
 MAX_PDF_BYTES = 10 * 1024 * 1024
 
 DEFAULT_MODEL = os.getenv("GEMMA_MODEL", "aisingapore/Gemma-SEA-LION-v4-27B-IT")
 GEMMA_API_URL = os.getenv("GEMMA_API_URL", "").strip()
 GEMMA_API_KEY = os.getenv("GEMMA_API_KEY", "").strip()
+MODEL_TEMPERATURE = 0.3
+
+dist_dir = Path(os.getenv("FRONTEND_DIST", "frontend_dist")).resolve()
 
-app = FastAPI(title="Critical Thinking Analysis API")
+agent_registry = AgentRegistry()
+model_client = ModelClient()
+pdf_extractor = PdfExtractor()
+report_renderer = ReportRenderer()
+report_cache = ReportCache()
+report_flights = SingleFlight()
+result_cache = create_result_cache()
+agent_flights = SingleFlight()
+upstream_scheduler = UpstreamScheduler()
+retry_policy = RetryPolicy()
+text_budget = TokenBudget()
+job_store = JobStore()
+document_store = DocumentStore()
+similarity_index = SimilarityIndex()
+static_site = StaticSite(dist_dir)
+fused_stats = {"calls": 0, "fallbacks": 0}
+# Strong references keep background job tasks alive until they finish.
+job_tasks: set[asyncio.Task] = set()
+
+UPSTREAM_CALLS = registry.gauge("upstream_calls", "Model calls holding or waiting for an upstream slot.", ("state",))
+RESULT_CACHE_LOOKUPS = registry.counter("result_cache_lookups_total", "Per-agent result cache lookups.", ("result",))
+FUSED_CALLS = registry.counter("fused_calls_total", "Fused-mode generations and their fallbacks.", ("outcome",))
+REPORTS_PENDING = registry.gauge("reports_pending", "Report builds running or waiting for a worker.")
+JOBS_ACTIVE = registry.gauge("jobs_active", "Background analysis jobs running in this process.")
+
+
+def _collect_component_metrics() -> None:
+    scheduler = upstream_scheduler.stats()
+    UPSTREAM_CALLS.set(scheduler["active"], state="active")
+    UPSTREAM_CALLS.set(scheduler["queued"], state="queued")
+    RESULT_CACHE_LOOKUPS.set_total(result_cache.hits, result="hit")
+    RESULT_CACHE_LOOKUPS.set_total(result_cache.misses, result="miss")
+    FUSED_CALLS.set_total(fused_stats["calls"] - fused_stats["fallbacks"], outcome="ok")
+    FUSED_CALLS.set_total(fused_stats["fallbacks"], outcome="fallback")
+    REPORTS_PENDING.set(report_renderer.stats()["pending"])
+    JOBS_ACTIVE.set(len(job_tasks))
+
+
+registry.add_collector(_collect_component_metrics)
+
+
+async def _job_heartbeat() -> None:
+    while True:
+        await asyncio.sleep(job_store.heartbeat_interval)
+        await asyncio.to_thread(job_store.heartbeat)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    model_client.start()
+    pdf_extractor.start()
+    report_renderer.start()
+    job_store.start()
+    heartbeat = asyncio.create_task(_job_heartbeat())
+    static_site.load()
+    try:
+        yield
+    finally:
+        heartbeat.cancel()
+        for task in job_tasks:
+            task.cancel()
+        await asyncio.gather(*job_tasks, return_exceptions=True)
+        job_store.close()
+        await model_client.aclose()
+        pdf_extractor.shutdown()
+        report_renderer.shutdown()
+        close_cache = getattr(result_cache.backend, "close", None)
+        if close_cache is not None:
+            close_cache()
+
+
+app = FastAPI(title="Critical Thinking Analysis API", lifespan=lifespan)
 
 # FIX 2: safer CORS defaults; do NOT combine allow_credentials=True with "*"
 cors_origins_raw = os.getenv("CORS_ORIGINS", "*")
@@ -49,140 +150,448 @@ app.add_middleware(
     allow_credentials=False,  # important for "*" compatibility
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Report-Id"],
 )
 
+# Abort oversized uploads while they stream in, before they are buffered.
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={
+        "/api/analyze": MAX_PDF_BYTES + MULTIPART_OVERHEAD_BYTES,
+        "/api/documents": MAX_PDF_BYTES + MULTIPART_OVERHEAD_BYTES,
+        "/api/jobs": MAX_PDF_BYTES + MULTIPART_OVERHEAD_BYTES,
+    },
+    detail="PDF is too large. Max size is 10MB.",
+)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={"/api/batch": BATCH_MAX_BYTES + MULTIPART_OVERHEAD_BYTES},
+    detail="Batch upload is too large. Max size is %dMB." % (BATCH_MAX_BYTES // (1024 * 1024)),
+)
+# Outermost, so rejected uploads are counted and timed too.
+app.add_middleware(MetricsMiddleware)
 
-def _extract_pdf_text(file_bytes: bytes) -> str:
-    reader = PdfReader(io.BytesIO(file_bytes))
-    parts: list[str] = []
-    for page in reader.pages:
-        parts.append(page.extract_text() or "")
-    return "\n".join(parts).strip()
-
-_BACK_MATTER_MARKERS = [
-    "references",
-    "bibliography",
-    "reference list",
-    "works cited",
-    "literature cited",
-    "citations",
-    "appendix",
-    "appendices",
-    "supplementary material",
-    "supplementary materials",
-    "supplement",
-    "acknowledgement",
-    "acknowledgements",
-]
-
-def _reduce_academic_pdf_text(text: str) -> str:
-    """
-    Heuristically remove common academic back-matter (References/Bibliography/Appendix/etc.)
-    to reduce token/character load before LLM analysis.
 
-    Heuristic safeguards:
-    - Only cut if the marker occurs after a threshold of the document (to avoid TOC hits).
-    - Prefer the earliest qualifying marker among candidates.
-    """
-    if not text:
-        return ""
-
-    t = text
-
-    # Normalize whitespace (helps pattern matching and reduces noise)
-    t = t.replace("\r\n", "\n").replace("\r", "\n")
-    t = re.sub(r"[ \t]+", " ", t)
-    t = re.sub(r"\n{3,}", "\n\n", t).strip()
-
-    lower = t.lower()
-    n = len(lower)
-    if n < 5000:
-        # very short docs: do not cut
-        return t
-
-    # Only consider cut points that appear in the latter part of the document.
-    # This avoids false positives from "References" in Table of Contents.
-    threshold = int(0.45 * n)
-
-    best_cut = None
-
-    # Look for headings on their own line: \nReferences\n, \nAppendix\n, etc.
-    for marker in _BACK_MATTER_MARKERS:
-        # Match marker as a standalone heading line (case-insensitive via lower)
-        # Examples matched:
-        #   "\nreferences\n"
-        #   "\nreferences:\n"
-        #   "\nappendix a\n"
-        pattern = re.compile(rf"\n{re.escape(marker)}(\b|[ :])")
-        m = pattern.search(lower)
-        if m:
-            cut_idx = m.start()
-            if cut_idx >= threshold:
-                if best_cut is None or cut_idx < best_cut:
-                    best_cut = cut_idx
-
-    if best_cut is not None:
-        t = t[:best_cut].strip()
-
-    # Final cleanup
-    t = re.sub(r"\n{3,}", "\n\n", t).strip()
-    return t
+def _validate_text(text: str) -> str:
+    with timed_stage("validate"):
+        cleaned = (text or "").strip()
+        if not cleaned:
+            raise HTTPException(status_code=400, detail="No text provided for analysis.")
+        if len(cleaned) > MAX_TEXT_CHARS:
+            raise HTTPException(
+                status_code=413,
+                detail="Input is too long. Please shorten the text or upload a smaller PDF.",
+            )
+        return cleaned
 
 
-def _validate_text(text: str) -> str:
-    cleaned = (text or "").strip()
-    if not cleaned:
-        raise HTTPException(status_code=400, detail="No text provided for analysis.")
-    if len(cleaned) > MAX_TEXT_CHARS:
-        raise HTTPException(
-            status_code=413,
-            detail="Input is too long. Please shorten the text or upload a smaller PDF.",
-        )
-    return cleaned
+def _build_prompt(agent: dict[str, Any], text: str) -> str:
+    # Registry agents carry their messages pre-serialized; per-request agents
+    # (chunk notes, fused) are serialized here.
+    compiled = agent.get("messages_json") or compile_messages(agent["system"])
+    return encode_messages(compiled, text)
 
 
-def _build_prompt(agent: dict[str, Any], text: str) -> list[dict[str, str]]:
-    return [
-        {"role": "system", "content": agent["system"]},
-        {"role": "user", "content": text},
-    ]
+# Everything but the messages, serialized once; the request body is completed
+# by string concatenation instead of re-encoding the system prompt per call.
+_PAYLOAD_HEAD = json.dumps({"model": DEFAULT_MODEL, "temperature": MODEL_TEMPERATURE})[:-1]
 
 
-async def _call_model(client: httpx.AsyncClient, agent: dict[str, Any], text: str) -> str:
+def _model_request(agent: dict[str, Any], text: str, stream: bool = False) -> tuple[bytes, dict[str, str]]:
     if not GEMMA_API_URL:
         raise RuntimeError("GEMMA_API_URL is not set.")
     if not GEMMA_API_KEY:
         raise RuntimeError("GEMMA_API_KEY is not set.")
 
-    payload = {
-        "model": DEFAULT_MODEL,
-        "messages": _build_prompt(agent, text),
-        "temperature": 0.3,
-    }
-    headers = {"Authorization": f"Bearer {GEMMA_API_KEY}"}
+    stream_field = ', "stream": true, "stream_options": {"include_usage": true}' if stream else ""
+    body = f'{_PAYLOAD_HEAD}{stream_field}, "messages": {_build_prompt(agent, text)}}}'
+    headers = {"Authorization": f"Bearer {GEMMA_API_KEY}", "Content-Type": "application/json"}
+    return body.encode("utf-8"), headers
+
+
+MODEL_CONNECT_TIMEOUT = 10.0
+
+
+def _prompt_chars(agent: dict[str, Any], text: str) -> int:
+    return len(agent["system"]) + len(text)
+
+
+def _model_http_error(status_code: int, headers: httpx.Headers) -> ModelAPIError:
+    return ModelAPIError(
+        f"Model API returned HTTP {status_code}.",
+        status_code=status_code,
+        retry_after=parse_retry_after(headers.get("retry-after")),
+    )
+
+
+async def _call_model(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    timeout: float = 120.0,
+) -> str:
+    body, headers = _model_request(agent, text)
+    started = time.perf_counter()
+    status = "error"
+    content = ""
+    usage = None
 
-    timeout = httpx.Timeout(120.0, connect=10.0)
     try:
-        resp = await client.post(GEMMA_API_URL, json=payload, headers=headers, timeout=timeout)
-        resp.raise_for_status()
-    except httpx.HTTPStatusError as exc:
-        raise RuntimeError(f"Model API returned HTTP {exc.response.status_code}.") from exc
+        try:
+            resp = await asyncio.wait_for(
+                client.post(
+                    GEMMA_API_URL,
+                    content=body,
+                    headers=headers,
+                    timeout=httpx.Timeout(timeout, connect=min(timeout, MODEL_CONNECT_TIMEOUT)),
+                ),
+                timeout,
+            )
+            resp.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            status = str(exc.response.status_code)
+            raise _model_http_error(exc.response.status_code, exc.response.headers) from exc
+        except (httpx.TimeoutException, asyncio.TimeoutError) as exc:
+            status = "timeout"
+            raise ModelAPIError("Model API timed out.") from exc
+        except httpx.RequestError as exc:
+            status = "unreachable"
+            raise ModelAPIError("Could not reach the model API.") from exc
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+
+        data = resp.json()
+        usage = data.get("usage")
+        if "choices" in data:
+            content = data["choices"][0]["message"]["content"].strip()
+        elif "generated_text" in data:
+            content = data["generated_text"].strip()
+        else:
+            raise RuntimeError("Unexpected response from model API.")
+        status = "ok"
+        return content
+    finally:
+        record_model_call(
+            agent["key"], status, time.perf_counter() - started, _prompt_chars(agent, text), len(content), usage
+        )
+
+
+async def _stream_model(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    timeout: float = 120.0,
+    attempt: asyncio.Timeout | None = None,
+) -> AsyncIterator[str]:
+    """
+    Yield content deltas from an OpenAI-compatible streaming completion.
+    Servers that ignore `stream: true` and reply with plain JSON yield once.
+    `attempt` is the caller's timeout around the whole stream, so a stream it
+    cuts off is recorded as a timeout rather than a cancellation.
+    """
+    body, headers = _model_request(agent, text, stream=True)
+    started = time.perf_counter()
+    status = "error"
+    output_chars = 0
+    usage = None
+
+    try:
+        async with client.stream(
+            "POST",
+            GEMMA_API_URL,
+            content=body,
+            headers=headers,
+            timeout=httpx.Timeout(timeout, connect=min(timeout, MODEL_CONNECT_TIMEOUT)),
+        ) as resp:
+            if resp.status_code >= 400:
+                status = str(resp.status_code)
+                raise _model_http_error(resp.status_code, resp.headers)
+
+            if not resp.headers.get("content-type", "").startswith("text/event-stream"):
+                data = json.loads(await resp.aread())
+                usage = data.get("usage")
+                if "choices" in data:
+                    content = data["choices"][0]["message"]["content"]
+                elif "generated_text" in data:
+                    content = data["generated_text"]
+                else:
+                    raise RuntimeError("Unexpected response from model API.")
+                output_chars = len(content)
+                status = "ok"
+                yield content
+                return
+
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data_str = line[len("data:"):].strip()
+                if data_str == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data_str)
+                except ValueError:
+                    continue
+                # Servers that honour stream_options.include_usage send it last.
+                usage = chunk.get("usage") or usage
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    output_chars += len(delta)
+                    yield delta
+            status = "ok"
+    except httpx.TimeoutException as exc:
+        status = "timeout"
+        raise ModelAPIError("Model API timed out.") from exc
     except httpx.RequestError as exc:
-        raise RuntimeError("Could not reach the model API.") from exc
+        status = "unreachable"
+        raise ModelAPIError("Could not reach the model API.") from exc
+    except (asyncio.CancelledError, GeneratorExit):
+        status = "timeout" if attempt is not None and attempt.expired() else "cancelled"
+        raise
+    finally:
+        record_model_call(
+            agent["key"], status, time.perf_counter() - started, _prompt_chars(agent, text), output_chars, usage
+        )
 
-    data = resp.json()
-    if "choices" in data:
-        return data["choices"][0]["message"]["content"].strip()
-    if "generated_text" in data:
-        return data["generated_text"].strip()
-    raise RuntimeError("Unexpected response from model API.")
+
+async def _call_model_cached(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    client_id: str,
+    deadline: Deadline,
+    accept: Callable[[str], bool] | None = None,
+    low_priority_key: Hashable | None = None,
+) -> str:
+    key = result_cache_key(text, agent, DEFAULT_MODEL, MODEL_TEMPERATURE, PROMPT_LAYOUT)
+    cached = await result_cache.get(key)
+    if cached is not None:
+        return cached
+
+    async def attempt(timeout: float) -> str:
+        async with upstream_scheduler.slot(client_id, low_priority_key):
+            return await _call_model(client, agent, text, timeout)
+
+    # Hedge only when it would not queue behind other clients' work, and
+    # never for prefetches nobody is waiting on yet.
+    can_hedge = upstream_scheduler.has_capacity if low_priority_key is None else (lambda: False)
+    content = await retry_policy.run(agent["key"], attempt, deadline, can_hedge=can_hedge)
+    if accept is None or accept(content):
+        await result_cache.set(key, content)
+    return content
+
+
+def _chunk_notes_agent(agent: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "key": f"{agent['key']}:notes",
+        "label": agent.get("label", "Agent"),
+        "focus": agent.get("focus", ""),
+        "system": CHUNK_NOTES_SYSTEM.format(label=agent.get("label", "Agent"), focus=agent.get("focus", "")),
+    }
 
 
-async def _run_agents(text: str, agent_configs: list[dict[str, Any]]) -> dict[str, Any]:
+async def _prepare_agent_input(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    client_id: str,
+    deadline: Deadline,
+    low_priority_key: Hashable | None = None,
+) -> str:
+    """
+    Return the user content for an agent call. Text within the input budget
+    is used as is; longer text is split into section-aware chunks whose notes
+    are generated concurrently (map) and merged into one reduce input.
+    """
+    if text_budget.fits(text):
+        return text
+
+    notes_agent = _chunk_notes_agent(agent)
+    notes = await asyncio.gather(*[
+        _call_model_cached(client, notes_agent, chunk_input, client_id, deadline, low_priority_key=low_priority_key)
+        for chunk_input in _chunk_inputs(text)
+    ])
+    return _reduce_input(notes)
+
+
+def _chunk_inputs(text: str) -> list[str]:
+    chunks = text_budget.split(text)
+    return [f"[Part {i} of {len(chunks)}]\n\n{chunk}" for i, chunk in enumerate(chunks, start=1)]
+
+
+def _reduce_input(notes: list[str]) -> str:
+    sections = [f"### Part {i} notes\n{note}" for i, note in enumerate(notes, start=1)]
+    return CHUNK_REDUCE_PREAMBLE.format(count=len(notes)) + "\n" + "\n\n".join(sections)
+
+
+async def _has_cached_results(text: str, agent_configs: list[dict[str, Any]], agent_mode: str) -> bool:
+    """
+    True when every agent's analysis of `text` is in the result cache (or,
+    in fused mode, the fused generation is), so serving it makes no model calls.
+    """
+    def key(agent: dict[str, Any], prompt_text: str) -> str:
+        return result_cache_key(prompt_text, agent, DEFAULT_MODEL, MODEL_TEMPERATURE, PROMPT_LAYOUT)
+
+    if agent_mode == "fused" and text_budget.fits(text):
+        if await result_cache.peek(key(fused_agent(agent_configs), text)) is not None:
+            return True
+    for agent in agent_configs:
+        prompt_text = text
+        if not text_budget.fits(text):
+            notes_agent = _chunk_notes_agent(agent)
+            notes = [await result_cache.peek(key(notes_agent, chunk_input)) for chunk_input in _chunk_inputs(text)]
+            if None in notes:
+                return False
+            prompt_text = _reduce_input(notes)
+        if await result_cache.peek(key(agent, prompt_text)) is None:
+            return False
+    return True
+
+
+async def _analyze_agent(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    client_id: str,
+    deadline: Deadline,
+    low_priority_key: Hashable | None = None,
+) -> str:
+    prompt_text = await _prepare_agent_input(client, agent, text, client_id, deadline, low_priority_key)
+    return await _call_model_cached(
+        client, agent, prompt_text, client_id, deadline, low_priority_key=low_priority_key
+    )
+
+
+async def _run_agent(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    answer_length: str,
+    client_id: str,
+    deadline: Deadline,
+    prefetch: bool = False,
+) -> str:
+    """
+    Prefetches queue behind interactive work; an interactive request for an
+    agent whose prefetch is still queued promotes it and shares its result.
+    """
+    # Identical concurrent submissions share one upstream generation per agent.
+    flight_key = (text_hash(text), answer_length, agent["key"])
+    if not prefetch:
+        upstream_scheduler.promote(flight_key)
+    return await agent_flights.do(
+        flight_key,
+        lambda: _analyze_agent(client, agent, text, client_id, deadline, flight_key if prefetch else None),
+    )
+
+
+def _wants_sections(request: Request) -> bool:
+    return request.query_params.get("sections", "").strip().lower() in {"1", "true", "yes"}
+
+
+def _present(result: dict[str, Any], sections: bool = False) -> dict[str, Any]:
+    """
+    An agent result as sent to clients: its markdown `content`, or with
+    sections=1 the section tree parsed from it in its place.
+    """
+    if not sections or "content" not in result:
+        return result
+    view = {key: value for key, value in result.items() if key != "content"}
+    view["sections"] = parse_markdown(result["content"])
+    return view
+
+
+async def _run_fused(
+    client: httpx.AsyncClient,
+    agent_configs: list[dict[str, Any]],
+    text: str,
+    answer_length: str,
+    client_id: str,
+    deadline: Deadline,
+) -> dict[str, Any] | None:
+    """
+    Generate every agent's analysis in one model call and split it back into
+    per-agent results. Returns None when the caller should fall back to
+    separate calls: the text needs map-reduce, the call failed, or the
+    output was malformed. Scheduler overload is raised, not swallowed.
+    """
+    if not text_budget.fits(text):
+        return None
+    agent = fused_agent(agent_configs)
+    fused_stats["calls"] += 1
+    try:
+        content = await agent_flights.do(
+            (text_hash(text), answer_length, agent["key"]),
+            lambda: _call_model_cached(
+                client, agent, text, client_id, deadline,
+                accept=lambda c: parse_fused_output(c, agent_configs) is not None,
+            ),
+        )
+    except SchedulerOverloaded:
+        raise
+    except Exception:
+        content = ""
+    parsed = parse_fused_output(content, agent_configs)
+    if parsed is None:
+        fused_stats["fallbacks"] += 1
+        return None
+    return {key: {"status": "ok", "content": section} for key, section in parsed.items()}
+
+
+def _client_id(request: Request) -> str:
+    # X-Forwarded-For is client-controlled. Behind a proxy, uvicorn's proxy
+    # headers support (FORWARDED_ALLOW_IPS) rewrites client.host to the
+    # right-most untrusted hop.
+    return request.client.host if request.client else "anonymous"
+
+
+def _busy_error(exc: SchedulerOverloaded) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": str(exc.retry_after)})
+
+
+def _map_calls(text: str, agent_configs: list[dict[str, Any]]) -> int:
+    """Chunk-notes calls an analysis of `text` starts at once (0 when it fits one call)."""
+    chunks = text_budget.plan(text)["chunks"]
+    return chunks * len(agent_configs) if chunks > 1 else 0
+
+
+def _ensure_upstream_capacity(agent_configs: list[dict[str, Any]], text: str) -> None:
+    # The map pass queues every chunk of every agent at once; each agent's
+    # reduce call only starts after its notes, so it reuses one of those slots.
+    try:
+        upstream_scheduler.ensure_capacity(_map_calls(text, agent_configs) or len(agent_configs))
+    except SchedulerOverloaded as exc:
+        raise _busy_error(exc) from exc
+
+
+def _analysis_deadline(text: str, agent_configs: list[dict[str, Any]]) -> Deadline:
+    """
+    ANALYSIS_DEADLINE_SECONDS for the agent calls, plus one attempt timeout
+    for each round of map calls the upstream concurrency limit lets through.
+    """
+    rounds = math.ceil(_map_calls(text, agent_configs) / upstream_scheduler.max_concurrency)
+    return Deadline(ANALYSIS_DEADLINE_SECONDS + rounds * retry_policy.attempt_timeout)
+
+
+async def _run_agents(
+    text: str,
+    agent_configs: list[dict[str, Any]],
+    answer_length: str,
+    client_id: str,
+) -> dict[str, Any]:
     results: dict[str, Any] = {}
-    async with httpx.AsyncClient() as client:
-        tasks = [_call_model(client, agent, text) for agent in agent_configs]
-        responses = await asyncio.gather(*tasks, return_exceptions=True)
+    client = model_client.client
+    deadline = _analysis_deadline(text, agent_configs)
+    tasks = [_run_agent(client, agent, text, answer_length, client_id, deadline) for agent in agent_configs]
+    responses = await asyncio.gather(*tasks, return_exceptions=True)
+
+    overloaded = [r for r in responses if isinstance(r, SchedulerOverloaded)]
+    if overloaded:
+        # Completed agents are cached, so a retry after Retry-After is cheap.
+        raise _busy_error(overloaded[0])
 
     for agent, response in zip(agent_configs, responses):
         if isinstance(response, Exception):
@@ -209,30 +618,256 @@ async def buildinfo():
         "index_exists": (dist_dir / "index.html").exists(),
     }
 
+@app.get("/api/_diagnostics")
+async def diagnostics() -> dict[str, Any]:
+    return {
+        "model_client": model_client.stats(),
+        "result_cache": result_cache.stats(),
+        "single_flight": agent_flights.stats(),
+        "scheduler": upstream_scheduler.stats(),
+        "resilience": retry_policy.stats(),
+        "pdf_extract": pdf_extractor.stats(),
+        "prompt": {"layout": PROMPT_LAYOUT, "cache_control": PROMPT_CACHE_CONTROL},
+        "fused": fused_stats,
+        "report": report_renderer.stats(),
+        "report_cache": report_cache.stats(),
+        "jobs": {**job_store.stats(), "active": len(job_tasks), "max_active": JOBS_MAX_ACTIVE},
+        "documents": document_store.stats(),
+        "similarity": similarity_index.stats(),
+        "static": static_site.stats(),
+    }
+
+@app.get("/api/agents")
+async def list_agents() -> JSONResponse:
+    return JSONResponse(agent_registry.describe(), headers={"Cache-Control": "no-cache"})
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(registry.render(), media_type=EXPOSITION_CONTENT_TYPE)
+
 @app.head("/")
 async def head_root():
     return Response(status_code=200)
-    
-# FIX 3: remove Body() from signature; manually parse JSON when needed
-@app.post("/api/analyze")
-async def analyze(
-    request: Request,
-    text: str | None = Form(None),
-    file: UploadFile | None = File(None),
-    answer_length: str | None = Form(None),
-) -> JSONResponse:
 
+
+def _sse_event(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_agent(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    client_id: str,
+    deadline: Deadline,
+    queue: "asyncio.Queue[tuple[bool, str]]",
+    sections: bool = False,
+    flight_key: Hashable | None = None,
+) -> None:
+    """
+    Push (is_final, event) pairs; exactly one final done/error per agent.
+    With a flight_key the generation joins agent_flights like _run_agent, so
+    a queued prefetch of the same agent is promoted and shared, not repeated.
+    """
+    key = agent["key"]
+    state = {"generated": False, "cached": False}
+
+    async def generate() -> str:
+        state["generated"] = True
+        # Oversized documents run their (non-streamed) map pass first; the
+        # final reduce generation is what gets streamed.
+        prompt_text = await _prepare_agent_input(client, agent, text, client_id, deadline)
+        cache_key = result_cache_key(prompt_text, agent, DEFAULT_MODEL, MODEL_TEMPERATURE, PROMPT_LAYOUT)
+        cached = await result_cache.get(cache_key)
+        if cached is not None:
+            state["cached"] = True
+            await queue.put((False, _sse_event("delta", {"agent": key, "text": cached})))
+            return cached
+
+        parts: list[str] = []
+        for attempt_no in range(retry_policy.max_attempts):
+            timeout = min(retry_policy.attempt_timeout, deadline.remaining())
+            if timeout <= 0:
+                raise ModelAPIError("Analysis deadline exceeded.", status_code=504)
+            try:
+                async with upstream_scheduler.slot(client_id):
+                    async with asyncio.timeout(timeout) as attempt:
+                        async for delta in _stream_model(client, agent, prompt_text, timeout, attempt):
+                            parts.append(delta)
+                            await queue.put((False, _sse_event("delta", {"agent": key, "text": delta})))
+            except TimeoutError as exc:
+                # A timed-out attempt is retried like a transport error.
+                error = ModelAPIError("Model API timed out.")
+                error.__cause__ = exc
+            except ModelAPIError as exc:
+                error = exc
+            else:
+                break
+            # Once tokens have reached the client a retry would duplicate them.
+            if parts or not error.retryable or attempt_no == retry_policy.max_attempts - 1:
+                raise error
+            delay = retry_policy.backoff(attempt_no, error.retry_after)
+            if delay >= deadline.remaining():
+                raise error
+            retry_policy.retries_total += 1
+            await asyncio.sleep(delay)
+
+        content = "".join(parts).strip()
+        if not content:
+            raise RuntimeError("Model API returned an empty response.")
+        await result_cache.set(cache_key, content)
+        return content
+
+    try:
+        if flight_key is None:
+            content = await generate()
+        else:
+            upstream_scheduler.promote(flight_key)
+            content = await agent_flights.do(flight_key, generate)
+            if not state["generated"]:
+                # Joined a generation started elsewhere: send it in one piece.
+                await queue.put((False, _sse_event("delta", {"agent": key, "text": content})))
+        done = {"agent": key, **_present({"content": content}, sections), "cached": state["cached"]}
+        await queue.put((True, _sse_event("done", done)))
+    except SchedulerOverloaded as exc:
+        await queue.put((True, _sse_event("error", {
+            "agent": key,
+            "message": str(exc),
+            "retry_after": exc.retry_after,
+        })))
+    except Exception as exc:
+        await queue.put((True, _sse_event("error", {"agent": key, "message": str(exc)})))
+
+
+async def _analysis_events(
+    text: str,
+    agent_configs: list[dict[str, Any]],
+    answer_length: str,
+    client_id: str,
+    agent_mode: str = "separate",
+    similar: dict[str, Any] | None = None,
+    sections: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Multiplex per-agent token deltas into a single SSE stream.
+    Events: meta, delta, done, error (per agent) and a final end.
+    In fused mode the agents arrive together as done events once the single
+    generation completes, unless it falls back to separate streams.
+    """
+    meta: dict[str, Any] = {
+        "answer_length": answer_length,
+        "agent_mode": agent_mode,
+        "agents": [agent["key"] for agent in agent_configs],
+        "input": text_budget.plan(text),
+    }
+    if similar is not None:
+        meta["similar"] = similar
+    yield _sse_event("meta", meta)
+
+    client = model_client.client
+    deadline = _analysis_deadline(text, agent_configs)
+    if agent_mode == "fused":
+        try:
+            fused = await _run_fused(client, agent_configs, text, answer_length, client_id, deadline)
+        except SchedulerOverloaded:
+            fused = None
+        if fused is not None:
+            for key, result in fused.items():
+                yield _sse_event("done", {"agent": key, **_present({"content": result["content"]}, sections)})
+            yield _sse_event("end", {})
+            return
+
+    queue: asyncio.Queue[tuple[bool, str]] = asyncio.Queue()
+    # Streams share agent_flights with the JSON endpoints and prefetches.
+    document_hash = text_hash(text)
+    tasks = [
+        asyncio.create_task(_stream_agent(
+            client, agent, text, client_id, deadline, queue, sections,
+            flight_key=(document_hash, answer_length, agent["key"]),
+        ))
+        for agent in agent_configs
+    ]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            is_final, event = await queue.get()
+            if is_final:
+                remaining -= 1
+            yield event
+        yield _sse_event("end", {})
+    finally:
+        # Client disconnected (or we finished): stop any upstream generations.
+        for task in tasks:
+            task.cancel()
+
+
+async def _extract_pdf_text(path: str, file_hash: str | None = None) -> tuple[str, dict[str, Any]]:
+    # Pages are trimmed as they arrive, so extraction stops at the back
+    # matter or once the text is too long to analyze anyway.
+    trimmer = PageTrimmer(MAX_TEXT_CHARS)
+    try:
+        with timed_stage("pdf_extract"):
+            _, pdf_timing = await pdf_extractor.extract(path, file_hash, trimmer.add)
+    except PdfExtractionTimeout as exc:
+        raise HTTPException(status_code=422, detail="PDF took too long to process.") from exc
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail="Unable to read PDF text.") from exc
+    with timed_stage("reduce"):
+        reduced = trimmer.text()
+    pdf_timing["stopped"] = trimmer.stop_reason
+    return reduced, pdf_timing
+
+
+def _agent_keys(value: Any) -> list[str] | None:
+    """The requested agent subset, from a JSON list or a comma-separated form field."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        keys = [key.strip() for key in value.split(",") if key.strip()]
+    elif isinstance(value, list) and all(isinstance(key, str) for key in value):
+        keys = [key.strip() for key in value if key.strip()]
+    else:
+        raise HTTPException(status_code=400, detail="agents must be a list of agent keys.")
+    if not keys:
+        raise HTTPException(status_code=400, detail="Select at least one agent.")
+    return keys
+
+
+def _normalize_answer_length(value: Any) -> str:
+    normalized = str(value or DEFAULT_AGENT_SET).strip().lower()
+    if normalized not in agent_registry.sets:
+        names = [repr(name) for name in agent_registry.names]
+        choices = " or ".join([", ".join(names[:-1]), names[-1]] if len(names) > 1 else names)
+        raise HTTPException(status_code=400, detail=f"answer_length must be {choices}.")
+    return normalized
+
+
+def _agent_configs(answer_length: str, keys: list[str] | None) -> list[dict[str, Any]]:
+    try:
+        return agent_registry.get(answer_length).select(keys)
+    except KeyError as exc:
+        raise HTTPException(status_code=400, detail=f"Unknown agents: {exc.args[0]}.") from exc
+
+
+async def _read_analysis_input(
+    request: Request,
+    text: str | None,
+    file: UploadFile | None,
+    answer_length: str | None,
+    agent_mode: str | None = None,
+    agents: Any = None,
+    on_similar: str | None = None,
+) -> dict[str, Any]:
     if file is not None:
         if file.content_type != "application/pdf":
             raise HTTPException(status_code=400, detail="Only PDF uploads are supported.")
-        file_bytes = await file.read()
-        if len(file_bytes) > MAX_PDF_BYTES:
-            raise HTTPException(status_code=413, detail="PDF is too large. Max size is 10MB.")
+        with timed_stage("upload"):
+            upload = await save_pdf_upload(file, MAX_PDF_BYTES)
+        UPLOAD_BYTES.observe(upload["size"], kind="pdf")
         try:
-            extracted = _extract_pdf_text(file_bytes)
-        except Exception as exc:
-            raise HTTPException(status_code=400, detail="Unable to read PDF text.") from exc
-        extracted = _reduce_academic_pdf_text(extracted)
+            extracted, pdf_timing = await _extract_pdf_text(upload["path"], upload["sha256"])
+        finally:
+            os.unlink(upload["path"])
         cleaned = _validate_text(extracted)
     else:
         # JSON path (frontend posts application/json) OR form field "text"
@@ -246,350 +881,685 @@ async def analyze(
                 text = body.get("text")
                 if answer_length is None:
                     answer_length = body.get("answer_length")
+                if agent_mode is None:
+                    agent_mode = body.get("agent_mode")
+                if agents is None:
+                    agents = body.get("agents")
+                if on_similar is None:
+                    on_similar = body.get("on_similar")
 
 
         if text is None:
             raise HTTPException(status_code=400, detail="Provide text or upload a PDF.")
         cleaned = _validate_text(text)
 
-    answer_length_normalized = (answer_length or "long").strip().lower()
-    if answer_length_normalized not in {"short", "long"}:
-        raise HTTPException(status_code=400, detail="answer_length must be 'short' or 'long'.")
-
-    agent_configs = AGENT_CONFIGS_SHORT if answer_length_normalized == "short" else AGENT_CONFIGS
-    results = await _run_agents(cleaned, agent_configs)
-
-    if all(v.get("status") == "error" for v in results.values()):
-        raise HTTPException(status_code=502, detail="Analysis failed. Please try again later.")
-    return JSONResponse({"analysis": results, "meta": {"answer_length": answer_length_normalized}})
+    answer_length_normalized = _normalize_answer_length(answer_length)
+    agent_configs = _agent_configs(answer_length_normalized, _agent_keys(agents))
 
+    agent_mode_normalized = str(agent_mode or "separate").strip().lower()
+    if agent_mode_normalized not in AGENT_MODES:
+        raise HTTPException(status_code=400, detail="agent_mode must be 'separate' or 'fused'.")
 
-_MD_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
-_MD_BULLET_RE = re.compile(r"^(\s*)([-*])\s+(.*)$")
+    on_similar_normalized = str(on_similar or "reuse").strip().lower()
+    if on_similar_normalized not in SIMILAR_ACTIONS:
+        raise HTTPException(status_code=400, detail="on_similar must be 'reuse' or 'rerun'.")
+    cleaned, similar = await _match_similar(cleaned, on_similar_normalized, agent_configs, agent_mode_normalized)
 
-def _md_inline_to_rl(text: str) -> str:
+    inputs: dict[str, Any] = {
+        "text": cleaned,
+        "answer_length": answer_length_normalized,
+        "agent_mode": agent_mode_normalized,
+        "agent_configs": agent_configs,
+    }
+    if file is not None:
+        inputs["pdf"] = pdf_timing
+    if similar is not None:
+        inputs["similar"] = similar
+    return inputs
+
+
+async def _match_similar(
+    text: str,
+    on_similar: str,
+    agent_configs: list[dict[str, Any]],
+    agent_mode: str,
+) -> tuple[str, dict[str, Any] | None]:
     """
-    Convert a small, safe subset of Markdown inline formatting to ReportLab's
-    Paragraph markup (HTML-ish): **bold**, *italic*, `code`.
+    Look for an earlier submission that is a near-duplicate of `text`. With
+    on_similar="reuse" its text is analyzed instead, but only when every
+    selected agent's result for it is cached; otherwise, and with "rerun",
+    the new text is analyzed. Texts analyzed as submitted are kept in the
+    document store and indexed for later lookups.
     """
-    if not text:
-        return ""
-
-    # Escape basic XML chars first
-    text = (
-        text.replace("&", "&amp;")
-            .replace("<", "&lt;")
-            .replace(">", "&gt;")
+    if not similarity_index.enabled:
+        return text, None
+    document_id = text_hash(text)
+    if document_id in similarity_index:
+        # Submitted before exactly as is: its own results are the ones to use.
+        document_store.put(text)
+        return text, None
+    fingerprint, best = await asyncio.to_thread(similarity_index.match, text, document_id, document_store.get)
+    reuse = (
+        best is not None
+        and on_similar == "reuse"
+        and await _has_cached_results(best[1], agent_configs, agent_mode)
     )
+    if fingerprint is not None and not reuse:
+        document_store.put(text)
+        similarity_index.add(document_id, fingerprint)
+    if best is None:
+        return text, None
+    prior_id, prior_text, score = best
+    similar = {
+        "document_id": prior_id,
+        "similarity": round(score, 4),
+        "action": "reused" if reuse else "rerun",
+    }
+    return (prior_text if reuse else text), similar
 
-    # Inline code
-    text = re.sub(r"`([^`]+)`", r'<font face="Courier">\1</font>', text)
 
-    # Bold **...**
-    text = re.sub(r"\*\*([^*]+)\*\*", r"<b>\1</b>", text)
+# FIX 3: remove Body() from signature; manually parse JSON when needed
+@app.post("/api/analyze")
+async def analyze(
+    request: Request,
+    text: str | None = Form(None),
+    file: UploadFile | None = File(None),
+    answer_length: str | None = Form(None),
+    agent_mode: str | None = Form(None),
+    agents: str | None = Form(None),
+    on_similar: str | None = Form(None),
+) -> Response:
+    inputs = await _read_analysis_input(request, text, file, answer_length, agent_mode, agents, on_similar)
+    answer_length_normalized = inputs["answer_length"]
+
+    agent_configs = inputs["agent_configs"]
+    _ensure_upstream_capacity(agent_configs, inputs["text"])
+    client_id = _client_id(request)
+    results = None
+    if inputs["agent_mode"] == "fused":
+        try:
+            results = await _run_fused(
+                model_client.client, agent_configs, inputs["text"], answer_length_normalized, client_id,
+                _analysis_deadline(inputs["text"], agent_configs),
+            )
+        except SchedulerOverloaded as exc:
+            raise _busy_error(exc) from exc
+    agent_mode_used = "separate" if results is None else "fused"
+    if results is None:
+        results = await _run_agents(inputs["text"], agent_configs, answer_length_normalized, client_id)
 
-    # Italic *...* (avoid clobbering bullet markers and already-converted tags)
-    text = re.sub(r"(?<!\*)\*([^*]+)\*(?!\*)", r"<i>\1</i>", text)
+    if all(v.get("status") == "error" for v in results.values()):
+        raise HTTPException(status_code=502, detail="Analysis failed. Please try again later.")
+    meta: dict[str, Any] = {
+        "answer_length": answer_length_normalized,
+        "agent_mode": agent_mode_used,
+        "input": text_budget.plan(inputs["text"]),
+    }
+    if "pdf" in inputs:
+        meta["pdf"] = inputs["pdf"]
+    if "similar" in inputs:
+        meta["similar"] = inputs["similar"]
+    if _wants_sections(request):
+        results = {key: _present(result, True) for key, result in results.items()}
+    return negotiated_response(request, {"analysis": results, "meta": meta})
 
-    return text
+
+@app.post("/api/analyze/stream")
+async def analyze_stream(
+    request: Request,
+    text: str | None = Form(None),
+    file: UploadFile | None = File(None),
+    answer_length: str | None = Form(None),
+    agent_mode: str | None = Form(None),
+    agents: str | None = Form(None),
+    on_similar: str | None = Form(None),
+) -> StreamingResponse:
+    inputs = await _read_analysis_input(request, text, file, answer_length, agent_mode, agents, on_similar)
+    answer_length_normalized = inputs["answer_length"]
+
+    agent_configs = inputs["agent_configs"]
+    _ensure_upstream_capacity(agent_configs, inputs["text"])
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(
+        _analysis_events(
+            inputs["text"],
+            agent_configs,
+            answer_length_normalized,
+            _client_id(request),
+            inputs["agent_mode"],
+            inputs.get("similar"),
+            _wants_sections(request),
+        ),
+        media_type="text/event-stream",
+        headers=headers,
+    )
 
 
-def _markdown_to_flowables(markdown_text: str) -> list[Any]:
+@app.post("/api/documents", status_code=201)
+async def create_document(
+    request: Request,
+    text: str | None = Form(None),
+    file: UploadFile | None = File(None),
+    answer_length: str | None = Form(None),
+    agents: str | None = Form(None),
+    on_similar: str | None = Form(None),
+) -> JSONResponse:
     """
-    Convert agent markdown-ish output into a clean flowable list:
-    - headings (#, ##, ###)
-    - paragraphs (reflow wrapped lines)
-    - bullet lists (-, *)
+    Clean and store a document once, returning a handle that per-agent
+    requests refer to instead of re-uploading the text.
     """
-    styles = getSampleStyleSheet()
-
-    body = ParagraphStyle(
-        "CTBody",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=10.5,
-        leading=14,
-        spaceAfter=8,
-    )
-    h1 = ParagraphStyle(
-        "CTH1",
-        parent=styles["Heading1"],
-        fontName="Helvetica-Bold",
-        fontSize=16,
-        leading=20,
-        spaceBefore=12,
-        spaceAfter=8,
-        textColor=colors.HexColor("#111827"),
-    )
-    h2 = ParagraphStyle(
-        "CTH2",
-        parent=styles["Heading2"],
-        fontName="Helvetica-Bold",
-        fontSize=13,
-        leading=16,
-        spaceBefore=12,
-        spaceAfter=6,
-        textColor=colors.HexColor("#111827"),
-    )
-    h3 = ParagraphStyle(
-        "CTH3",
-        parent=styles["Heading3"],
-        fontName="Helvetica-Bold",
-        fontSize=11.5,
-        leading=14,
-        spaceBefore=10,
-        spaceAfter=4,
-        textColor=colors.HexColor("#111827"),
+    inputs = await _read_analysis_input(request, text, file, answer_length, None, agents, on_similar)
+    document_id = document_store.put(inputs["text"])
+    data: dict[str, Any] = {
+        "document_id": document_id,
+        "answer_length": inputs["answer_length"],
+        "agents": [agent["key"] for agent in inputs["agent_configs"]],
+        "input": text_budget.plan(inputs["text"]),
+    }
+    if "pdf" in inputs:
+        data["pdf"] = inputs["pdf"]
+    if "similar" in inputs:
+        data["similar"] = inputs["similar"]
+    return JSONResponse(data, status_code=201)
+
+
+@app.post("/api/documents/{document_id}/agents/{agent_key}")
+async def analyze_document_agent(
+    document_id: str,
+    agent_key: str,
+    request: Request,
+    answer_length: str | None = None,
+    priority: str = "normal",
+    stream: bool = False,
+) -> Response:
+    """
+    Run one agent on a stored document. priority=low queues the call behind
+    interactive work (for prefetching tabs the user has not opened yet);
+    stream=true answers with the same SSE events as /api/analyze/stream.
+    """
+    text = document_store.get(document_id)
+    if text is None:
+        raise HTTPException(status_code=404, detail="Document not found. Please submit it again.")
+    answer_length_normalized = _normalize_answer_length(answer_length)
+    agent = _agent_configs(answer_length_normalized, [agent_key])[0]
+    if priority not in {"normal", "low"}:
+        raise HTTPException(status_code=400, detail="priority must be 'normal' or 'low'.")
+    client_id = _client_id(request)
+
+    if stream:
+        _ensure_upstream_capacity([agent], text)
+        return StreamingResponse(
+            _analysis_events(
+                text, [agent], answer_length_normalized, client_id, sections=_wants_sections(request)
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    try:
+        content = await _run_agent(
+            model_client.client, agent, text, answer_length_normalized, client_id, _analysis_deadline(text, [agent]),
+            prefetch=priority == "low",
+        )
+    except SchedulerOverloaded as exc:
+        raise _busy_error(exc) from exc
+    except Exception as exc:
+        return JSONResponse({"agent": agent_key, "status": "error", "message": str(exc)}, status_code=502)
+    result = _present({"status": "ok", "content": content}, _wants_sections(request))
+    return negotiated_response(request, {"agent": agent_key, **result})
+
+
+async def _run_agent_patiently(
+    client: httpx.AsyncClient,
+    agent: dict[str, Any],
+    text: str,
+    answer_length: str,
+    client_id: str,
+    deadline: Deadline,
+) -> dict[str, Any]:
+    """
+    Run one agent for background work (jobs, batches). Nobody is holding a
+    connection open, so upstream overload is waited out instead of failing.
+    """
+    while True:
+        try:
+            content = await _run_agent(client, agent, text, answer_length, client_id, deadline)
+            return {"status": "ok", "content": content}
+        except SchedulerOverloaded as exc:
+            if exc.retry_after < deadline.remaining():
+                await asyncio.sleep(exc.retry_after)
+                continue
+            return {"status": "error", "message": str(exc)}
+        except Exception as exc:
+            return {"status": "error", "message": str(exc)}
+
+
+async def _run_job_agent(
+    job_id: str,
+    agent: dict[str, Any],
+    text: str,
+    answer_length: str,
+    client_id: str,
+    deadline: Deadline,
+) -> dict[str, Any]:
+    result = await _run_agent_patiently(model_client.client, agent, text, answer_length, client_id, deadline)
+    await asyncio.to_thread(job_store.set_result, job_id, agent["key"], result)
+    return result
+
+
+async def _run_job(
+    job_id: str,
+    text: str,
+    agent_configs: list[dict[str, Any]],
+    answer_length: str,
+    client_id: str,
+    agent_mode: str = "separate",
+) -> None:
+    try:
+        await asyncio.to_thread(job_store.set_status, job_id, "running")
+        deadline = _analysis_deadline(text, agent_configs)
+        fused = None
+        if agent_mode == "fused":
+            try:
+                fused = await _run_fused(model_client.client, agent_configs, text, answer_length, client_id, deadline)
+            except SchedulerOverloaded:
+                pass
+        if fused is not None:
+            for key, result in fused.items():
+                await asyncio.to_thread(job_store.set_result, job_id, key, result)
+            results = list(fused.values())
+        else:
+            results = await asyncio.gather(*(
+                _run_job_agent(job_id, agent, text, answer_length, client_id, deadline) for agent in agent_configs
+            ))
+        if all(r["status"] == "error" for r in results):
+            await asyncio.to_thread(job_store.set_status, job_id, "failed", "Analysis failed. Please try again later.")
+        else:
+            await asyncio.to_thread(job_store.set_status, job_id, "done")
+    except asyncio.CancelledError:
+        job_store.set_status(job_id, "failed", "Interrupted by a server restart.")
+        raise
+    except Exception:
+        await asyncio.to_thread(job_store.set_status, job_id, "failed", "Analysis failed. Please try again later.")
+        raise
+
+
+@app.post("/api/jobs", status_code=202)
+async def create_job(
+    request: Request,
+    text: str | None = Form(None),
+    file: UploadFile | None = File(None),
+    answer_length: str | None = Form(None),
+    agent_mode: str | None = Form(None),
+    agents: str | None = Form(None),
+    on_similar: str | None = Form(None),
+) -> JSONResponse:
+    if len(job_tasks) >= JOBS_MAX_ACTIVE:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many analyses are running. Please try again shortly.",
+            headers={"Retry-After": "30"},
+        )
+    inputs = await _read_analysis_input(request, text, file, answer_length, agent_mode, agents, on_similar)
+    answer_length_normalized = inputs["answer_length"]
+    agent_configs = inputs["agent_configs"]
+
+    meta: dict[str, Any] = {
+        "answer_length": answer_length_normalized,
+        "agent_mode": inputs["agent_mode"],
+        "input": text_budget.plan(inputs["text"]),
+    }
+    if "pdf" in inputs:
+        meta["pdf"] = inputs["pdf"]
+    if "similar" in inputs:
+        meta["similar"] = inputs["similar"]
+
+    job_id = new_job_id()
+    agent_keys = [agent["key"] for agent in agent_configs]
+    await asyncio.to_thread(job_store.create, job_id, answer_length_normalized, agent_keys, meta)
+    task = asyncio.create_task(
+        _run_job(
+            job_id, inputs["text"], agent_configs, answer_length_normalized, _client_id(request), inputs["agent_mode"]
+        )
     )
-    bullet_style = ParagraphStyle(
-        "CTBullet",
-        parent=body,
-        leftIndent=18,
-        firstLineIndent=-8,
-        spaceAfter=4,
+    job_tasks.add(task)
+    task.add_done_callback(job_tasks.discard)
+
+    return JSONResponse(
+        {"job_id": job_id, "status": "queued", "agents": agent_keys, "meta": meta},
+        status_code=202,
+        headers={"Location": f"/api/jobs/{job_id}"},
     )
 
-    def flush_paragraph(buf: list[str], out: list[Any]) -> None:
-        if not buf:
-            return
-        text = " ".join(s.strip() for s in buf).strip()
-        if text:
-            out.append(Paragraph(_md_inline_to_rl(text), body))
-        buf.clear()
-
-    out: list[Any] = []
-    lines = (markdown_text or "").splitlines()
-
-    paragraph_buf: list[str] = []
-    list_items: list[ListItem] = []
-
-    def flush_list() -> None:
-        nonlocal list_items
-        if list_items:
-            out.append(ListFlowable(list_items, bulletType="bullet", leftIndent=14))
-            list_items = []
-
-    for raw in lines:
-        line = raw.rstrip()
-        stripped = line.strip()
-
-        # blank line -> flush paragraph + list
-        if not stripped:
-            flush_paragraph(paragraph_buf, out)
-            flush_list()
-            continue
-
-        # heading?
-        m = _MD_HEADING_RE.match(stripped)
-        if m:
-            flush_paragraph(paragraph_buf, out)
-            flush_list()
-            level = len(m.group(1))
-            text = _md_inline_to_rl(m.group(2).strip())
-            if level <= 1:
-                out.append(Paragraph(text, h1))
-            elif level == 2:
-                out.append(Paragraph(text, h2))
-            else:
-                out.append(Paragraph(text, h3))
-            continue
-
-        # bullet?
-        mb = _MD_BULLET_RE.match(line)
-        if mb:
-            flush_paragraph(paragraph_buf, out)
-            indent_spaces = len(mb.group(1) or "")
-            item_text = _md_inline_to_rl(mb.group(3).strip())
-
-            # simple nesting by indent
-            left_indent = 18 + (indent_spaces // 2) * 10
-            nested_style = ParagraphStyle(
-                f"CTBullet_{left_indent}",
-                parent=bullet_style,
-                leftIndent=left_indent,
-            )
-            list_items.append(ListItem(Paragraph(item_text, nested_style)))
-            continue
 
-        # normal text -> accumulate into reflowed paragraph
-        paragraph_buf.append(stripped)
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, request: Request) -> Response:
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if _wants_sections(request):
+        job["analysis"] = {key: _present(result, True) for key, result in job["analysis"].items()}
+    return negotiated_response(request, job, headers={"Cache-Control": "no-store"})
+
+
+async def _read_batch_file(file: UploadFile) -> list[dict[str, Any]]:
+    name = file.filename or "upload"
+    ext = os.path.splitext(name)[1].lower()
+    if ext == ".pdf" or file.content_type == "application/pdf":
+        with timed_stage("upload"):
+            upload = await save_pdf_upload(file, MAX_PDF_BYTES)
+        UPLOAD_BYTES.observe(upload["size"], kind="pdf")
+        return [{"id": name, "pdf_path": upload["path"], "sha256": upload["sha256"]}]
+    if ext == ".zip":
+        too_large = "Batch upload is too large. Max size is %dMB." % (BATCH_MAX_BYTES // (1024 * 1024))
+        with timed_stage("upload"):
+            upload = await save_upload(file, BATCH_MAX_BYTES, too_large, suffix=".zip")
+        UPLOAD_BYTES.observe(upload["size"], kind="zip")
+        try:
+            return await asyncio.to_thread(read_zip_documents, upload["path"], MAX_PDF_BYTES, MAX_TEXT_CHARS)
+        finally:
+            os.unlink(upload["path"])
+    if ext in JSONL_EXTENSIONS or ext in TEXT_EXTENSIONS:
+        data = await file.read(BATCH_MAX_BYTES + 1)
+        if len(data) > BATCH_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"{name} is too large.")
+        if ext in JSONL_EXTENSIONS:
+            return parse_jsonl(data, name, MAX_TEXT_CHARS)
+        return [text_document(name, data.decode("utf-8", errors="replace"), MAX_TEXT_CHARS)]
+    raise HTTPException(status_code=400, detail=f"{name}: upload PDFs, .txt/.md, JSONL or a ZIP of them.")
+
+
+async def _read_batch_input(
+    request: Request,
+    files: list[UploadFile] | None,
+    answer_length: str | None,
+    agents: Any = None,
+) -> tuple[list[dict[str, Any]], str, list[dict[str, Any]]]:
+    content_type = request.headers.get("content-type", "")
+    documents: list[dict[str, Any]] = []
+    try:
+        if files:
+            for file in files:
+                documents.extend(await _read_batch_file(file))
+                if len(documents) > BATCH_MAX_DOCUMENTS:
+                    break
+        elif content_type.startswith("application/json"):
+            try:
+                body = await request.json()
+            except Exception:
+                body = None
+            items = body.get("documents") if isinstance(body, dict) else None
+            if not isinstance(items, list):
+                raise HTTPException(status_code=400, detail="Provide a \"documents\" list.")
+            documents = [
+                document_from_json(item, f"document-{i + 1}", MAX_TEXT_CHARS) for i, item in enumerate(items)
+            ]
+            if answer_length is None:
+                answer_length = body.get("answer_length")
+            if agents is None:
+                agents = body.get("agents")
+        elif content_type.startswith(("application/x-ndjson", "application/jsonl")):
+            documents = parse_jsonl(await request.body(), "body", MAX_TEXT_CHARS)
+            if answer_length is None:
+                answer_length = request.query_params.get("answer_length")
+            if agents is None:
+                agents = request.query_params.get("agents")
+
+        if not documents:
+            raise HTTPException(status_code=400, detail="Provide documents to analyze.")
+        if len(documents) > BATCH_MAX_DOCUMENTS:
+            raise HTTPException(status_code=400, detail=f"A batch may contain at most {BATCH_MAX_DOCUMENTS} documents.")
+
+        answer_length_normalized = _normalize_answer_length(answer_length)
+        agent_configs = _agent_configs(answer_length_normalized, _agent_keys(agents))
+    except BaseException:
+        _remove_batch_files(documents)
+        raise
+    return documents, answer_length_normalized, agent_configs
+
+
+def _remove_batch_files(documents: list[dict[str, Any]]) -> None:
+    for document in documents:
+        path = document.pop("pdf_path", None)
+        if path is not None:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+async def _batch_events(
+    documents: list[dict[str, Any]],
+    agent_configs: list[dict[str, Any]],
+    answer_length: str,
+    client_id: str,
+    sections: bool = False,
+) -> AsyncIterator[bytes]:
+    client = model_client.client
+    stats = BatchStats(len(documents), text_budget)
+    events: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+    calls = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    # Queueing every PDF at once would let extraction timeouts fire while
+    # documents are still waiting for a worker.
+    extractions = asyncio.Semaphore(pdf_extractor.workers)
+
+    async def load(document: dict[str, Any]) -> str:
+        if "error" in document:
+            raise HTTPException(status_code=413, detail=document["error"])
+        if "pdf_path" not in document:
+            return _validate_text(document["text"])
+        async with extractions:
+            try:
+                text, _ = await _extract_pdf_text(document["pdf_path"], document.get("sha256"))
+            finally:
+                _remove_batch_files([document])
+        return _validate_text(text)
+
+    async def run_call(document_id: str, agent: dict[str, Any], text: str) -> dict[str, Any]:
+        async with calls:
+            result = await _run_agent_patiently(
+                client, agent, text, answer_length, client_id, _analysis_deadline(text, [agent])
+            )
+        stats.record_call(text, result)
+        await events.put({"type": "result", "document": document_id, "agent": agent["key"], **_present(result, sections)})
+        return result
 
-    flush_paragraph(paragraph_buf, out)
-    flush_list()
+    async def run_document(document: dict[str, Any]) -> None:
+        try:
+            text = await load(document)
+        except HTTPException as exc:
+            stats.record_document(failed=True)
+            await events.put({"type": "document", "document": document["id"], "status": "error", "message": exc.detail})
+            return
+        results = await asyncio.gather(*(run_call(document["id"], agent, text) for agent in agent_configs))
+        failed = all(result["status"] == "error" for result in results)
+        stats.record_document(failed)
+        await events.put({
+            "type": "document",
+            "document": document["id"],
+            "status": "error" if failed else "ok",
+            **stats.snapshot(),
+        })
+
+    tasks = [asyncio.create_task(run_document(document)) for document in documents]
+    try:
+        yield _ndjson({
+            "type": "meta",
+            "documents": len(documents),
+            "agents": [agent["key"] for agent in agent_configs],
+            "answer_length": answer_length,
+            "max_concurrency": BATCH_MAX_CONCURRENCY,
+        })
+        remaining = len(tasks)
+        while remaining:
+            event = await events.get()
+            if event["type"] == "document":
+                remaining -= 1
+            yield _ndjson(event)
+        yield _ndjson({"type": "summary", **stats.snapshot()})
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        _remove_batch_files(documents)
+
+
+def _ndjson(data: dict[str, Any]) -> bytes:
+    return (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@app.post("/api/batch")
+async def analyze_batch(
+    request: Request,
+    files: list[UploadFile] | None = File(None),
+    answer_length: str | None = Form(None),
+    agents: str | None = Form(None),
+) -> StreamingResponse:
+    documents, answer_length_normalized, agent_configs = await _read_batch_input(
+        request, files, answer_length, agents
+    )
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    # A separate scheduler client, so batch calls take turns with interactive
+    # users instead of queueing ahead of them.
+    client_id = f"batch:{_client_id(request)}"
+    return StreamingResponse(
+        _batch_events(documents, agent_configs, answer_length_normalized, client_id, _wants_sections(request)),
+        media_type="application/x-ndjson",
+        headers=headers,
+    )
 
-    return out
 
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
 
-def _draw_header_footer(canvas, doc):
-    canvas.saveState()
-    canvas.setFont("Helvetica", 9)
-    canvas.setFillColor(colors.HexColor("#6B7280"))
 
-    # Footer: page number
-    page_num = canvas.getPageNumber()
-    canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, 0.55 * inch, f"Page {page_num}")
+def _report_headers(report_id: str) -> dict[str, str]:
+    return {
+        "ETag": f'"{report_id}"',
+        "Cache-Control": "private, no-cache",
+        "X-Report-Id": report_id,
+        "Content-Disposition": "attachment; filename=CriticalThinkingReport.pdf",
+    }
 
-    # Subtle footer line
-    canvas.setStrokeColor(colors.HexColor("#E5E7EB"))
-    canvas.setLineWidth(0.5)
-    canvas.line(doc.leftMargin, 0.75 * inch, doc.pagesize[0] - doc.rightMargin, 0.75 * inch)
 
-    canvas.restoreState()
+async def _render_report(report_id: str, analysis: dict[str, Any], agent_configs: list[dict[str, Any]]) -> bytes:
+    pdf_bytes = await report_cache.get(report_id)
+    if pdf_bytes is None:
+        pdf_bytes = await report_renderer.render(analysis, agent_configs)
+        await report_cache.set(report_id, pdf_bytes)
+    return pdf_bytes
 
 
-def _agent_header_card(agent: dict[str, Any]) -> Table:
+def _report_sections(analysis: dict[str, Any], agent_configs: list[dict[str, Any]]) -> dict[str, Any]:
     """
-    A simple 'card' with agent label + focus.
+    Each agent's section tree for the report: the one sent with the result,
+    or parsed from its markdown when only that was sent.
     """
-    label = agent.get("label", "Agent")
-    focus = agent.get("focus", "")
+    sections: dict[str, Any] = {}
+    for agent in agent_configs:
+        block = analysis.get(agent["key"])
+        block = block if isinstance(block, dict) else {}
+        tree = block.get("sections")
+        if tree is None:
+            content = block.get("content")
+            tree = parse_markdown(content) if isinstance(content, str) else []
+        elif not is_section_tree(tree):
+            raise HTTPException(status_code=400, detail=f"Invalid sections for agent '{agent['key']}'.")
+        sections[agent["key"]] = {"sections": tree}
+    return sections
 
-    data = [
-        [Paragraph(f"<b>{_md_inline_to_rl(label)} Agent</b>", getSampleStyleSheet()["BodyText"]),
-         Paragraph(_md_inline_to_rl(focus), getSampleStyleSheet()["BodyText"])]
-    ]
-    t = Table(data, colWidths=[2.1 * inch, 4.9 * inch])
-    t.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#F3F4F6")),
-        ("BOX", (0, 0), (-1, -1), 0.6, colors.HexColor("#E5E7EB")),
-        ("INNERPADDING", (0, 0), (-1, -1), 10),
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-    ]))
-    return t
-
-
-def _build_pdf(analysis: dict[str, Any], agent_configs: list[dict[str, Any]]) -> bytes:
-    buffer = io.BytesIO()
-
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=LETTER,
-        leftMargin=0.85 * inch,
-        rightMargin=0.85 * inch,
-        topMargin=0.9 * inch,
-        bottomMargin=0.9 * inch,
-        title="Critical Thinking Analysis Report",
-        author="Critical Thinker",
-    )
 
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        "CTTitle",
-        parent=styles["Title"],
-        fontName="Helvetica-Bold",
-        fontSize=22,
-        leading=26,
-        textColor=colors.HexColor("#111827"),
-        spaceAfter=10,
-    )
-    subtitle_style = ParagraphStyle(
-        "CTSubtitle",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=11,
-        leading=14,
-        textColor=colors.HexColor("#374151"),
-        spaceAfter=18,
-    )
-    meta_style = ParagraphStyle(
-        "CTMeta",
-        parent=styles["BodyText"],
-        fontName="Helvetica",
-        fontSize=9.5,
-        leading=12,
-        textColor=colors.HexColor("#6B7280"),
-        spaceAfter=6,
-    )
+@app.post("/api/generate-pdf")
+async def generate_pdf(request: Request) -> Response:
+    payload = await read_payload(request)
+    if not isinstance(payload, dict):
+        raise HTTPException(status_code=400, detail="Analysis data missing.")
 
-    story: list[Any] = []
-
-    # --- Cover page ---
-    story.append(Paragraph("Critical Thinking Analysis Report", title_style))
-    story.append(Paragraph(datetime.utcnow().strftime("Generated on %B %d, %Y"), subtitle_style))
-
-    # quick index of sections
-    section_list = "<br/>".join([f"• {a.get('label','Agent')} Agent" for a in agent_configs])
-    story.append(Paragraph(f"<b>Sections</b><br/>{section_list}", meta_style))
-
-    story.append(Spacer(1, 16))
-    story.append(Paragraph(
-        "This report compiles independent analyses from multiple agents using Paul & Elder’s critical thinking framework. "
-        "Each section is self-contained and may be read independently.",
-        subtitle_style
-    ))
-
-    story.append(PageBreak())
-
-    # --- Agent sections ---
-    for idx, agent in enumerate(agent_configs):
-        key = agent["key"]
-        block = analysis.get(key, {}) if isinstance(analysis, dict) else {}
-        content = block.get("content") or "Analysis unavailable."
-
-        # section header card + divider
-        story.append(KeepTogether([
-            _agent_header_card(agent),
-            Spacer(1, 10),
-            HRFlowable(width="100%", thickness=0.7, color=colors.HexColor("#E5E7EB")),
-            Spacer(1, 10),
-        ]))
-
-        # render markdown nicely
-        story.extend(_markdown_to_flowables(content))
-
-        # page break between agents (but not after last)
-        if idx < len(agent_configs) - 1:
-            story.append(PageBreak())
-
-    doc.build(story, onFirstPage=_draw_header_footer, onLaterPages=_draw_header_footer)
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    return pdf_bytes
+    job_id = payload.get("job_id")
+    if job_id:
+        job = await asyncio.to_thread(job_store.get, str(job_id))
+        if job is None:
+            raise HTTPException(status_code=404, detail="Job not found.")
+        if job["status"] != "done":
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}; no report is available.")
+        analysis = job["analysis"]
+        answer_length_normalized = job["answer_length"]
+    else:
+        analysis = payload.get("analysis")
+        if not isinstance(analysis, dict):
+            raise HTTPException(status_code=400, detail="Analysis data missing.")
+
+        answer_length_normalized = str(payload.get("answer_length") or DEFAULT_AGENT_SET).strip().lower()
+        if answer_length_normalized not in agent_registry.sets:
+            answer_length_normalized = DEFAULT_AGENT_SET
+
+    # The report covers the agents the analysis has, e.g. a requested subset.
+    agent_set = agent_registry.get(answer_length_normalized)
+    agent_configs = [agent for agent in agent_set.agents if agent["key"] in analysis]
+    if not agent_configs:
+        raise HTTPException(status_code=400, detail="Analysis data missing.")
+    analysis = _report_sections(analysis, agent_configs)
+    report_id = report_cache_key(analysis, answer_length_normalized, agent_configs)
+    headers = _report_headers(report_id)
+    if report_id in report_cache and _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
+    try:
+        # Concurrent clicks for the same report share a single render.
+        pdf_bytes = await report_flights.do(
+            report_id, lambda: _render_report(report_id, analysis, agent_configs)
+        )
+    except ReportBusy as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"}) from exc
+    except ReportTimeout as exc:
+        raise HTTPException(status_code=504, detail="Report generation timed out.") from exc
 
-@app.post("/api/generate-pdf")
-async def generate_pdf(payload: dict[str, Any]) -> StreamingResponse:
-    analysis = payload.get("analysis") if isinstance(payload, dict) else None
-    if not isinstance(analysis, dict):
-        raise HTTPException(status_code=400, detail="Analysis data missing.")
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
-    answer_length_normalized = str(payload.get("answer_length") or "long").strip().lower()
-    if answer_length_normalized not in {"short", "long"}:
-        answer_length_normalized = "long"
 
-    agent_configs = AGENT_CONFIGS_SHORT if answer_length_normalized == "short" else AGENT_CONFIGS
-    pdf_bytes = _build_pdf(analysis, agent_configs)
-    
-    headers = {"Content-Disposition": "attachment; filename=CriticalThinkingReport.pdf"}
-    return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf", headers=headers)
+@app.get("/api/reports/{report_id}")
+async def get_report(report_id: str, request: Request) -> Response:
+    if not is_report_id(report_id) or report_id not in report_cache:
+        raise HTTPException(status_code=404, detail="Report not found.")
 
-dist_dir = Path(os.getenv("FRONTEND_DIST", "frontend_dist")).resolve()
-index_html = dist_dir / "index.html"
-assets_dir = dist_dir / "assets"
+    headers = _report_headers(report_id)
+    if _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-if assets_dir.exists():
-    app.mount("/assets", StaticFiles(directory=assets_dir), name="assets")
+    pdf_bytes = await report_cache.get(report_id)
+    if pdf_bytes is None:
+        raise HTTPException(status_code=404, detail="Report not found.")
+    return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
 @app.get("/", include_in_schema=False)
-async def spa_index():
-    if index_html.exists():
-        return FileResponse(index_html)
+async def spa_index(request: Request):
+    if static_site.index is not None:
+        return static_site.response(static_site.index, request)
     # If you still see JSON at / after this, you're not running this file.
     return JSONResponse(
         {"status": "ok", "note": "Frontend index.html not found", "FRONTEND_DIST": str(dist_dir)},
         status_code=200,
     )
 
-@app.get("/{full_path:path}", include_in_schema=False)
-async def spa_fallback(full_path: str):
+@app.api_route("/{full_path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def spa_fallback(full_path: str, request: Request):
     if full_path == "api" or full_path.startswith("api/"):
         raise HTTPException(status_code=404, detail="Not Found")
 
-    candidate = dist_dir / full_path
-    if candidate.is_file():
-        return FileResponse(candidate)
+    asset = static_site.lookup(full_path)
+    if asset is not None:
+        return static_site.response(asset, request)
+
+    # A missing build file is a 404, not the SPA shell.
+    if full_path.startswith("assets/"):
+        raise HTTPException(status_code=404, detail="Not Found")
 
-    if index_html.exists():
-        return FileResponse(index_html)
+    if static_site.index is not None:
+        return static_site.response(static_site.index, request)
 
     raise HTTPException(status_code=404, detail="Not Found")
@@ -0,0 +1,108 @@
+"""
+Benchmark for incremental PDF ingestion.
+
+Builds synthetic papers with reportlab (body pages followed by a
+References section and appendices) and times three ways of getting their
+analyzed text:
+
+- full: extract every page, then reduce_academic_text (the old path)
+- incremental: PageTrimmer stops extraction at the back matter
+- cached: the same upload again, served from the page cache
+
+The incremental text is checked against the full path's:
+
+    python -m benchmarks.bench_pdf_ingest [--pages 40,120] [--back-matter 0.3] [--workers 2]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate
+
+from backend.app.ingest import PageTrimmer, reduce_academic_text
+from backend.app.pdf_extract import PdfExtractor
+
+_WORDS = (
+    "evidence claim model results data analysis policy effect sample method "
+    "participants outcome variance theory framework argument inference cost"
+).split()
+
+
+def _paragraph(rng: random.Random, words: int = 90) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def build_paper(path: str, pages: int, back_matter: float, rng: random.Random) -> None:
+    styles = getSampleStyleSheet()
+    story = []
+    body_pages = max(1, round(pages * (1 - back_matter)))
+    for page in range(pages):
+        if page == body_pages:
+            story.append(Paragraph("References", styles["Heading1"]))
+        elif page == body_pages + (pages - body_pages) // 2:
+            story.append(Paragraph("Appendix A", styles["Heading1"]))
+        for _ in range(5):
+            if page >= body_pages:
+                story.append(Paragraph(f"[{rng.randint(1, 999)}] " + _paragraph(rng, 30), styles["BodyText"]))
+            else:
+                story.append(Paragraph(_paragraph(rng), styles["BodyText"]))
+        story.append(PageBreak())
+    SimpleDocTemplate(path, pagesize=A4).build(story)
+
+
+async def _run(extractor: PdfExtractor, path: str, file_hash: str | None, incremental: bool):
+    started = time.perf_counter()
+    if incremental:
+        trimmer = PageTrimmer(10**9)
+        _, timing = await extractor.extract(path, file_hash, trimmer.add)
+        text = trimmer.text()
+    else:
+        extracted, timing = await extractor.extract(path)
+        text = reduce_academic_text(extracted)
+    return text, timing, time.perf_counter() - started
+
+
+async def bench(pages: int, back_matter: float, workers: int) -> None:
+    rng = random.Random(pages)
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    extractor = PdfExtractor(workers=workers)
+    try:
+        build_paper(path, pages, back_matter, rng)
+        extractor.start()
+        file_hash = f"bench-{pages}-{back_matter}"
+        # Warm the workers up (imports, first parse) outside the timings.
+        await _run(extractor, path, None, incremental=False)
+        full_text, full, full_s = await _run(extractor, path, None, incremental=False)
+        inc_text, inc, inc_s = await _run(extractor, path, file_hash, incremental=True)
+        cached_text, cached, cached_s = await _run(extractor, path, file_hash, incremental=True)
+        match = "yes" if full_text == inc_text == cached_text else "NO"
+        for name, timing, seconds in (("full", full, full_s), ("incremental", inc, inc_s), ("cached", cached, cached_s)):
+            print(
+                f"{pages:>6} {name:<12} {timing['pages_read']:>5}/{timing['pages']:<5} {timing['pages_cached']:>7} "
+                f"{seconds * 1000:>9.1f}ms {full_s / seconds:>7.1f}x {len(inc_text):>9} {match:>6}"
+            )
+    finally:
+        extractor.shutdown()
+        os.unlink(path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", default="40,120", help="comma-separated page counts")
+    parser.add_argument("--back-matter", type=float, default=0.3, help="fraction of pages after the body")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+    print(f"{'pages':>6} {'path':<12} {'read/total':>11} {'cached':>7} {'time':>11} {'speedup':>8} {'chars':>9} {'match':>6}")
+    for pages in (int(p) for p in args.pages.split(",")):
+        asyncio.run(bench(pages, args.back_matter, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+A/B benchmark of PROMPT_LAYOUT against a stub that models prefix caching.
+
+Starts benchmarks/stub_model_server.py in-process with a prefill cost per
+uncached prompt token, then for each layout sends every document to the
+four agents concurrently (as /api/analyze does) and measures
+time-to-first-token of the streamed responses:
+
+    python -m benchmarks.bench_prompt_layout [--documents 6] [--prefill-ms-per-ktok 150]
+
+system_first lets each agent's instructions be cached across documents;
+document_first lets the document be cached across the four agents of one
+analysis, which wins once documents are longer than the instructions.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import threading
+import time
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_stub(port: int, prefill_ms_per_ktok: float, latency_ms: float):
+    # The stub reads its configuration at import time.
+    os.environ["STUB_PREFILL_MS_PER_KTOK"] = str(prefill_ms_per_ktok)
+    os.environ["STUB_LATENCY_MS"] = str(latency_ms)
+    os.environ["STUB_JITTER_MS"] = "0"
+    import uvicorn
+
+    from benchmarks.stub_model_server import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+_WORDS = (
+    "policy evidence growth transition energy cost benefit households firms carbon emissions "
+    "jobs health subsidy tax market demand supply regulation risk uncertainty adoption"
+).split()
+
+
+def synthetic_document(tokens: int, rng: random.Random) -> str:
+    words = []
+    chars = 0
+    while chars < tokens * 4:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        chars += len(word) + 1
+    return " ".join(words)
+
+
+async def _ttft(client, url: str, messages: list[dict]) -> float:
+    payload = {"model": "stub", "messages": messages, "stream": True}
+    started = time.perf_counter()
+    ttft = None
+    async with client.stream("POST", url, json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if ttft is None and line.startswith("data:"):
+                ttft = time.perf_counter() - started
+    return ttft
+
+
+async def run_layout(base_url: str, layout: str, documents: list[str], agents: list[dict]) -> dict:
+    import httpx
+
+    from backend.app.prompt_layout import build_messages
+
+    async with httpx.AsyncClient(timeout=300) as client:
+        await client.post(f"{base_url}/reset")
+        samples: list[float] = []
+        started = time.perf_counter()
+        for text in documents:
+            samples += await asyncio.gather(*(
+                _ttft(client, f"{base_url}/v1/chat/completions", build_messages(agent["system"], text, layout, False))
+                for agent in agents
+            ))
+        elapsed = time.perf_counter() - started
+        stats = (await client.get(f"{base_url}/stats")).json()
+
+    ordered = sorted(samples)
+    return {
+        "ttft_mean": statistics.mean(samples),
+        "ttft_p50": statistics.median(samples),
+        "ttft_p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "elapsed": elapsed,
+        "cached_ratio": stats["cached_tokens"] / max(1, stats["prompt_tokens"]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--documents", type=int, default=6)
+    parser.add_argument("--sizes", default="250,1000,4000,8000", help="document sizes in tokens")
+    parser.add_argument("--prefill-ms-per-ktok", type=float, default=150.0)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--short", action="store_true", help="use the short-answer agent prompts")
+    args = parser.parse_args()
+
+    if args.short:
+        from backend.app.prompts_short import AGENT_CONFIGS_SHORT as agents
+    else:
+        from backend.app.prompts import AGENT_CONFIGS as agents
+
+    port = _free_port()
+    server, thread = _start_stub(port, args.prefill_ms_per_ktok, args.latency_ms)
+    base_url = f"http://127.0.0.1:{port}"
+    print(f"stub prefill {args.prefill_ms_per_ktok:g} ms / 1k uncached tokens, {args.documents} documents x {len(agents)} agents")
+    print(f"{'doc tokens':>10} {'layout':<15} {'ttft mean':>10} {'ttft p50':>9} {'ttft p95':>9} {'cached':>7} {'total s':>8}")
+    try:
+        for size in (int(s) for s in args.sizes.split(",")):
+            rng = random.Random(size)
+            documents = [synthetic_document(size, rng) for _ in range(args.documents)]
+            baseline = None
+            for layout in ("system_first", "document_first"):
+                result = asyncio.run(run_layout(base_url, layout, documents, agents))
+                baseline = baseline or result["ttft_mean"]
+                print(
+                    f"{size:>10} {layout:<15} {result['ttft_mean'] * 1000:>8.0f}ms {result['ttft_p50'] * 1000:>7.0f}ms "
+                    f"{result['ttft_p95'] * 1000:>7.0f}ms {result['cached_ratio']:>6.0%} {result['elapsed']:>8.2f}"
+                    + (f"  ({baseline / result['ttft_mean']:.2f}x)" if layout != "system_first" else "")
+                )
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main()
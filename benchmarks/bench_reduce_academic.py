@@ -0,0 +1,138 @@
+"""
+Benchmark and golden check for reduce_academic_text.
+
+Compares the single-pass matcher in backend/app/ingest.py against the original
+per-marker implementation (kept verbatim below) on synthetic academic papers,
+asserting identical output before reporting timings:
+
+    python -m benchmarks.bench_reduce_academic [--repeat 20]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+
+from backend.app.ingest import BACK_MATTER_MARKERS as _BACK_MATTER_MARKERS
+from backend.app.ingest import reduce_academic_text as _reduce_academic_pdf_text
+
+
+def _reduce_academic_pdf_text_legacy(text: str) -> str:
+    if not text:
+        return ""
+
+    t = text
+    t = t.replace("\r\n", "\n").replace("\r", "\n")
+    t = re.sub(r"[ \t]+", " ", t)
+    t = re.sub(r"\n{3,}", "\n\n", t).strip()
+
+    lower = t.lower()
+    n = len(lower)
+    if n < 5000:
+        return t
+
+    threshold = int(0.45 * n)
+    best_cut = None
+    for marker in _BACK_MATTER_MARKERS:
+        pattern = re.compile(rf"\n{re.escape(marker)}(\b|[ :])")
+        m = pattern.search(lower)
+        if m:
+            cut_idx = m.start()
+            if cut_idx >= threshold:
+                if best_cut is None or cut_idx < best_cut:
+                    best_cut = cut_idx
+
+    if best_cut is not None:
+        t = t[:best_cut].strip()
+
+    t = re.sub(r"\n{3,}", "\n\n", t).strip()
+    return t
+
+
+_WORDS = (
+    "evidence claim model results data analysis policy effect sample method "
+    "participants outcome variance theory framework argument inference cost "
+    "references appendix supplementary citations acknowledgement"
+).split()
+
+
+def _paragraph(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(40, 120))]
+    line_breaks = "\n" if rng.random() < 0.5 else "\n\n\n"
+    text = " ".join(words)
+    if rng.random() < 0.3:
+        text = text.replace(" ", "  \t ", 3)
+    return text.capitalize() + "." + line_breaks
+
+
+def synthetic_paper(chars: int, seed: int) -> str:
+    """A paper of ~`chars` characters with a TOC, body and back matter."""
+    rng = random.Random(seed)
+    parts = ["Title of the Paper\n\nContents\nIntroduction\nMethods\n"]
+    toc_markers = rng.sample(_BACK_MATTER_MARKERS, k=rng.randint(0, 3))
+    parts.extend(m.title() + "\n" for m in toc_markers)
+    parts.append("\n")
+
+    body_chars = int(chars * rng.uniform(0.5, 0.9))
+    size = sum(len(p) for p in parts)
+    while size < body_chars:
+        p = _paragraph(rng)
+        parts.append(p)
+        size += len(p)
+
+    for marker in rng.sample(_BACK_MATTER_MARKERS, k=rng.randint(1, 4)):
+        heading = rng.choice([marker.upper(), marker.title(), marker + ":", marker + " A"])
+        parts.append("\n" + heading + "\n")
+        while size < chars * rng.uniform(0.9, 1.0):
+            p = _paragraph(rng)
+            parts.append(p)
+            size += len(p)
+    text = "".join(parts)
+    return text.replace("\n", "\r\n") if rng.random() < 0.2 else text
+
+
+def _time(fn, text: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(text)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--golden-cases", type=int, default=300)
+    args = parser.parse_args()
+
+    # Golden: identical output (and therefore cut points) on many shapes.
+    edge_cases = [
+        "",
+        "short text\nreferences\n",
+        ("body " * 2000) + "\nReferences\n" + ("cite " * 500),
+        "\nReferences\n" + ("body " * 2000) + "\nReferences\n" + ("cite " * 500),
+        ("body " * 2000) + "\nreferencesx\n" + ("body " * 500),
+        ("body\t\t" * 2000) + "\r\nAppendix: data\r\n" + ("x " * 300),
+        "".join(random.Random(7).choice(["a", " ", "  ", "\t", "\n", "\n\n\n\n", "\r", "\r\n"]) for _ in range(20_000)),
+    ]
+    cases = edge_cases + [
+        synthetic_paper(random.Random(i).randint(2_000, 60_000), seed=i) for i in range(args.golden_cases)
+    ]
+    for i, text in enumerate(cases):
+        expected = _reduce_academic_pdf_text_legacy(text)
+        actual = _reduce_academic_pdf_text(text)
+        assert actual == expected, f"golden mismatch on case {i}"
+    print(f"golden: {len(cases)} cases identical")
+
+    print(f"{'chars':>9} {'legacy ms':>10} {'single-pass ms':>15} {'speedup':>8}")
+    for chars in (20_000, 50_000, 100_000, 200_000):
+        text = synthetic_paper(chars, seed=chars)
+        legacy = _time(_reduce_academic_pdf_text_legacy, text, args.repeat)
+        current = _time(_reduce_academic_pdf_text, text, args.repeat)
+        print(f"{len(text):>9} {legacy * 1000:>10.2f} {current * 1000:>15.2f} {legacy / current:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Microbenchmark for the shared PDF report style registry.
+
+Compares the module-level styles in backend/app/report.py against the
+original per-call style construction and regex markdown pass (kept
+verbatim below) for the section builder and full report builds, reporting
+time, ParagraphStyle constructions and tracemalloc peak memory. The
+current builds also render section trees parsed once up front, as
+/api/generate-pdf accepts them.
+
+The golden check compares what each paragraph renders (text runs and their
+fonts) on the synthetic reports and on GOLDEN_CASES, e.g. marks nested in
+each other, which the current builder writes as separate spans. The cases
+in INTENDED_DIFFERENCES render differently on purpose and are checked
+against their expected current output.
+
+    python -m benchmarks.bench_report_styles [--agents 8] [--repeat 5]
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any
+
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import ListFlowable, ListItem, Paragraph, Table, TableStyle
+
+from backend.app import report
+from backend.app.markdown_tree import parse_markdown
+
+_MD_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+_MD_BULLET_RE = re.compile(r"^(\s*)([-*])\s+(.*)$")
+
+
+def _md_inline_to_rl(text: str) -> str:
+    """
+    Convert a small, safe subset of Markdown inline formatting to ReportLab's
+    Paragraph markup (HTML-ish): **bold**, *italic*, `code`.
+    """
+    if not text:
+        return ""
+
+    # Escape basic XML chars first
+    text = (
+        text.replace("&", "&amp;")
+            .replace("<", "&lt;")
+            .replace(">", "&gt;")
+    )
+
+    # Inline code
+    text = re.sub(r"`([^`]+)`", r'<font face="Courier">\1</font>', text)
+
+    # Bold **...**
+    text = re.sub(r"\*\*([^*]+)\*\*", r"<b>\1</b>", text)
+
+    # Italic *...* (avoid clobbering bullet markers and already-converted tags)
+    text = re.sub(r"(?<!\*)\*([^*]+)\*(?!\*)", r"<i>\1</i>", text)
+
+    return text
+
+
+def _markdown_to_flowables_legacy(markdown_text: str) -> list[Any]:
+    """
+    Convert agent markdown-ish output into a clean flowable list:
+    - headings (#, ##, ###)
+    - paragraphs (reflow wrapped lines)
+    - bullet lists (-, *)
+    """
+    styles = getSampleStyleSheet()
+
+    body = ParagraphStyle(
+        "CTBody",
+        parent=styles["BodyText"],
+        fontName="Helvetica",
+        fontSize=10.5,
+        leading=14,
+        spaceAfter=8,
+    )
+    h1 = ParagraphStyle(
+        "CTH1",
+        parent=styles["Heading1"],
+        fontName="Helvetica-Bold",
+        fontSize=16,
+        leading=20,
+        spaceBefore=12,
+        spaceAfter=8,
+        textColor=colors.HexColor("#111827"),
+    )
+    h2 = ParagraphStyle(
+        "CTH2",
+        parent=styles["Heading2"],
+        fontName="Helvetica-Bold",
+        fontSize=13,
+        leading=16,
+        spaceBefore=12,
+        spaceAfter=6,
+        textColor=colors.HexColor("#111827"),
+    )
+    h3 = ParagraphStyle(
+        "CTH3",
+        parent=styles["Heading3"],
+        fontName="Helvetica-Bold",
+        fontSize=11.5,
+        leading=14,
+        spaceBefore=10,
+        spaceAfter=4,
+        textColor=colors.HexColor("#111827"),
+    )
+    bullet_style = ParagraphStyle(
+        "CTBullet",
+        parent=body,
+        leftIndent=18,
+        firstLineIndent=-8,
+        spaceAfter=4,
+    )
+
+    def flush_paragraph(buf: list[str], out: list[Any]) -> None:
+        if not buf:
+            return
+        text = " ".join(s.strip() for s in buf).strip()
+        if text:
+            out.append(Paragraph(_md_inline_to_rl(text), body))
+        buf.clear()
+
+    out: list[Any] = []
+    lines = (markdown_text or "").splitlines()
+
+    paragraph_buf: list[str] = []
+    list_items: list[ListItem] = []
+
+    def flush_list() -> None:
+        nonlocal list_items
+        if list_items:
+            out.append(ListFlowable(list_items, bulletType="bullet", leftIndent=14))
+            list_items = []
+
+    for raw in lines:
+        line = raw.rstrip()
+        stripped = line.strip()
+
+        # blank line -> flush paragraph + list
+        if not stripped:
+            flush_paragraph(paragraph_buf, out)
+            flush_list()
+            continue
+
+        # heading?
+        m = _MD_HEADING_RE.match(stripped)
+        if m:
+            flush_paragraph(paragraph_buf, out)
+            flush_list()
+            level = len(m.group(1))
+            text = _md_inline_to_rl(m.group(2).strip())
+            if level <= 1:
+                out.append(Paragraph(text, h1))
+            elif level == 2:
+                out.append(Paragraph(text, h2))
+            else:
+                out.append(Paragraph(text, h3))
+            continue
+
+        # bullet?
+        mb = _MD_BULLET_RE.match(line)
+        if mb:
+            flush_paragraph(paragraph_buf, out)
+            indent_spaces = len(mb.group(1) or "")
+            item_text = _md_inline_to_rl(mb.group(3).strip())
+
+            # simple nesting by indent
+            left_indent = 18 + (indent_spaces // 2) * 10
+            nested_style = ParagraphStyle(
+                f"CTBullet_{left_indent}",
+                parent=bullet_style,
+                leftIndent=left_indent,
+            )
+            list_items.append(ListItem(Paragraph(item_text, nested_style)))
+            continue
+
+        # normal text -> accumulate into reflowed paragraph
+        paragraph_buf.append(stripped)
+
+    flush_paragraph(paragraph_buf, out)
+    flush_list()
+
+    return out
+
+
+def _agent_header_card_legacy(agent: dict[str, Any]) -> Table:
+    """
+    A simple 'card' with agent label + focus.
+    """
+    label = agent.get("label", "Agent")
+    focus = agent.get("focus", "")
+
+    data = [
+        [Paragraph(f"<b>{_md_inline_to_rl(label)} Agent</b>", getSampleStyleSheet()["BodyText"]),
+         Paragraph(_md_inline_to_rl(focus), getSampleStyleSheet()["BodyText"])]
+    ]
+    t = Table(data, colWidths=[2.1 * inch, 4.9 * inch])
+    t.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, -1), colors.HexColor("#F3F4F6")),
+        ("BOX", (0, 0), (-1, -1), 0.6, colors.HexColor("#E5E7EB")),
+        ("INNERPADDING", (0, 0), (-1, -1), 10),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ]))
+    return t
+
+
+_WORDS = (
+    "claim evidence premise inference assumption bias concept implication "
+    "purpose question perspective clarity accuracy precision relevance depth"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(_WORDS) for _ in range(rng.randint(8, 24))]
+    if rng.random() < 0.3:
+        words[0] = f"**{words[0]}**"
+    if rng.random() < 0.2:
+        words[-1] = f"*{words[-1]}*"
+    return " ".join(words).capitalize() + "."
+
+
+def synthetic_analysis(rng: random.Random, sections: int) -> str:
+    """Agent-style markdown: headings, paragraphs and nested bullet lists."""
+    lines = [f"# {_sentence(rng)}", ""]
+    for _ in range(sections):
+        lines += [f"## {_sentence(rng)}", "", _sentence(rng), _sentence(rng), ""]
+        for _ in range(rng.randint(4, 12)):
+            lines.append("  " * rng.randint(0, 3) + "- " + _sentence(rng))
+        lines += ["", f"### {_sentence(rng)}", _sentence(rng), ""]
+    return "\n".join(lines)
+
+
+@contextmanager
+def _legacy_builders():
+    saved = report._markdown_to_flowables, report._agent_header_card
+    report._markdown_to_flowables = _markdown_to_flowables_legacy
+    report._agent_header_card = _agent_header_card_legacy
+    try:
+        yield
+    finally:
+        report._markdown_to_flowables, report._agent_header_card = saved
+
+
+@contextmanager
+def _count_styles():
+    counter = {"styles": 0}
+    original = ParagraphStyle.__init__
+
+    def counting_init(self, *args, **kwargs):
+        counter["styles"] += 1
+        original(self, *args, **kwargs)
+
+    ParagraphStyle.__init__ = counting_init
+    try:
+        yield counter
+    finally:
+        ParagraphStyle.__init__ = original
+
+
+def _measure(fn, repeat: int) -> dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    with _count_styles() as counter:
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"ms": statistics.median(samples) * 1000, "styles": counter["styles"], "peak_kib": peak / 1024}
+
+
+def _runs(paragraph: Paragraph) -> list[tuple[str, str]]:
+    """The paragraph's text as rendered: runs of text merged by font."""
+    runs: list[list[str]] = []
+    for frag in paragraph.frags:
+        if runs and runs[-1][1] == frag.fontName:
+            runs[-1][0] += frag.text
+        else:
+            runs.append([frag.text, frag.fontName])
+    return [(text, font) for text, font in runs]
+
+
+def _signature(flowables: list[Any]) -> list[tuple]:
+    out = []
+    for f in flowables:
+        if isinstance(f, ListFlowable):
+            for item in f._flowables:
+                p = item._flowables[0]
+                out.append(("li", _runs(p), p.style.leftIndent, p.style.fontSize, p.style.leading))
+        else:
+            out.append(("p", _runs(f), f.style.fontName, f.style.fontSize, f.style.spaceAfter))
+    return out
+
+
+# Rendered identically by both builders, though the current one writes
+# nested marks as separate spans rather than nested tags.
+GOLDEN_CASES = [
+    "**bold with `code` inside** and *italic with `code` inside*",
+    "*italic with **bold** inside* and **bold *italic* bold**",
+    "- **nested** item with *marks* and `code`\n  - child with **bold `code`**",
+    "Escaped x < y & **z**, and **unclosed *markers",
+    "## Heading with **bold** and *italic*\nWrapped\nparagraph lines.",
+]
+
+# Rendered differently on purpose: (markdown, why, expected current signature).
+INTENDED_DIFFERENCES = [
+    (
+        "- first item\ncontinued on the next line\n- second item",
+        "a line after a bullet continues that item; the legacy builder emitted "
+        "it as a paragraph ahead of the whole list",
+        [
+            ("li", [("first item continued on the next line", "Helvetica")], 18, 10.5, 14),
+            ("li", [("second item", "Helvetica")], 18, 10.5, 14),
+        ],
+    ),
+    (
+        "Literal `**not bold**` code",
+        "code is literal; the legacy builder applied bold inside it",
+        [("p", [("Literal ", "Helvetica"), ("**not bold**", "Courier"), (" code", "Helvetica")], "Helvetica", 10.5, 8)],
+    ),
+    (
+        "`a*b` and *c*",
+        "markers inside code are not paired with ones outside it; the legacy "
+        "builder wrote crossed tags that ReportLab rejects",
+        [("p", [("a*b", "Courier"), (" and ", "Helvetica"), ("c", "Helvetica-Oblique")], "Helvetica", 10.5, 8)],
+    ),
+]
+
+
+def _check_golden(markdowns: list[str]) -> None:
+    for markdown in [*markdowns, *GOLDEN_CASES]:
+        current = _signature(report._markdown_to_flowables(markdown))
+        assert current == _signature(_markdown_to_flowables_legacy(markdown)), markdown
+    for markdown, why, expected in INTENDED_DIFFERENCES:
+        assert _signature(report._markdown_to_flowables(markdown)) == expected, markdown
+        print(f"intended difference: {why}")
+
+
+def _report(name: str, legacy: dict[str, float], current: dict[str, float]) -> None:
+    print(
+        f"{name:<22} {legacy['ms']:>9.1f} {current['ms']:>9.1f} {legacy['ms'] / current['ms']:>7.2f}x "
+        f"{legacy['styles']:>9} {current['styles']:>9} "
+        f"{legacy['peak_kib']:>10.0f} {current['peak_kib']:>10.0f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=8)
+    parser.add_argument("--sections", type=int, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    agents = [{"key": f"agent_{i}", "label": f"Agent {i}", "focus": _sentence(rng)} for i in range(args.agents)]
+    analysis = {a["key"]: {"status": "ok", "content": synthetic_analysis(rng, args.sections)} for a in agents}
+    markdown = analysis[agents[0]["key"]]["content"]
+    parsed = {key: {"status": "ok", "sections": parse_markdown(block["content"])} for key, block in analysis.items()}
+
+    # Golden: identical rendered text runs and effective style attributes.
+    _check_golden([block["content"] for block in analysis.values()])
+    print(f"golden: flowables identical for {len(analysis)} reports and {len(GOLDEN_CASES)} edge cases")
+
+    def md_current():
+        for a in agents:
+            report._markdown_to_flowables(analysis[a["key"]]["content"])
+
+    def md_legacy():
+        for a in agents:
+            _markdown_to_flowables_legacy(analysis[a["key"]]["content"])
+
+    def tree_current():
+        for a in agents:
+            report._tree_to_flowables(parsed[a["key"]]["sections"])
+
+    def build_current():
+        report._build_pdf(parsed, agents)
+
+    def build_legacy():
+        with _legacy_builders():
+            report._build_pdf(analysis, agents)
+
+    print(f"{'':<22} {'legacy ms':>9} {'shared ms':>9} {'speedup':>8} {'legacy st':>9} {'shared st':>9} "
+          f"{'legacy KiB':>10} {'shared KiB':>10}")
+    _report("markdown_to_flowables", _measure(md_legacy, args.repeat), _measure(md_current, args.repeat))
+    _report("tree_to_flowables", _measure(md_legacy, args.repeat), _measure(tree_current, args.repeat))
+    _report("full report build", _measure(build_legacy, args.repeat), _measure(build_current, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
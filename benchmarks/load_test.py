@@ -0,0 +1,457 @@
+"""
+Load-test driver for the backend against the local stub model server.
+
+Starts benchmarks/stub_model_server.py and backend.main as subprocesses
+(with a throwaway report cache, job store and frontend build), then drives
+each scenario at each concurrency level and reports latency percentiles,
+throughput, status codes and the backend's resident memory:
+
+    python -m benchmarks.load_test [--scenarios analyze_text,generate_pdf] [--concurrency 1,8,32]
+        [--requests 64] [--stub-latency-ms 500 --stub-dist lognormal --stub-tokens-per-second 40]
+        [--json results.json] [--baseline previous.json]
+
+Scenarios: analyze_text and analyze_pdf (POST /api/analyze), analyze_stream
+(POST /api/analyze/stream, read to the end), generate_pdf (POST
+/api/generate-pdf) and static (the SPA index and a hashed asset). Payloads
+are unique per request, and sent with on_similar=rerun, so caches and
+near-duplicate reuse do not hide the work; --repeat sends the same payload
+every time to measure the cached path instead.
+
+--base-url targets an already-running backend instead (pass --pid to
+sample its memory). --baseline compares p95 and throughput with an earlier
+--json run and exits non-zero when either regresses beyond --tolerance.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+import httpx
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+_WORDS = (
+    "policy evidence growth transition energy cost benefit households firms carbon emissions "
+    "jobs health subsidy tax market demand supply regulation risk uncertainty adoption"
+).split()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_rss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _children(pid: int) -> list[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as fh:
+                # The command name may contain spaces; ppid follows its ")".
+                ppid = int(fh.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _rss_bytes(pid: int | None) -> int | None:
+    """Resident memory of a process and its PDF/report worker processes (Linux only)."""
+    if pid is None or not os.path.exists(f"/proc/{pid}"):
+        return None
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        total += _process_rss(current)
+        pending.extend(_children(current))
+    return total
+
+
+def _spawn(app: str, port: int, env: dict[str, str], log_path: Path) -> subprocess.Popen:
+    log = open(log_path, "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env},
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+
+
+def _wait_ready(url: str, process: subprocess.Popen, log_path: Path, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            log = log_path.read_text(errors="replace")[-2000:]
+            raise RuntimeError(f"{url} exited with status {process.returncode}:\n{log}")
+        try:
+            httpx.get(url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready in {timeout:g}s")
+
+
+def synthetic_text(words: int, rng: random.Random) -> str:
+    sentences = []
+    for _ in range(max(1, words // 12)):
+        sentence = " ".join(rng.choice(_WORDS) for _ in range(12))
+        sentences.append(sentence.capitalize() + ".")
+    return " ".join(sentences)
+
+
+PDF_RUN_MARKER = b"RUN-00000000"
+
+
+def synthetic_pdf(pages: int, rng: random.Random) -> bytes:
+    """
+    An uncompressed PDF whose first line is PDF_RUN_MARKER, so each request
+    can patch in its own number (same length, so offsets stay valid) and
+    extract to different text.
+    """
+    from reportlab.lib.pagesizes import LETTER
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    pdf = canvas.Canvas(buf, pagesize=LETTER, pageCompression=0)
+    pdf.drawString(54, 760, PDF_RUN_MARKER.decode())
+    for _ in range(pages):
+        y = 740
+        for _ in range(48):
+            pdf.drawString(54, y, synthetic_text(14, rng)[:100])
+            y -= 14
+        pdf.showPage()
+    pdf.save()
+    return buf.getvalue()
+
+
+def synthetic_frontend(root: Path) -> str:
+    """A dist/ tree shaped like a Vite build; returns the asset path."""
+    assets = root / "assets"
+    assets.mkdir(parents=True, exist_ok=True)
+    asset = "assets/index-3f9a1c2b.js"
+    (root / asset).write_text("export const words = " + json.dumps(_WORDS * 4000) + ";\n")
+    (root / "index.html").write_text(
+        f'<!doctype html><html><head><script type="module" src="/{asset}"></script></head>'
+        '<body><div id="root"></div></body></html>\n'
+    )
+    return asset
+
+
+def _analysis(rng: random.Random, agents: int = 4) -> dict[str, Any]:
+    keys = ["science", "economics", "sociology", "ethics"][:agents]
+    return {
+        key: {
+            "status": "ok",
+            "content": (
+                "## Executive Summary\n- " + synthetic_text(40, rng) + "\n\n## Key Gaps\n- " + synthetic_text(60, rng)
+            ),
+        }
+        for key in keys
+    }
+
+
+Request = Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]
+
+
+def build_scenarios(args: argparse.Namespace, asset: str | None) -> dict[str, Request]:
+    rng = random.Random(args.seed)
+    base_text = synthetic_text(args.text_words, rng)
+    base_pdf = synthetic_pdf(args.pdf_pages, rng)
+    base_analysis = _analysis(rng)
+
+    # Unique payloads are near-duplicates of each other, so they would be
+    # served the first one's cached results; rerun makes each one analyzed.
+    similar = {} if args.repeat else {"on_similar": "rerun"}
+
+    def text_for(i: int) -> str:
+        return base_text if args.repeat else f"[{i}] {base_text}"
+
+    async def analyze_text(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        return await client.post(
+            "/api/analyze", json={"text": text_for(i), "answer_length": args.answer_length, **similar}
+        )
+
+    async def analyze_stream(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        payload = {"text": text_for(i), "answer_length": args.answer_length, **similar}
+        async with client.stream("POST", "/api/analyze/stream", json=payload) as response:
+            await response.aread()
+        return response
+
+    async def analyze_pdf(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        data = base_pdf if args.repeat else base_pdf.replace(PDF_RUN_MARKER, f"RUN-{i:08d}".encode(), 1)
+        return await client.post(
+            "/api/analyze",
+            files={"file": ("load.pdf", data, "application/pdf")},
+            data={"answer_length": args.answer_length, **similar},
+        )
+
+    async def generate_pdf(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        analysis = base_analysis
+        if not args.repeat:
+            science = {"status": "ok", "content": f"Run {i}.\n\n" + base_analysis["science"]["content"]}
+            analysis = {**base_analysis, "science": science}
+        return await client.post("/api/generate-pdf", json={"analysis": analysis, "answer_length": "long"})
+
+    async def static(client: httpx.AsyncClient, i: int) -> httpx.Response:
+        path = "/" if i % 2 == 0 or asset is None else f"/{asset}"
+        return await client.get(path, headers={"Accept-Encoding": "gzip, br"})
+
+    return {
+        "analyze_text": analyze_text,
+        "analyze_stream": analyze_stream,
+        "analyze_pdf": analyze_pdf,
+        "generate_pdf": generate_pdf,
+        "static": static,
+    }
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+async def _sample_rss(pid: int | None, peak: list[int], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = _rss_bytes(pid)
+        if rss is not None:
+            peak[0] = max(peak[0], rss)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.2)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_scenario(
+    base_url: str,
+    request: Request,
+    concurrency: int,
+    total: int,
+    pid: int | None,
+    timeout: float,
+    first: int = 0,
+) -> dict[str, Any]:
+    """Send requests numbered first..first+total-1 from `concurrency` workers."""
+    latencies: list[float] = []
+    statuses: Counter[str] = Counter()
+    counter = iter(range(first, first + total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        async def worker() -> None:
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await request(client, i)
+                    statuses[str(response.status_code)] += 1
+                    if response.status_code < 400:
+                        latencies.append(time.perf_counter() - started)
+                except httpx.HTTPError as exc:
+                    statuses[type(exc).__name__] += 1
+
+        rss_before = _rss_bytes(pid)
+        peak = [rss_before or 0]
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(_sample_rss(pid, peak, stop))
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    ordered = sorted(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "statuses": dict(statuses),
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(ordered, 50) * 1000, 1),
+        "p95_ms": round(_percentile(ordered, 95) * 1000, 1),
+        "p99_ms": round(_percentile(ordered, 99) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1) if ordered else 0.0,
+        "rss_before_mb": round(rss_before / 2**20, 1) if rss_before else None,
+        "rss_peak_mb": round(peak[0] / 2**20, 1) if peak[0] else None,
+    }
+
+
+def _print_row(name: str, result: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    statuses = ",".join(f"{k}:{v}" for k, v in sorted(result["statuses"].items()))
+    rss = f"{result['rss_peak_mb']:.0f}" if result["rss_peak_mb"] else "-"
+    line = (
+        f"{name:<15} {result['concurrency']:>4} {result['ok']:>5}/{result['requests']:<5} "
+        f"{result['throughput_rps']:>8.2f} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} "
+        f"{result['p99_ms']:>8.0f} {rss:>7}  {statuses}"
+    )
+    if baseline:
+        line += (
+            f"  (p95 {_change(baseline['p95_ms'], result['p95_ms'])},"
+            f" rps {_change(baseline['throughput_rps'], result['throughput_rps'])})"
+        )
+    print(line, flush=True)
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before:+.0%}"
+
+
+def _regressions(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], tolerance: float) -> list[str]:
+    found = []
+    for key, result in results.items():
+        before = baseline.get(key)
+        if not before:
+            continue
+        if before["p95_ms"] and result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found.append(f"{key}: p95 {before['p95_ms']}ms -> {result['p95_ms']}ms")
+        if before["throughput_rps"] and result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            found.append(f"{key}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="analyze_text,analyze_pdf,generate_pdf,static")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="requests per scenario and concurrency level")
+    parser.add_argument("--answer-length", default="long", choices=["long", "short"])
+    parser.add_argument("--text-words", type=int, default=800)
+    parser.add_argument("--pdf-pages", type=int, default=12)
+    parser.add_argument("--repeat", action="store_true", help="send identical payloads (measures cache hits)")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--base-url", help="target a running backend instead of starting one")
+    parser.add_argument("--pid", type=int, help="backend process id to sample RSS from (with --base-url)")
+    parser.add_argument("--stub-latency-ms", type=float, default=500.0)
+    parser.add_argument("--stub-dist", default="lognormal", choices=["uniform", "lognormal", "exponential", "fixed"])
+    parser.add_argument("--stub-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--stub-output-tokens", type=int, default=0)
+    parser.add_argument("--stub-error-rate", type=float, default=0.0)
+    parser.add_argument("--stub-429-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--backend-env", action="append", default=[], metavar="NAME=VALUE",
+        help="extra environment for the started backend (repeatable)",
+    )
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with the results of an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression before failing")
+    args = parser.parse_args()
+
+    scenario_names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    levels = [int(c) for c in args.concurrency.split(",")]
+    baseline = json.loads(Path(args.baseline).read_text())["results"] if args.baseline else {}
+
+    processes: list[subprocess.Popen] = []
+    workdir = tempfile.TemporaryDirectory(prefix="load-test-")
+    work = Path(workdir.name)
+    asset = None
+    pid = args.pid
+    try:
+        if args.base_url:
+            base_url = args.base_url.rstrip("/")
+        else:
+            stub_port, backend_port = _free_port(), _free_port()
+            stub = _spawn("benchmarks.stub_model_server:app", stub_port, {
+                "STUB_LATENCY_MS": str(args.stub_latency_ms),
+                "STUB_LATENCY_DIST": args.stub_dist,
+                "STUB_TOKENS_PER_SECOND": str(args.stub_tokens_per_second),
+                "STUB_OUTPUT_TOKENS": str(args.stub_output_tokens),
+                "STUB_ERROR_RATE": str(args.stub_error_rate),
+                "STUB_429_RATE": str(args.stub_429_rate),
+            }, work / "stub.log")
+            processes.append(stub)
+            _wait_ready(f"http://127.0.0.1:{stub_port}/stats", stub, work / "stub.log")
+
+            asset = synthetic_frontend(work / "dist")
+            backend_env = {
+                "GEMMA_API_URL": f"http://127.0.0.1:{stub_port}/v1/chat/completions",
+                "GEMMA_API_KEY": "stub",
+                "FRONTEND_DIST": str(work / "dist"),
+                "REPORT_CACHE_DIR": str(work / "report_cache"),
+                "JOBS_DB_PATH": str(work / "jobs.sqlite3"),
+                "RESULT_CACHE_PATH": str(work / "analysis_cache.sqlite3"),
+                "UPLOAD_TMP_DIR": str(work),
+            }
+            backend_env.update(item.split("=", 1) for item in args.backend_env)
+            backend = _spawn("backend.main:app", backend_port, backend_env, work / "backend.log")
+            processes.append(backend)
+            base_url = f"http://127.0.0.1:{backend_port}"
+            _wait_ready(f"{base_url}/api/health", backend, work / "backend.log")
+            pid = backend.pid
+
+        scenarios = build_scenarios(args, asset)
+        unknown = [name for name in scenario_names if name not in scenarios]
+        if unknown:
+            parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+        print(
+            f"stub {args.stub_dist} {args.stub_latency_ms:g}ms"
+            + (f", {args.stub_tokens_per_second:g} tok/s" if args.stub_tokens_per_second else "")
+            + f", {args.requests} requests per level{' (repeated payload)' if args.repeat else ''}"
+        )
+        print(f"{'scenario':<15} {'conc':>4} {'ok/sent':>11} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rss MB':>7}  statuses")
+        results: dict[str, dict[str, Any]] = {}
+        sent = 0
+        for name in scenario_names:
+            for concurrency in levels:
+                # Request numbers keep growing across runs, so payloads stay unique.
+                result = asyncio.run(
+                    run_scenario(base_url, scenarios[name], concurrency, args.requests, pid, args.timeout, sent)
+                )
+                sent += args.requests
+                key = f"{name}@{concurrency}"
+                results[key] = result
+                _print_row(name, result, baseline.get(key))
+
+        if args.json:
+            Path(args.json).write_text(json.dumps({
+                "args": {k: v for k, v in vars(args).items() if k not in {"json", "baseline"}},
+                "results": results,
+            }, indent=2))
+        regressions = _regressions(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions beyond {:.0%}:".format(args.tolerance))
+            for item in regressions:
+                print(f"  {item}")
+            sys.exit(1)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
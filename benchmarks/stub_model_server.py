@@ -0,0 +1,252 @@
+"""
+Local OpenAI-compatible stub of the model API for resilience and load testing.
+
+Run it and point the backend at it:
+
+    STUB_ERROR_RATE=0.2 STUB_429_RATE=0.1 uvicorn benchmarks.stub_model_server:app --port 9100
+    GEMMA_API_URL=http://127.0.0.1:9100/v1/chat/completions GEMMA_API_KEY=stub \\
+        uvicorn backend.main:app --port 8000
+
+Behaviour is configured with environment variables:
+
+    STUB_LATENCY_MS      mean response latency (default 500)
+    STUB_LATENCY_DIST    latency distribution: uniform (mean +/- jitter),
+                         lognormal, exponential or fixed (default uniform)
+    STUB_JITTER_MS       uniform +/- jitter applied to the latency (default 100)
+    STUB_LATENCY_SIGMA   shape of the lognormal distribution; larger values
+                         give a longer tail (default 0.5)
+    STUB_TOKENS_PER_SECOND
+                         decode speed; when set, the latency is time to first
+                         token and each completion token adds 1/rate seconds
+                         (default 0: the latency covers the whole reply)
+    STUB_OUTPUT_TOKENS   pad replies to about this many tokens (default 0:
+                         the short canned analysis)
+    STUB_ERROR_RATE      fraction of requests answered with HTTP 500 (default 0)
+    STUB_429_RATE        fraction of requests answered with HTTP 429 (default 0)
+    STUB_RETRY_AFTER     Retry-After seconds sent with 429s (default 1)
+    STUB_PREFILL_MS_PER_KTOK
+                         prompt prefill cost per 1000 uncached prompt tokens,
+                         added before the first token (default 0: off)
+    STUB_PREFIX_CACHE    model a prefix (KV) cache: prompt tokens shared with
+                         an earlier prompt are not prefilled again (default 1)
+    STUB_PREFIX_BLOCK_TOKENS
+                         prefix cache granularity in tokens (default 16)
+    STUB_FUSED           answer fused multi-agent prompts in their delimited
+                         format; 0 replies with plain text, exercising the
+                         backend's per-agent fallback (default 1)
+
+Prompts are rendered roughly the way a chat template would and counted at
+4 characters per token. Prefill is modelled as one compute-bound engine
+working through uncached prompt tokens in arrival order; a prompt sharing
+a prefix with an earlier one (even one still being prefilled) reuses it
+instead of recomputing it, as with vLLM/SGLang-style automatic prefix
+caching. POST /reset clears the cache and counters.
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import deque
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_LATENCY_MS = float(os.getenv("STUB_LATENCY_MS", "500"))
+STUB_LATENCY_DIST = os.getenv("STUB_LATENCY_DIST", "uniform").strip().lower()
+if STUB_LATENCY_DIST not in {"uniform", "lognormal", "exponential", "fixed"}:
+    raise ValueError(f"Unknown STUB_LATENCY_DIST: {STUB_LATENCY_DIST!r}")
+STUB_JITTER_MS = float(os.getenv("STUB_JITTER_MS", "100"))
+STUB_LATENCY_SIGMA = float(os.getenv("STUB_LATENCY_SIGMA", "0.5"))
+STUB_TOKENS_PER_SECOND = float(os.getenv("STUB_TOKENS_PER_SECOND", "0"))
+STUB_OUTPUT_TOKENS = int(os.getenv("STUB_OUTPUT_TOKENS", "0"))
+STUB_ERROR_RATE = float(os.getenv("STUB_ERROR_RATE", "0"))
+STUB_429_RATE = float(os.getenv("STUB_429_RATE", "0"))
+STUB_RETRY_AFTER = os.getenv("STUB_RETRY_AFTER", "1")
+STUB_PREFILL_MS_PER_KTOK = float(os.getenv("STUB_PREFILL_MS_PER_KTOK", "0"))
+STUB_PREFIX_CACHE = os.getenv("STUB_PREFIX_CACHE", "1") not in {"0", "false", "no"}
+STUB_PREFIX_BLOCK_TOKENS = int(os.getenv("STUB_PREFIX_BLOCK_TOKENS", "16"))
+STUB_FUSED = os.getenv("STUB_FUSED", "1") not in {"0", "false", "no"}
+
+CHARS_PER_TOKEN = 4
+
+app = FastAPI(title="Stub model API")
+
+counters: dict[str, int] = {}
+# (rendered prompt, chars already cached when it arrived, time its own prefill started)
+prefix_cache: deque[tuple[str, int, float]] = deque(maxlen=256)
+engine = {"free_at": 0.0}
+
+
+def _reset() -> None:
+    counters.clear()
+    counters.update({
+        "requests": 0, "ok": 0, "errors": 0, "throttled": 0,
+        "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0,
+    })
+    prefix_cache.clear()
+    engine["free_at"] = 0.0
+
+
+_reset()
+
+
+def _message_text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return str(content or "")
+
+
+def _render_prompt(messages: list[dict[str, Any]]) -> str:
+    return "".join(f"<{m.get('role')}>\n{_message_text(m.get('content'))}\n" for m in messages)
+
+
+def _prefill_seconds(prompt: str) -> tuple[float, int, int]:
+    """Seconds until the first token, plus prompt and cached token counts."""
+    now = time.monotonic()
+    per_char = STUB_PREFILL_MS_PER_KTOK / 1_000_000 / CHARS_PER_TOKEN
+    cached_chars, cached_ready_at = 0, now
+    if STUB_PREFIX_CACHE:
+        block = STUB_PREFIX_BLOCK_TOKENS * CHARS_PER_TOKEN
+        for seen, seen_cached, seen_started in prefix_cache:
+            shared = len(os.path.commonprefix([prompt, seen])) // block * block
+            if shared > cached_chars:
+                # Prefill of `seen` runs linearly from its own cached prefix,
+                # so a shared prefix is usable before that prompt finishes.
+                cached_chars = shared
+                cached_ready_at = seen_started + max(0, shared - seen_cached) * per_char
+    # One compute-bound engine: uncached prefills run one after another.
+    started = max(now, engine["free_at"], cached_ready_at)
+    engine["free_at"] = started + (len(prompt) - cached_chars) * per_char
+    if STUB_PREFIX_CACHE:
+        prefix_cache.append((prompt, cached_chars, started))
+    return engine["free_at"] - now, len(prompt) // CHARS_PER_TOKEN, cached_chars // CHARS_PER_TOKEN
+
+
+def _latency_seconds() -> float:
+    if STUB_LATENCY_DIST == "fixed":
+        latency_ms = STUB_LATENCY_MS
+    elif STUB_LATENCY_DIST == "exponential":
+        latency_ms = random.expovariate(1 / STUB_LATENCY_MS) if STUB_LATENCY_MS > 0 else 0.0
+    elif STUB_LATENCY_DIST == "lognormal":
+        # mu chosen so the distribution's mean is STUB_LATENCY_MS.
+        mu = math.log(max(STUB_LATENCY_MS, 1e-3)) - STUB_LATENCY_SIGMA ** 2 / 2
+        latency_ms = random.lognormvariate(mu, STUB_LATENCY_SIGMA)
+    else:
+        latency_ms = STUB_LATENCY_MS + random.uniform(-STUB_JITTER_MS, STUB_JITTER_MS)
+    return max(0.0, latency_ms) / 1000
+
+
+_FILLER = (
+    "Further scrutiny of the evidence, the assumptions and the implications would strengthen this point. "
+)
+
+
+def _pad_reply(text: str) -> str:
+    missing = STUB_OUTPUT_TOKENS * CHARS_PER_TOKEN - len(text)
+    if missing <= 0:
+        return text
+    return text + "\n" + (_FILLER * (missing // len(_FILLER) + 1))[:missing].rstrip() + "\n"
+
+
+_FUSED_ORDER_RE = re.compile(r"in exactly this order: ([\w, -]+)\.")
+
+
+def _reply_text(body: dict[str, Any]) -> str:
+    messages = body.get("messages") or []
+    system = next((_message_text(m.get("content")) for m in messages if m.get("role") == "system"), "")
+    first_line = system.splitlines()[0] if system else "Agent"
+    fused = _FUSED_ORDER_RE.search(system) if STUB_FUSED else None
+    if fused:
+        return "\n\n".join(
+            f"<<<BEGIN {key}>>>\n{_analysis_text(key)}<<<END {key}>>>" for key in fused.group(1).split(", ")
+        )
+    return _analysis_text(first_line)
+
+
+def _analysis_text(subject: str) -> str:
+    return (
+        "## Executive Summary\n"
+        f"- Stub analysis for: {subject[:80]}\n"
+        "- The argument's central claim is stated but weakly supported.\n\n"
+        "## Key Gaps & Questions to Resolve\n"
+        "- What evidence supports the causal claim?\n"
+        "- Which assumptions are doing the most work?\n"
+    )
+
+
+@app.get("/stats")
+async def stats() -> dict[str, int]:
+    return counters
+
+
+@app.post("/reset")
+async def reset() -> dict[str, int]:
+    _reset()
+    return counters
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    counters["requests"] += 1
+    body = await request.json()
+
+    roll = random.random()
+    if roll < STUB_429_RATE:
+        counters["throttled"] += 1
+        return JSONResponse(
+            {"error": "rate limited"}, status_code=429, headers={"Retry-After": STUB_RETRY_AFTER}
+        )
+    if roll < STUB_429_RATE + STUB_ERROR_RATE:
+        await asyncio.sleep(_latency_seconds() / 4)
+        counters["errors"] += 1
+        return JSONResponse({"error": "upstream failure"}, status_code=500)
+
+    text = _pad_reply(_reply_text(body))
+    latency = _latency_seconds()
+    prefill, prompt_tokens, cached_tokens = _prefill_seconds(_render_prompt(body.get("messages") or []))
+    completion_tokens = len(text) // CHARS_PER_TOKEN
+    decode = completion_tokens / STUB_TOKENS_PER_SECOND if STUB_TOKENS_PER_SECOND > 0 else 0.0
+    counters["ok"] += 1
+    counters["prompt_tokens"] += prompt_tokens
+    counters["cached_tokens"] += cached_tokens
+    counters["completion_tokens"] += completion_tokens
+    usage = {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+    }
+
+    if body.get("stream"):
+        include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+        async def events():
+            words = text.split(" ")
+            if STUB_TOKENS_PER_SECOND > 0:
+                # Time to first token, then a steady decode rate.
+                await asyncio.sleep(prefill + latency)
+                per_word = decode / max(1, len(words))
+            else:
+                await asyncio.sleep(prefill)
+                per_word = latency / max(1, len(words))
+            for i, word in enumerate(words):
+                await asyncio.sleep(per_word)
+                delta = word if i == 0 else " " + word
+                yield "data: " + json.dumps({"choices": [{"delta": {"content": delta}}]}) + "\n\n"
+            if include_usage:
+                yield "data: " + json.dumps({"choices": [], "usage": usage}) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    await asyncio.sleep(prefill + latency + decode)
+    return JSONResponse({
+        "id": f"stub-{time.time_ns()}",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}}],
+        "usage": usage,
+    })
@@ -1,7 +1,8 @@
-import { useMemo, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import ReactMarkdown from 'react-markdown'
 
-const AGENTS = [
+// Shown until /api/agents answers (or if it cannot be reached).
+const DEFAULT_AGENTS = [
   { key: 'science', label: 'Science', description: 'Feasibility & uncertainty' },
   { key: 'economics', label: 'Economics', description: 'Incentives & externalities' },
   { key: 'sociology', label: 'Sociology/Humanities', description: 'Social context & inequality' },
@@ -10,6 +11,31 @@ const AGENTS = [
 
 const API_PREFIX = '/api'
 
+// Parse a text/event-stream response body, calling onEvent(name, data) per event.
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  while (true) {
+    const { value, done } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    let boundary = buffer.indexOf('\n\n')
+    while (boundary !== -1) {
+      const raw = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      let name = 'message'
+      const dataLines = []
+      for (const line of raw.split('\n')) {
+        if (line.startsWith('event:')) name = line.slice(6).trim()
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim())
+      }
+      if (dataLines.length) onEvent(name, JSON.parse(dataLines.join('\n')))
+      boundary = buffer.indexOf('\n\n')
+    }
+  }
+}
+
 const EXAMPLE_TEXT = `Policies that accelerate renewable energy adoption are essential to economic stability.\n\nGovernments should mandate a rapid transition to clean power within 10 years. This will reduce long-term energy costs, create green jobs, and protect public health. Fossil fuels impose hidden costs through pollution and climate damage. While the transition is expensive upfront, the benefits outweigh the costs for future generations.`
 
 export default function App() {
@@ -21,7 +47,26 @@ export default function App() {
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [downloadLoading, setDownloadLoading] = useState(false)
+  const [report, setReport] = useState(null)
   const [answerLength, setAnswerLength] = useState('long')
+  const [agentSets, setAgentSets] = useState(null)
+  // The stored document ({ id, answerLength, agents }) that tabs fetch agents for.
+  const [submitted, setSubmitted] = useState(null)
+  // Agent key -> 'normal' | 'low' while a request is in flight, 'done' once answered.
+  const requests = useRef({})
+  // Set when the server matched a near-identical earlier submission.
+  const [similar, setSimilar] = useState(null)
+
+  useEffect(() => {
+    fetch(`${API_PREFIX}/agents`)
+      .then((response) => (response.ok ? response.json() : null))
+      .then((data) => {
+        if (data?.sets) setAgentSets(data.sets)
+      })
+      .catch(() => {})
+  }, [])
+
+  const agents = agentSets?.[answerLength]?.agents || DEFAULT_AGENTS
 
   const isReadyToAnalyze = useMemo(() => {
     if (mode === 'text') {
@@ -30,7 +75,68 @@ export default function App() {
     return Boolean(fileValue)
   }, [mode, textValue, fileValue])
 
-  const handleAnalyze = async () => {
+  const setResult = (key, result) => {
+    setAnalysis((previous) => ({ ...(previous || {}), [key]: result }))
+  }
+
+  // Run one agent on the stored document. Low-priority requests prefetch tabs
+  // the user has not opened; opening one sends a normal request, which the
+  // server joins to the queued prefetch instead of generating twice.
+  const fetchAgent = async (doc, key, priority = 'normal') => {
+    const current = requests.current[key]
+    if (current === 'done' || current === 'normal' || current === priority) return
+    requests.current[key] = priority
+    setAnalysis((previous) => (previous?.[key]?.status === 'ok' ? previous : { ...(previous || {}), [key]: { status: 'pending' } }))
+    try {
+      const params = new URLSearchParams({ answer_length: doc.answerLength, priority })
+      const response = await fetch(`${API_PREFIX}/documents/${doc.id}/agents/${key}?${params}`, { method: 'POST' })
+      const data = await response.json().catch(() => ({}))
+      if (response.ok) {
+        requests.current[key] = 'done'
+        setResult(key, { status: 'ok', content: data.content })
+      } else if (requests.current[key] === priority) {
+        setResult(key, { status: 'error', message: data.message || data.detail || 'Analysis failed.' })
+      }
+    } catch (err) {
+      if (requests.current[key] === priority) setResult(key, { status: 'error', message: err.message })
+    } finally {
+      if (requests.current[key] === priority) delete requests.current[key]
+    }
+  }
+
+  // Stream the first agent so its tab fills in as it is written.
+  const streamAgent = async (doc, key) => {
+    requests.current[key] = 'normal'
+    try {
+      const params = new URLSearchParams({ answer_length: doc.answerLength, stream: 'true' })
+      const response = await fetch(`${API_PREFIX}/documents/${doc.id}/agents/${key}?${params}`, { method: 'POST' })
+      if (!response.ok) {
+        const detail = await response.json().catch(() => ({}))
+        throw new Error(detail.detail || 'Analysis failed. Please try again.')
+      }
+      let content = ''
+      let result = null
+      await readEventStream(response, (event, data) => {
+        if (data.agent !== key) return
+        if (event === 'delta') {
+          content += data.text
+          setResult(key, { status: 'streaming', content })
+        } else if (event === 'done') {
+          result = { status: 'ok', content: data.content }
+        } else if (event === 'error') {
+          result = { status: 'error', message: data.message }
+        }
+      })
+      result = result || { status: 'error', message: 'Analysis stopped before it finished.' }
+      setResult(key, result)
+      if (result.status === 'ok') requests.current[key] = 'done'
+      return result
+    } finally {
+      if (requests.current[key] === 'normal') delete requests.current[key]
+    }
+  }
+
+  const handleAnalyze = async (onSimilar = 'reuse') => {
     setError('')
     if (!isReadyToAnalyze) {
       setError('Please enter text or upload a PDF to continue.')
@@ -39,21 +145,26 @@ export default function App() {
 
     setLoading(true)
     setAnalysis(null)
+    setReport(null)
+    setSubmitted(null)
+    setSimilar(null)
+    requests.current = {}
     try {
       let response
       if (mode === 'pdf' && fileValue) {
         const formData = new FormData()
         formData.append('file', fileValue)
         formData.append('answer_length', answerLength)
-        response = await fetch(`${API_PREFIX}/analyze`, {
+        formData.append('on_similar', onSimilar)
+        response = await fetch(`${API_PREFIX}/documents`, {
           method: 'POST',
           body: formData
         })
       } else {
-        response = await fetch(`${API_PREFIX}/analyze`, {
+        response = await fetch(`${API_PREFIX}/documents`, {
           method: 'POST',
           headers: { 'Content-Type': 'application/json' },
-          body: JSON.stringify({ text: textValue, answer_length: answerLength })
+          body: JSON.stringify({ text: textValue, answer_length: answerLength, on_similar: onSimilar })
         })
       }
 
@@ -63,10 +174,25 @@ export default function App() {
       }
 
       const data = await response.json()
-      setAnalysis(data.analysis)
-      if (data?.meta?.answer_length) setAnswerLength(data.meta.answer_length)
-      setSelectedAgent('science')
+      if (data.similar?.action === 'reused') setSimilar(data.similar)
+      const doc = { id: data.document_id, answerLength: data.answer_length, agents: data.agents }
+      const first = doc.agents.includes(selectedAgent) ? selectedAgent : doc.agents[0]
+      setAnswerLength(doc.answerLength)
+      setSubmitted(doc)
+      setSelectedAgent(first)
+      setAnalysis({ [first]: { status: 'pending' } })
       document.getElementById('results').scrollIntoView({ behavior: 'smooth' })
+
+      // Prefetches queue behind the streamed tab on the server, so they can
+      // be sent right away instead of after it finishes.
+      const streamed = streamAgent(doc, first)
+      for (const key of doc.agents) {
+        if (key !== first) fetchAgent(doc, key, 'low')
+      }
+      const result = await streamed
+      if (result.status === 'error') {
+        throw new Error(result.message || 'Analysis failed. Please try again later.')
+      }
     } catch (err) {
       setError(err.message || 'Something went wrong. Please try again.')
     } finally {
@@ -74,18 +200,34 @@ export default function App() {
     }
   }
 
+  const handleSelectAgent = (key) => {
+    setSelectedAgent(key)
+    const status = analysis?.[key]?.status
+    if (submitted?.agents.includes(key) && status !== 'ok' && status !== 'streaming') {
+      fetchAgent(submitted, key)
+    }
+  }
+
   const handleDownload = async () => {
-    if (!analysis) return
+    if (!completed) return
     setDownloadLoading(true)
     try {
-      const response = await fetch(`${API_PREFIX}/generate-pdf`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ analysis, answer_length: answerLength })
-      })
+      // Repeat downloads revalidate the rendered report by id (usually a
+      // 304 from the browser cache) instead of re-posting the analysis.
+      const reportLength = submitted?.answerLength || answerLength
+      const reportId = report?.keys === completedKeys ? report.id : null
+      let response = reportId ? await fetch(`${API_PREFIX}/reports/${reportId}`) : null
+      if (!response?.ok) {
+        response = await fetch(`${API_PREFIX}/generate-pdf`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ analysis: completed, answer_length: reportLength })
+        })
+      }
       if (!response.ok) {
         throw new Error('Failed to generate PDF report.')
       }
+      setReport({ id: response.headers.get('X-Report-Id'), keys: completedKeys })
       const blob = await response.blob()
       const url = window.URL.createObjectURL(blob)
       const anchor = document.createElement('a')
@@ -103,6 +245,12 @@ export default function App() {
   }
 
   const activeAnalysis = analysis?.[selectedAgent]
+  // Reports cover the agents that have finished; the rest are still loading.
+  const completed = useMemo(() => {
+    const entries = Object.entries(analysis || {}).filter(([, result]) => result.status === 'ok')
+    return entries.length ? Object.fromEntries(entries) : null
+  }, [analysis])
+  const completedKeys = `${submitted?.answerLength}:${Object.keys(completed || {}).sort().join(',')}`
 
   return (
     <div className="app">
@@ -218,7 +366,7 @@ export default function App() {
             <button
               type="button"
               className="primary"
-              onClick={handleAnalyze}
+              onClick={() => handleAnalyze()}
               disabled={loading}
             >
               {loading ? 'Analyzing…' : 'Analyze'}
@@ -239,22 +387,34 @@ export default function App() {
               type="button"
               className="secondary"
               onClick={handleDownload}
-              disabled={!analysis || downloadLoading}
+              disabled={!completed || loading || downloadLoading}
             >
               {downloadLoading ? 'Preparing PDF…' : 'Download report'}
             </button>
           </div>
 
+          {similar && (
+            <div className="notice" role="status">
+              <span>
+                This looks like an edit of an earlier submission ({Math.round(similar.similarity * 100)}% the same),
+                so its analysis is shown.
+              </span>
+              <button type="button" className="ghost" onClick={() => handleAnalyze('rerun')} disabled={loading}>
+                Analyze this version
+              </button>
+            </div>
+          )}
+
           <div className="agent-tabs" role="tablist" aria-label="Agent selection">
-            {AGENTS.map((agent) => (
+            {agents.map((agent) => (
               <button
                 key={agent.key}
                 type="button"
                 role="tab"
                 aria-selected={selectedAgent === agent.key}
                 className={selectedAgent === agent.key ? 'active' : ''}
-                onClick={() => setSelectedAgent(agent.key)}
-                disabled={!analysis}
+                onClick={() => handleSelectAgent(agent.key)}
+                disabled={!submitted?.agents.includes(agent.key)}
               >
                 <span>{agent.label}</span>
                 <small>{agent.description}</small>
@@ -277,7 +437,14 @@ export default function App() {
               </div>
             )}
 
-            {analysis && activeAnalysis?.status === 'ok' && (
+            {analysis && (!activeAnalysis || activeAnalysis.status === 'pending') && (
+              <div className="empty">
+                <h3>Analyzing…</h3>
+                <p>This perspective will appear as soon as the agent starts writing.</p>
+              </div>
+            )}
+
+            {analysis && (activeAnalysis?.status === 'ok' || activeAnalysis?.status === 'streaming') && (
               <ReactMarkdown>{activeAnalysis.content}</ReactMarkdown>
             )}
           </div>
@@ -1,8 +1,40 @@
+import { readFileSync, writeFileSync } from 'node:fs'
+import { join } from 'node:path'
+import { brotliCompressSync, constants, gzipSync } from 'node:zlib'
 import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 
+const COMPRESSIBLE = /\.(html|js|mjs|css|svg|json|txt|map)$/
+const MIN_BYTES = 1024
+
+// Write .br and .gz next to each text file of the build; the backend serves
+// them to browsers that accept those encodings instead of compressing per request.
+function precompress() {
+  return {
+    name: 'precompress',
+    apply: 'build',
+    writeBundle(options, bundle) {
+      for (const fileName of Object.keys(bundle)) {
+        if (!COMPRESSIBLE.test(fileName)) continue
+        const path = join(options.dir, fileName)
+        const source = readFileSync(path)
+        if (source.length < MIN_BYTES) continue
+        const br = brotliCompressSync(source, {
+          params: {
+            [constants.BROTLI_PARAM_QUALITY]: constants.BROTLI_MAX_QUALITY,
+            [constants.BROTLI_PARAM_SIZE_HINT]: source.length
+          }
+        })
+        const gz = gzipSync(source, { level: 9 })
+        if (br.length < source.length) writeFileSync(`${path}.br`, br)
+        if (gz.length < source.length) writeFileSync(`${path}.gz`, gz)
+      }
+    }
+  }
+}
+
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), precompress()],
   server: {
     port: 5173,
     proxy: {
@@ -13,4 +45,3 @@ export default defineConfig({
     }
   }
 })
-